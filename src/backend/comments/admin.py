@@ -1,4 +1,5 @@
 from django.contrib import admin
+from search.backends import matching
 from .models import Comment
 
 
@@ -6,9 +7,16 @@ from .models import Comment
 class CommentAdmin(admin.ModelAdmin):
     list_display = ['creator', 'post', 'text_preview', 'created_at']
     list_filter = ['created_at']
-    search_fields = ['text', 'creator__email', 'post__title']
+    search_fields = ['creator__email', 'post__title']
     readonly_fields = ['created_at', 'updated_at']
     
+    def get_search_results(self, request, queryset, search_term):
+        # Comment text uses the full-text index instead of a LIKE '%term%' scan
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            results |= matching(queryset, search_term)
+        return results, may_have_duplicates
+    
     def text_preview(self, obj):
         return obj.text[:50] + '...' if len(obj.text) > 50 else obj.text
     text_preview.short_description = 'Text Preview'
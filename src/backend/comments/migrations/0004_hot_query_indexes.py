@@ -0,0 +1,21 @@
+# Generated by Django 4.2.27 on 2026-10-17 03:11
+
+from django.db import migrations, models
+
+from reddit_api.migration_operations import AddIndexConcurrentlyIfSupported
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('comments', '0003_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created_at', '-id'], name='comments_post_created_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.27 on 2026-10-17 04:14
+
+from django.db import migrations, models
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, LPad
+import django.db.models.deletion
+
+from reddit_api.migration_operations import AddIndexConcurrentlyIfSupported
+
+BATCH_SIZE = 10000
+
+
+def set_root_paths(apps, schema_editor):
+    """Existing comments are all top level: their path is their own segment"""
+    Comment = apps.get_model('comments', 'Comment')
+    rows = Comment.objects.filter(path='').order_by('pk')
+    # One short UPDATE per id range instead of one rewrite of the whole table
+    while True:
+        ids = list(rows.values_list('pk', flat=True)[:BATCH_SIZE])
+        if not ids:
+            break
+        Comment.objects.filter(pk__gte=ids[0], pk__lte=ids[-1], path='').update(
+            path=LPad(Cast('id', CharField()), 10, Value('0'))
+        )
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; this also
+    # commits the backfill batch by batch
+    atomic = False
+
+    dependencies = [
+        ('comments', '0004_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='number_of_replies',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            # Indexed concurrently below instead of by a plain CREATE INDEX
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='comments.comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, default='', max_length=410),
+        ),
+        migrations.RunPython(set_root_paths, migrations.RunPython.noop),
+        AddIndexConcurrentlyIfSupported(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='comments_post_path_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='comment',
+            index=models.Index(fields=['parent'], name='comments_parent_idx'),
+        ),
+    ]
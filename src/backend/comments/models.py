@@ -1,8 +1,40 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from posts.models import Post
 from communities.models import Community
 
+# Materialized path: each ancestor's id (then the comment's own) as a
+# zero-padded decimal segment, so string order is depth-first thread order
+# and a subtree is the range [path, path + 1) in any collation.
+PATH_SEGMENT_WIDTH = 10
+MAX_DEPTH = 40
+
+
+def path_segment(pk):
+    return str(pk).zfill(PATH_SEGMENT_WIDTH)
+
+
+def subtree_upper_bound(path):
+    """Smallest path of the same length that sorts after every descendant of ``path``"""
+    return str(int(path) + 1).zfill(len(path))
+
+
+class CommentQuerySet(models.QuerySet):
+    def thread(self, post_id, parent=None, max_depth=None):
+        """
+        Comments of a post in depth-first order, or only the replies below
+        ``parent``, down to ``max_depth`` levels: one range scan of
+        ``comments_post_path_idx``.
+        """
+        queryset = self.filter(post_id=post_id)
+        base_depth = -1
+        if parent is not None:
+            queryset = queryset.filter(path__gt=parent.path, path__lt=subtree_upper_bound(parent.path))
+            base_depth = parent.depth
+        if max_depth is not None:
+            queryset = queryset.filter(depth__lte=base_depth + max_depth)
+        return queryset.order_by('path')
+
 
 class Comment(models.Model):
     """Comment model - equivalent to Firebase comments collection"""
@@ -22,11 +54,38 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
         related_name='comments'
     )
+    # A comment with replies is kept as a tombstone instead (see CommentDeleteView);
+    # RESTRICT still lets a post deletion cascade through its whole thread
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.RESTRICT,
+        related_name='replies',
+        blank=True,
+        null=True,
+        db_index=False  # comments_parent_idx, built concurrently
+    )
+    path = models.CharField(max_length=PATH_SEGMENT_WIDTH * (MAX_DEPTH + 1), blank=True, default='')
+    depth = models.PositiveSmallIntegerField(default=0)
+    number_of_replies = models.IntegerField(default=0)  # Direct replies only
     text = models.TextField()
+    is_deleted = models.BooleanField(default=False)  # Tombstone keeping its replies in place
     creator_photo_url = models.URLField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CommentQuerySet.as_manager()
+    
+    def save(self, *args, **kwargs):
+        creating = self._state.adding
+        if creating and self.parent_id:
+            self.depth = self.parent.depth + 1
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if creating and not self.path:
+                # The own segment needs the id, so the path is set right after the insert
+                self.path = (self.parent.path if self.parent_id else '') + path_segment(self.pk)
+                Comment.objects.filter(pk=self.pk).update(path=self.path)
+    
     @property
     def creator_display_text(self):
         return self.creator.display_name
@@ -53,3 +112,8 @@ class Comment(models.Model):
     class Meta:
         db_table = 'comments'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['post', '-created_at', '-id'], name='comments_post_created_idx'),
+            models.Index(fields=['post', 'path'], name='comments_post_path_idx'),
+            models.Index(fields=['parent'], name='comments_parent_idx'),
+        ]
@@ -12,9 +12,13 @@ class CommentSerializer(serializers.ModelSerializer):
     creatorDisplayText = serializers.CharField(source='creator.display_name', read_only=True)
     creatorPhotoURL = serializers.URLField(source='creator.photo_url', read_only=True, allow_null=True)
     post = serializers.IntegerField(write_only=True, required=False)
-    postId = serializers.IntegerField(source='post.id', read_only=True)
-    community = serializers.CharField(source='community.id', read_only=True)
-    communityId = serializers.CharField(source='community.id', read_only=True)
+    postId = serializers.IntegerField(source='post_id', read_only=True)
+    parent = serializers.IntegerField(write_only=True, required=False, allow_null=True)
+    parentId = serializers.IntegerField(source='parent_id', read_only=True, allow_null=True)
+    numberOfReplies = serializers.IntegerField(source='number_of_replies', read_only=True)
+    isDeleted = serializers.BooleanField(source='is_deleted', read_only=True)
+    community = serializers.CharField(source='community_id', read_only=True)
+    communityId = serializers.CharField(source='community_id', read_only=True)
     createdAt = serializers.DateTimeField(source='created_at', read_only=True)
     
     class Meta:
@@ -22,6 +26,14 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'post', 'postId', 'creator', 'creatorId', 
             'creatorDisplayText', 'creatorPhotoURL', 
-            'community', 'communityId', 'text', 'createdAt'
+            'community', 'communityId', 'parent', 'parentId', 'depth',
+            'numberOfReplies', 'isDeleted', 'text', 'createdAt'
         ]
-        read_only_fields = ['id', 'createdAt']
+        read_only_fields = ['id', 'depth', 'createdAt']
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.is_deleted:
+            # Tombstones do not reveal who wrote the deleted comment
+            data.update(creator=None, creatorId=None, creatorDisplayText='[deleted]', creatorPhotoURL=None)
+        return data
@@ -2,12 +2,18 @@
 Tests for Comments app
 Coverage: Models, Serializers, Views
 """
+import threading
+import time
 import pytest
 from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
-from comments.models import Comment
+from comments.models import MAX_DEPTH, Comment
+from posts.models import Post
+from reddit_api.counters import reconcile
 
 User = get_user_model()
 
@@ -79,6 +85,30 @@ class TestCommentList:
         assert 'creatorDisplayText' in response.data['results'][0]
 
 
+@pytest.mark.django_db
+class TestCommentListCursorPagination:
+    """Test opt-in keyset pagination on the comment list endpoint"""
+    
+    def test_cursor_pagination(self, api_client, create_post, create_comment):
+        """Test that cursor pages cover every comment once without a count"""
+        post = create_post()
+        for i in range(3):
+            create_comment(post=post, text=f'Comment {i}')
+        
+        url = reverse('comments:comment-list')
+        response = api_client.get(url, {'post': post.id, 'cursor': '', 'limit': 2})
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert 'count' not in response.data
+        assert len(response.data['results']) == 2
+        
+        response = api_client.get(response.data['next'])
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 1
+        assert response.data['next'] is None
+
+
 @pytest.mark.django_db
 class TestCommentCreate:
     """Test comment creation endpoint"""
@@ -155,7 +185,7 @@ class TestCommentDelete:
         url = reverse('comments:comment-delete', kwargs={'pk': comment.id})
         response = authenticated_client.delete(url)
         
-        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert response.status_code == status.HTTP_200_OK
         assert not Comment.objects.filter(id=comment.id).exists()
         
     def test_delete_comment_as_non_creator(self, authenticated_client, create_comment, create_user):
@@ -196,7 +226,7 @@ class TestCommentPermissions:
         url = reverse('comments:comment-delete', kwargs={'pk': comment.id})
         response = authenticated_client.delete(url)
         
-        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert response.status_code == status.HTTP_200_OK
         
     def test_other_user_cannot_delete_comment(self, api_client, create_user, create_comment):
         """Test that other users cannot delete comments"""
@@ -228,3 +258,324 @@ class TestCommentNesting:
         assert post_comments.count() == 2
         assert comment1 in post_comments
         assert comment2 in post_comments
+
+
+@pytest.mark.django_db
+class TestCommentListCache:
+    """Test versioned response cache on the comment list"""
+    
+    def test_new_comment_invalidates_list(self, authenticated_client, create_post, django_capture_on_commit_callbacks):
+        """Test that creating a comment is visible in the next list response"""
+        post = create_post()
+        url = reverse('comments:comment-list')
+        assert authenticated_client.get(url, {'post': post.id}).data['count'] == 0
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.post(reverse('comments:comment-create'), {
+                'post': post.id, 'text': 'Cached?',
+            })
+        
+        assert authenticated_client.get(url, {'post': post.id}).data['count'] == 1
+
+
+@pytest.mark.django_db
+class TestCommentCounter:
+    """Test the post comment counter kept by create and delete"""
+    
+    def test_create_returns_new_count(self, authenticated_client, create_post):
+        """Test that the create response carries the post's new count"""
+        post = create_post()
+        Post.objects.filter(id=post.id).update(number_of_comments=4)
+        
+        response = authenticated_client.post(reverse('comments:comment-create'), {
+            'post': post.id, 'text': 'Fifth',
+        }, format='json')
+        
+        assert response.data['numberOfComments'] == 5
+        post.refresh_from_db()
+        assert post.number_of_comments == 5
+    
+    def test_delete_returns_new_count(self, authenticated_client, create_comment):
+        """Test that the delete response carries the post's new count"""
+        comment = create_comment(creator=authenticated_client.user)
+        Post.objects.filter(id=comment.post_id).update(number_of_comments=3)
+        
+        response = authenticated_client.delete(reverse('comments:comment-delete', kwargs={'pk': comment.id}))
+        
+        assert response.data == {'numberOfComments': 2}
+    
+    def test_counter_update_leaves_other_columns(self, authenticated_client, create_post):
+        """Test that a comment does not write back a stale copy of the post"""
+        post = create_post(title='Original')
+        edited_at = Post.objects.get(id=post.id).edited_at
+        # A concurrent edit the comment request never read
+        Post.objects.filter(id=post.id).update(title='Edited elsewhere')
+        
+        authenticated_client.post(reverse('comments:comment-create'), {
+            'post': post.id, 'text': 'Hello',
+        }, format='json')
+        
+        post.refresh_from_db()
+        assert post.title == 'Edited elsewhere'
+        assert post.edited_at == edited_at
+        assert post.number_of_comments == 1
+    
+    def test_failed_create_keeps_count(self, authenticated_client, create_post, monkeypatch):
+        """Test that the counter rolls back with a comment that was not saved"""
+        post = create_post()
+        
+        def fail(*args, **kwargs):
+            raise OperationalError('disk full')
+        
+        monkeypatch.setattr(Comment, 'save', fail)
+        with pytest.raises(OperationalError):
+            authenticated_client.post(reverse('comments:comment-create'), {
+                'post': post.id, 'text': 'Lost',
+            }, format='json')
+        
+        post.refresh_from_db()
+        assert post.number_of_comments == 0
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCommentCountConcurrency:
+    """Test the comment counter under concurrent writers"""
+    
+    def test_count_matches_comment_rows(self, thread_db, create_user, create_post):
+        """Test number_of_comments equals COUNT(*) after concurrent creates and deletes"""
+        post = create_post()
+        users = [create_user() for _ in range(6)]
+        errors = []
+        
+        def request(client, method, url, data=None):
+            # SQLite serializes writers; retry when the file lock is busy
+            for _ in range(50):
+                try:
+                    return getattr(client, method)(url, data, format='json')
+                except OperationalError:
+                    time.sleep(0.01)
+            raise AssertionError('database stayed locked')
+        
+        def commenter(user):
+            client = APIClient()
+            client.force_authenticate(user=user)
+            try:
+                for index in range(5):
+                    response = request(client, 'post', reverse('comments:comment-create'), {
+                        'post': post.id, 'text': f'Comment {index}',
+                    })
+                    assert response.status_code == status.HTTP_201_CREATED
+                    if index % 2:
+                        url = reverse('comments:comment-delete', kwargs={'pk': response.data['id']})
+                        # SQLite may report the lock after the delete went through
+                        assert request(client, 'delete', url).status_code in (status.HTTP_200_OK, status.HTTP_404_NOT_FOUND)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=commenter, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert not errors
+        post.refresh_from_db()
+        assert post.number_of_comments == Comment.objects.filter(post=post).count()
+
+
+@pytest.mark.django_db
+class TestCommentThreads:
+    """Test reply threading and the thread endpoint"""
+    
+    def build_thread(self, create_comment, post):
+        """
+        a
+        ├── a1
+        │   └── a1x
+        └── a2
+        b
+        """
+        a = create_comment(post=post, text='a')
+        b = create_comment(post=post, text='b')
+        a1 = create_comment(post=post, parent=a, text='a1')
+        a2 = create_comment(post=post, parent=a, text='a2')
+        a1x = create_comment(post=post, parent=a1, text='a1x')
+        # Counted by the create endpoint, not by the model
+        Comment.objects.filter(id=a.id).update(number_of_replies=2)
+        Comment.objects.filter(id=a1.id).update(number_of_replies=1)
+        return a, a1, a1x, a2, b
+    
+    def texts(self, response):
+        return [item['text'] for item in response.data['results']]
+    
+    def test_path_and_depth(self, create_post, create_comment):
+        """Test that replies extend their parent's path"""
+        post = create_post()
+        a, a1, a1x, _, _ = self.build_thread(create_comment, post)
+        
+        assert a1x.depth == 2
+        assert a1x.path == a.path + a1.path[-10:] + a1x.path[-10:]
+        assert Comment.objects.get(id=a1x.id).path == a1x.path
+    
+    def test_full_thread_in_one_query(self, api_client, create_post, create_comment, django_assert_num_queries):
+        """Test that the whole tree comes back depth first from a single range scan"""
+        post = create_post()
+        self.build_thread(create_comment, post)
+        url = reverse('comments:comment-thread')
+        
+        with django_assert_num_queries(1):
+            response = api_client.get(url, {'post': post.id})
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert self.texts(response) == ['a', 'a1', 'a1x', 'a2', 'b']
+        assert [item['depth'] for item in response.data['results']] == [0, 1, 2, 1, 0]
+    
+    def test_depth_limited_subtree(self, api_client, create_post, create_comment):
+        """Test that parent and depth select a slice of the tree"""
+        post = create_post()
+        a, a1, _, _, _ = self.build_thread(create_comment, post)
+        url = reverse('comments:comment-thread')
+        
+        top = api_client.get(url, {'post': post.id, 'depth': 1}).data['results']
+        below = api_client.get(url, {'post': post.id, 'parent': a.id, 'depth': 1})
+        
+        assert [item['text'] for item in top] == ['a', 'b']
+        assert top[0]['numberOfReplies'] == 2
+        assert self.texts(below) == ['a1', 'a2']
+        assert below.data['results'][0]['numberOfReplies'] == 1
+        assert below.data['results'][0]['parentId'] == a.id
+    
+    def test_load_more_cursor(self, api_client, create_post, create_comment):
+        """Test that cursor pages continue the depth-first order"""
+        post = create_post()
+        self.build_thread(create_comment, post)
+        
+        seen = []
+        url, params = reverse('comments:comment-thread'), {'post': post.id, 'limit': 2}
+        while url:
+            data = api_client.get(url, params).data
+            seen.extend(item['text'] for item in data['results'])
+            url, params = data['next'], None
+        
+        assert seen == ['a', 'a1', 'a1x', 'a2', 'b']
+    
+    def test_reply_via_api(self, authenticated_client, create_post, create_comment):
+        """Test that replying counts the reply on its parent and the post"""
+        post = create_post()
+        parent = create_comment(post=post)
+        
+        response = authenticated_client.post(reverse('comments:comment-create'), {
+            'post': post.id, 'parent': parent.id, 'text': 'Reply',
+        }, format='json')
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['parentId'] == parent.id
+        assert response.data['depth'] == 1
+        assert response.data['numberOfComments'] == 1
+        assert Comment.objects.get(id=parent.id).number_of_replies == 1
+    
+    def test_reply_rejected_for_other_post_or_too_deep(self, authenticated_client, create_post, create_comment):
+        """Test that a parent must be on the same post and within MAX_DEPTH"""
+        post = create_post()
+        elsewhere = create_comment()
+        deepest = create_comment(post=post)
+        Comment.objects.filter(id=deepest.id).update(depth=MAX_DEPTH)
+        url = reverse('comments:comment-create')
+        
+        for parent in (elsewhere.id, deepest.id, 'x'):
+            response = authenticated_client.post(url, {'post': post.id, 'parent': parent, 'text': 'No'}, format='json')
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Comment.objects.filter(text='No').exists()
+    
+    def test_delete_with_replies_leaves_tombstone(self, authenticated_client, create_post, create_comment):
+        """Test that deleting a comment keeps other users' replies under a tombstone"""
+        post = create_post()
+        a, a1, a1x, _, _ = self.build_thread(create_comment, post)
+        Comment.objects.filter(id=a1.id).update(creator=authenticated_client.user)
+        Post.objects.filter(id=post.id).update(number_of_comments=5)
+        url = reverse('comments:comment-delete', kwargs={'pk': a1.id})
+        
+        response = authenticated_client.delete(url)
+        
+        assert response.data == {'numberOfComments': 5}
+        thread = authenticated_client.get(reverse('comments:comment-thread'), {'post': post.id}).data['results']
+        assert [item['text'] for item in thread] == ['a', '', 'a1x', 'a2', 'b']
+        assert thread[1]['isDeleted'] and thread[1]['creatorDisplayText'] == '[deleted]'
+        assert thread[1]['creatorId'] is None
+        assert Comment.objects.get(id=a1x.id).parent_id == a1.id
+        assert Comment.objects.get(id=a.id).number_of_replies == 2
+        # Deleting the tombstone again changes nothing
+        assert authenticated_client.delete(url).data == {'numberOfComments': 5}
+    
+    def test_delete_leaf_removes_row(self, authenticated_client, create_post, create_comment):
+        """Test that a comment without replies is deleted and the counters follow"""
+        post = create_post()
+        a, _, a1x, _, _ = self.build_thread(create_comment, post)
+        Comment.objects.filter(id=a1x.id).update(creator=authenticated_client.user)
+        Post.objects.filter(id=post.id).update(number_of_comments=5)
+        
+        response = authenticated_client.delete(reverse('comments:comment-delete', kwargs={'pk': a1x.id}))
+        
+        assert response.data == {'numberOfComments': 4}
+        assert list(Comment.objects.thread(post.id).values_list('text', flat=True)) == ['a', 'a1', 'a2', 'b']
+        assert Comment.objects.get(text='a1').number_of_replies == 0
+    
+    def test_post_delete_removes_thread(self, create_post, create_comment):
+        """Test that deleting the post still removes every comment of the thread"""
+        post = create_post()
+        self.build_thread(create_comment, post)
+        
+        post.delete()
+        
+        assert not Comment.objects.exists()
+    
+    def test_reply_counts_reconciled(self, create_post, create_comment):
+        """Test that reconcile_counters knows about reply counts"""
+        post = create_post()
+        a, a1, _, _, _ = self.build_thread(create_comment, post)
+        Comment.objects.filter(id=a.id).update(number_of_replies=9)
+        
+        report = reconcile('comment_replies')
+        
+        assert report.drifted == 1
+        assert Comment.objects.get(id=a.id).number_of_replies == 2
+        assert Comment.objects.get(id=a1.id).number_of_replies == 1
+    
+    def test_requires_post(self, api_client):
+        """Test that post is required and parameters are validated"""
+        url = reverse('comments:comment-thread')
+        
+        assert api_client.get(url).status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get(url, {'post': 1, 'depth': 0}).status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get(url, {'post': 1, 'parent': 99999}).status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestCommentQueryCounts:
+    """Test that comment endpoints run a fixed number of queries however many rows they return"""
+    
+    @pytest.mark.parametrize('rows', [1, 5])
+    def test_comment_list(self, api_client, create_post, create_comment, django_assert_num_queries, rows):
+        """Test the paginated list (count plus one page with creators)"""
+        post = create_post()
+        for _ in range(rows):
+            create_comment(post=post)
+        
+        with django_assert_num_queries(2):
+            response = api_client.get(reverse('comments:comment-list'), {'post': post.id})
+        
+        assert response.data['count'] == rows
+    
+    @pytest.mark.parametrize('rows', [1, 5])
+    def test_comment_thread(self, api_client, create_post, create_comment, django_assert_num_queries, rows):
+        """Test a thread page of top-level comments and replies"""
+        post = create_post()
+        for _ in range(rows):
+            create_comment(post=post, parent=create_comment(post=post))
+        
+        with django_assert_num_queries(1):
+            response = api_client.get(reverse('comments:comment-thread'), {'post': post.id})
+        
+        assert len(response.data['results']) == 2 * rows
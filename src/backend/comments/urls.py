@@ -1,10 +1,11 @@
 from django.urls import path
-from .views import CommentListView, CommentCreateView, CommentDeleteView
+from .views import CommentListView, CommentThreadView, CommentCreateView, CommentDeleteView
 
 app_name = 'comments'
 
 urlpatterns = [
     path('', CommentListView.as_view(), name='comment-list'),
+    path('thread/', CommentThreadView.as_view(), name='comment-thread'),
     path('create/', CommentCreateView.as_view(), name='comment-create'),
     path('<int:pk>/delete/', CommentDeleteView.as_view(), name='comment-delete'),
 ]
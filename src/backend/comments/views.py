@@ -1,22 +1,99 @@
-from rest_framework import generics, status
+from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from django.db import transaction
+from django.db.models import F, RestrictedError
 from django.shortcuts import get_object_or_404
-from .models import Comment
+from django.utils import timezone
+from .models import MAX_DEPTH, Comment
 from posts.models import Post
+from posts.ranking import score_updates
 from .serializers import CommentSerializer
+from reddit_api.cache import (
+    VersionedCacheMixin,
+    comment_list_namespace,
+    invalidate_comment_lists,
+    invalidate_post_lists,
+)
+from reddit_api.pagination import KeysetPagination, PageNumberOrKeysetPagination
 
 
-class CommentListView(generics.ListAPIView):
+def change_comment_count(post, delta):
+    """
+    Add ``delta`` to the post's comment counter (and derived scores) in one
+    UPDATE that touches no other column; returns the new count. Call inside
+    the transaction that creates or deletes the comment.
+    """
+    Post.objects.filter(id=post.id).update(
+        number_of_comments=F('number_of_comments') + delta,
+        **score_updates(post.created_at, comment_delta=delta)
+    )
+    # The row stays locked by our UPDATE until commit, so this is our count
+    return Post.objects.filter(id=post.id).values_list('number_of_comments', flat=True).get()
+
+
+class CommentListView(VersionedCacheMixin, generics.ListAPIView):
     """List comments for a post"""
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = PageNumberOrKeysetPagination
+    
+    def get_cache_namespaces(self):
+        return [comment_list_namespace(self.request.query_params.get('post'))]
     
     def get_queryset(self):
         post_id = self.request.query_params.get('post')
         if post_id:
-            return Comment.objects.filter(post_id=post_id).select_related('creator', 'post')
-        return Comment.objects.all().select_related('creator', 'post')
+            return Comment.objects.filter(post_id=post_id).select_related('creator')
+        return Comment.objects.all().select_related('creator')
+
+
+class ThreadPagination(KeysetPagination):
+    """Depth-first pages of a thread, continued from the last path seen"""
+    page_size = 200
+    max_page_size = 1000
+    ordering = ('path',)
+    
+    def is_cursor_request(self, request):
+        # A new endpoint, so it always uses the cursor envelope
+        return True
+
+
+class CommentThreadView(VersionedCacheMixin, generics.ListAPIView):
+    """
+    A post's comments as a thread: ``?post=`` with optional ``parent`` (only
+    the replies below that comment) and ``depth`` (levels to include).
+    
+    Rows come flat in depth-first order with ``depth`` and ``parentId``, so
+    a parent always precedes its replies and clients can render each page as
+    it arrives. Comments at the depth limit with ``numberOfReplies`` > 0 are
+    continued with ``?parent=<id>``; long threads with the ``next`` cursor.
+    """
+    serializer_class = CommentSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = ThreadPagination
+    
+    def get_cache_namespaces(self):
+        return [comment_list_namespace(self.request.query_params.get('post'))]
+    
+    def get_queryset(self):
+        from rest_framework.exceptions import ValidationError
+        params = self.request.query_params
+        try:
+            post_id = int(params['post'])
+            depth = int(params['depth']) if params.get('depth') else None
+            parent_id = int(params['parent']) if params.get('parent') else None
+        except KeyError:
+            raise ValidationError({'post': 'This field is required.'})
+        except ValueError:
+            raise ValidationError('post, parent and depth must be integers.')
+        if depth is not None and depth < 1:
+            raise ValidationError({'depth': 'Must be at least 1.'})
+        
+        parent = None
+        if parent_id is not None:
+            parent = get_object_or_404(Comment.objects.only('path', 'depth'), id=parent_id, post_id=post_id)
+        return Comment.objects.thread(post_id, parent=parent, max_depth=depth).select_related('creator')
 
 
 class CommentCreateView(generics.CreateAPIView):
@@ -24,6 +101,12 @@ class CommentCreateView(generics.CreateAPIView):
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated]
     
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        # The post page updates its counter without re-fetching the post
+        response.data['numberOfComments'] = self.number_of_comments
+        return response
+    
     def perform_create(self, serializer):
         post_id = self.request.data.get('post')
         if not post_id:
@@ -31,21 +114,39 @@ class CommentCreateView(generics.CreateAPIView):
             raise ValidationError({'post': 'This field is required.'})
         
         try:
-            post = Post.objects.get(id=post_id)
-        except Post.DoesNotExist:
+            # Only the columns needed here - never the body/image blobs
+            post = Post.objects.only('id', 'community_id', 'created_at').get(id=post_id)
+        except (Post.DoesNotExist, ValueError, TypeError):
             from rest_framework.exceptions import ValidationError
             raise ValidationError({'post': 'Invalid post ID.'})
         
-        # Increment comment count
-        post.number_of_comments += 1
-        post.save()
+        parent = None
+        parent_id = self.request.data.get('parent')
+        if parent_id:
+            try:
+                parent = Comment.objects.only('id', 'post_id', 'path', 'depth').get(id=parent_id)
+            except (Comment.DoesNotExist, ValueError, TypeError):
+                parent = None
+            if parent is None or parent.post_id != post.id:
+                from rest_framework.exceptions import ValidationError
+                raise ValidationError({'parent': 'Invalid parent comment ID.'})
+            if parent.depth + 1 > MAX_DEPTH:
+                from rest_framework.exceptions import ValidationError
+                raise ValidationError({'parent': 'Replies cannot be nested any deeper.'})
         
-        serializer.save(
-            creator=self.request.user,
-            post=post,
-            community=post.community,
-            creator_photo_url=self.request.user.photo_url
-        )
+        with transaction.atomic():
+            serializer.save(
+                creator=self.request.user,
+                post=post,
+                parent=parent,
+                community_id=post.community_id,
+                creator_photo_url=self.request.user.photo_url
+            )
+            if parent is not None:
+                Comment.objects.filter(id=parent.id).update(number_of_replies=F('number_of_replies') + 1)
+            self.number_of_comments = change_comment_count(post, 1)
+        invalidate_comment_lists(post.id)
+        invalidate_post_lists(post.community_id)
 
 
 class CommentDeleteView(generics.DestroyAPIView):
@@ -61,10 +162,22 @@ class CommentDeleteView(generics.DestroyAPIView):
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied('Not authorized')
         
-        # Decrement comment count
-        post = instance.post
-        post.number_of_comments -= 1
-        post.save()
-        
-        instance.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        post = Post.objects.only('id', 'community_id', 'created_at').get(id=instance.post_id)
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    # Count only rows this request removed; a concurrent delete may win
+                    _, deleted = instance.delete()
+                removed = deleted.get(Comment._meta.label, 0)
+            except RestrictedError:
+                # Other users' replies stay in the thread under a tombstone
+                Comment.objects.filter(id=instance.id).update(
+                    text='', is_deleted=True, updated_at=timezone.now()
+                )
+                removed = 0
+            if removed and instance.parent_id:
+                Comment.objects.filter(id=instance.parent_id).update(number_of_replies=F('number_of_replies') - 1)
+            number_of_comments = change_comment_count(post, -removed)
+        invalidate_comment_lists(post.id)
+        invalidate_post_lists(post.community_id)
+        return Response({'numberOfComments': number_of_comments})
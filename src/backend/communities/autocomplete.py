@@ -0,0 +1,222 @@
+"""
+In-memory prefix index for community name autocomplete
+
+Every worker keeps the community names in one sorted list. A prefix query
+is a binary search for the matching range, followed by a pick of the
+largest communities in it. Results for one- and two-character prefixes,
+whose ranges are the longest, are cached per snapshot. Readers never take
+a lock. A join or leave through this process patches the member count in
+place and drops the cached results of that name's prefixes; a new
+community is added by swapping in a copy with the name inserted. Changes
+made by other workers arrive with the periodic rebuild
+(``COMMUNITY_AUTOCOMPLETE_REFRESH`` seconds), which one thread runs while
+the others keep answering from the previous snapshot. ``warm()`` builds
+the first snapshot in the background when a worker starts.
+
+With ``COMMUNITY_AUTOCOMPLETE_IN_MEMORY=False`` queries go to the database
+instead, served on PostgreSQL by the ``lower(id) text_pattern_ops`` index.
+"""
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.functions import Lower
+
+from .models import Community
+
+logger = logging.getLogger(__name__)
+
+# Longest prefix whose ranked results are cached, and how many are kept
+CACHED_PREFIX_LENGTH = 2
+MAX_RESULTS = 20
+
+
+class PrefixIndex:
+    """Immutable sorted index of ``(name, number_of_members)``"""
+
+    def __init__(self, entries=()):
+        rows = sorted((name.lower(), name, members) for name, members in entries)
+        self.keys = [row[0] for row in rows]
+        self.names = [row[1] for row in rows]
+        self.members = [row[2] for row in rows]
+        self._top = {}
+        self._generation = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _range(self, prefix):
+        start = bisect_left(self.keys, prefix)
+        return start, bisect_left(self.keys, prefix + '\U0010ffff', start)
+
+    def _ranked(self, prefix, limit):
+        start, end = self._range(prefix)
+        return heapq.nsmallest(
+            limit, range(start, end), key=lambda i: (-self.members[i], self.keys[i])
+        )
+
+    def search(self, prefix, limit=10):
+        """``[(name, number_of_members), ...]``, largest communities first"""
+        prefix = prefix.lower()
+        limit = min(limit, MAX_RESULTS)
+        if len(prefix) <= CACHED_PREFIX_LENGTH:
+            top = self._top.get(prefix)
+            if top is None:
+                generation = self._generation
+                top = self._top[prefix] = [
+                    (self.names[i], self.members[i]) for i in self._ranked(prefix, MAX_RESULTS)
+                ]
+                if self._generation != generation:
+                    # Counts changed while ranking; do not keep the result
+                    self._top.pop(prefix, None)
+            return top[:limit]
+        return [(self.names[i], self.members[i]) for i in self._ranked(prefix, limit)]
+
+    def _position(self, name):
+        """Where ``name`` is or would be inserted"""
+        key = name.lower()
+        position = bisect_left(self.keys, key)
+        # Names differing only in case share a key and are sorted by name
+        while position < len(self.keys) and self.keys[position] == key and self.names[position] < name:
+            position += 1
+        return position
+
+    def set_members(self, name, members):
+        """
+        Replace the member count of an indexed name in place. Returns False
+        when ``name`` is not indexed. Callers serialize writers.
+        """
+        position = self._position(name)
+        if position == len(self.names) or self.names[position] != name:
+            return False
+        self._generation += 1
+        self.members[position] = members
+        key = self.keys[position]
+        for length in range(CACHED_PREFIX_LENGTH + 1):
+            self._top.pop(key[:length], None)
+        return True
+
+    def with_entry(self, name, members):
+        """A copy with ``name`` added or its member count replaced"""
+        index = PrefixIndex()
+        key = name.lower()
+        position = self._position(name)
+        if position < len(self.keys) and self.names[position] == name:
+            # Member count change: the name lists are never mutated, so share them
+            index.keys, index.names = self.keys, self.names
+            index.members = self.members[:]
+            index.members[position] = members
+        else:
+            index.keys, index.names, index.members = self.keys[:], self.names[:], self.members[:]
+            index.keys.insert(position, key)
+            index.names.insert(position, name)
+            index.members.insert(position, members)
+        return index
+
+
+class CommunityNameIndex:
+    """Per-process holder of the current ``PrefixIndex`` snapshot"""
+
+    def __init__(self):
+        self._snapshot = None
+        self._built_at = 0
+        # Guards snapshot swaps and in-place updates; never held during a load
+        self._lock = threading.Lock()
+        # One rebuild at a time
+        self._build_lock = threading.Lock()
+        # Changes arriving while a rebuild loads, replayed onto its result
+        self._pending = None
+
+    def _load(self):
+        return PrefixIndex(Community.objects.values_list('id', 'number_of_members').iterator())
+
+    def _stale(self):
+        return time.monotonic() - self._built_at > settings.COMMUNITY_AUTOCOMPLETE_REFRESH
+
+    def _rebuild(self):
+        """Load a new snapshot outside ``_lock``, then swap it in"""
+        with self._lock:
+            self._pending = {}
+        try:
+            snapshot = self._load()
+            with self._lock:
+                for name, members in self._pending.items():
+                    if not snapshot.set_members(name, members):
+                        snapshot = snapshot.with_entry(name, members)
+                self._snapshot = snapshot
+                self._built_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def get(self):
+        if self._snapshot is None:
+            # Nothing to serve yet, so wait for the first build
+            with self._build_lock:
+                if self._snapshot is None:
+                    self._rebuild()
+        elif self._stale() and self._build_lock.acquire(blocking=False):
+            # Concurrent readers keep the previous snapshot meanwhile
+            try:
+                if self._stale():
+                    self._rebuild()
+            finally:
+                self._build_lock.release()
+        return self._snapshot
+
+    def search(self, prefix, limit=10):
+        return self.get().search(prefix, limit)
+
+    def put(self, name, members):
+        """Add a community or update its member count, if the index is built"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending[name] = members
+            snapshot = self._snapshot
+            if snapshot is not None and not snapshot.set_members(name, members):
+                self._snapshot = snapshot.with_entry(name, members)
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+
+    def warm(self):
+        """Build the first snapshot in a background thread"""
+        if not settings.COMMUNITY_AUTOCOMPLETE_IN_MEMORY:
+            return
+
+        def build():
+            try:
+                self.get()
+            except Exception:
+                # The first request builds it instead
+                logger.exception('Warming the community name index failed')
+            finally:
+                connection.close()
+
+        threading.Thread(target=build, name='community-index-warmup', daemon=True).start()
+
+
+community_index = CommunityNameIndex()
+
+
+def index_community(community):
+    """Reflect a created or joined community in this worker's index after commit"""
+    name, members = community.id, community.number_of_members
+    transaction.on_commit(lambda: community_index.put(name, members))
+
+
+def autocomplete(prefix, limit=10):
+    """``[(name, number_of_members), ...]`` of communities whose name starts with ``prefix``"""
+    if settings.COMMUNITY_AUTOCOMPLETE_IN_MEMORY:
+        return community_index.search(prefix, limit)
+    return list(
+        Community.objects.annotate(name_lower=Lower('id'))
+        .filter(name_lower__startswith=prefix.lower())
+        .order_by('-number_of_members', 'name_lower')
+        .values_list('id', 'number_of_members')[:min(limit, MAX_RESULTS)]
+    )
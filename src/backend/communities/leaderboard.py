@@ -0,0 +1,92 @@
+"""
+Cached leaderboard of the largest communities
+
+The top ``LEADERBOARD_SIZE`` communities are kept in the shared cache as a
+list of ``(id, number_of_members)`` pairs, in the order of
+``communities_members_idx`` (members, then id, both descending). Joins,
+leaves and new communities patch the list after commit instead of
+re-sorting the table. When a listed community drops to the last place, a
+community outside the list may now rank above it, so the list is dropped
+and rebuilt by the next reader with one index range scan. Patches from
+concurrent workers can overwrite each other; the entry is stored with the
+time it was built and is rebuilt ``COMMUNITY_LEADERBOARD_REFRESH`` seconds
+after that however often it is patched, which bounds that drift.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Community
+
+LEADERBOARD_KEY = 'community-leaderboard'
+LEADERBOARD_SIZE = 100
+
+
+def _rank(entry):
+    """Sort key; larger ranks higher"""
+    name, members = entry
+    return members, name
+
+
+def _load():
+    return list(
+        Community.objects.order_by('-number_of_members', '-id')
+        .values_list('id', 'number_of_members')[:LEADERBOARD_SIZE]
+    )
+
+
+def _age(entry):
+    return time.time() - entry['built_at']
+
+
+def leaderboard():
+    """``[(id, number_of_members), ...]`` of the largest communities"""
+    entry = cache.get(LEADERBOARD_KEY)
+    if entry is None or _age(entry) >= settings.COMMUNITY_LEADERBOARD_REFRESH:
+        entry = {'built_at': time.time(), 'board': _load()}
+        cache.set(LEADERBOARD_KEY, entry, settings.COMMUNITY_LEADERBOARD_REFRESH)
+    return entry['board']
+
+
+def top_community_ids(limit):
+    return [name for name, _ in leaderboard()[:limit]]
+
+
+def patched(board, name, members):
+    """
+    ``board`` with ``name`` ranked at ``members``, or ``None`` when the
+    result cannot be known without reading the table
+    """
+    entries = [entry for entry in board if entry[0] != name]
+    listed = len(entries) < len(board)
+    full = len(board) >= LEADERBOARD_SIZE
+    entry = (name, members)
+    if full and entries and _rank(entry) < _rank(entries[-1]):
+        # Ranks below the last listed community: unknown territory if it was
+        # listed before, unchanged board if it was not
+        return None if listed else board
+    entries.append(entry)
+    entries.sort(key=_rank, reverse=True)
+    return entries[:LEADERBOARD_SIZE]
+
+
+def _put(name, members):
+    entry = cache.get(LEADERBOARD_KEY)
+    if entry is None:
+        return
+    # Keep the remaining lifetime; patches never postpone the rebuild
+    remaining = settings.COMMUNITY_LEADERBOARD_REFRESH - _age(entry)
+    board = patched(entry['board'], name, members)
+    if board is None or remaining <= 0:
+        cache.delete(LEADERBOARD_KEY)
+    else:
+        cache.set(LEADERBOARD_KEY, {**entry, 'board': board}, math.ceil(remaining))
+
+
+def rank_community(community):
+    """Reflect a created, joined or left community in the leaderboard after commit"""
+    name, members = community.id, community.number_of_members
+    transaction.on_commit(lambda: _put(name, members))
@@ -0,0 +1,78 @@
+"""
+Race-free joining and leaving
+
+Both operations are one conditional write of the membership row plus one
+``number_of_members`` update that runs only when that write changed a row,
+so retries and concurrent double-clicks can neither skip nor repeat the
+counter change:
+
+* join: ``INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING id``, which
+  inserts nothing when the membership exists (``unique_together``) or the
+  community does not;
+* leave: a single ``DELETE`` whose row count says whether the membership
+  existed.
+
+The counter update is ``UPDATE ... RETURNING number_of_members``: it
+touches only that column and ``updated_at`` (which validates community
+ETags), never the image columns. Both statements are supported by
+PostgreSQL and SQLite 3.35+.
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Community, CommunityMember
+
+
+def _column(model, name):
+    return connection.ops.quote_name(model._meta.get_field(name).column)
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _change_members(cursor, community_id, delta):
+    cursor.execute(
+        f'UPDATE {_table(Community)} '
+        f'SET {_column(Community, "number_of_members")} = {_column(Community, "number_of_members")} + %s, '
+        f'{_column(Community, "updated_at")} = %s '
+        f'WHERE {_column(Community, "id")} = %s '
+        f'RETURNING {_column(Community, "number_of_members")}',
+        [delta, connection.ops.adapt_datetimefield_value(timezone.now()), community_id],
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def add_member(user_id, community_id):
+    """
+    Make the user a member. Returns the new member count, or ``None`` when
+    nothing changed (already a member, or no such community).
+    """
+    columns = ', '.join(
+        _column(CommunityMember, name) for name in ('user', 'community', 'is_moderator', 'joined_at')
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {_table(CommunityMember)} ({columns}) '
+            f'SELECT %s, {_column(Community, "id")}, %s, %s FROM {_table(Community)} '
+            f'WHERE {_column(Community, "id")} = %s '
+            f'ON CONFLICT DO NOTHING RETURNING {_column(CommunityMember, "id")}',
+            [user_id, False, connection.ops.adapt_datetimefield_value(timezone.now()), community_id],
+        )
+        if cursor.fetchone() is None:
+            return None
+        return _change_members(cursor, community_id, 1)
+
+
+def remove_member(user_id, community_id):
+    """
+    End the user's membership. Returns the new member count, or ``None``
+    when the user was not a member.
+    """
+    with transaction.atomic():
+        deleted, _ = CommunityMember.objects.filter(user_id=user_id, community_id=community_id).delete()
+        if not deleted:
+            return None
+        with connection.cursor() as cursor:
+            return _change_members(cursor, community_id, -1)
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.27 on 2026-10-17 03:11
+
+from django.db import migrations, models
+
+from reddit_api.migration_operations import AddIndexConcurrentlyIfSupported
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('communities', '0003_community_image_alter_community_image_url'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name='community',
+            index=models.Index(fields=['-number_of_members', '-id'], name='communities_members_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='communitymember',
+            index=models.Index(fields=['user', '-joined_at'], include=('community', 'is_moderator'), name='community_members_user_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-17 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0004_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='community',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.27 on 2026-10-17 03:43
+
+from django.db import migrations
+import images.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0005_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='community',
+            name='image',
+            field=images.fields.ContentAddressedImageField(blank=True, null=True, upload_to='communities/'),
+        ),
+    ]
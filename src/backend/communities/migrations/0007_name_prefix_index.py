@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def create_prefix_index(apps, schema_editor):
+    # Serves LOWER(id) LIKE 'prefix%' whatever the database collation;
+    # SQLite (development and tests) scans the small table instead
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS communities_name_prefix_idx '
+        'ON communities (lower(id) text_pattern_ops)'
+    )
+
+
+def drop_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS communities_name_prefix_idx')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('communities', '0006_content_addressed_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from images.fields import ContentAddressedImageField
 
 
 class Community(models.Model):
@@ -24,7 +25,8 @@ class Community(models.Model):
     )
     number_of_members = models.IntegerField(default=1)
     image_url = models.TextField(blank=True, null=True)  # Legacy: base64 or URL strings
-    image = models.ImageField(upload_to='communities/', blank=True, null=True)  # New: proper image storage for S3
+    image = ContentAddressedImageField(upload_to='communities/', blank=True, null=True)  # Deduplicated by content, see images.fields
+    image_variants = models.JSONField(default=dict, blank=True)  # Resized copies, see reddit_api.image_variants
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -44,6 +46,9 @@ class Community(models.Model):
     class Meta:
         db_table = 'communities'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-number_of_members', '-id'], name='communities_members_idx'),
+        ]
 
 
 class CommunityMember(models.Model):
@@ -66,6 +71,14 @@ class CommunityMember(models.Model):
         db_table = 'community_members'
         unique_together = ['user', 'community']
         ordering = ['-joined_at']
+        indexes = [
+            # Covers the user's snippet list (newest membership first)
+            models.Index(
+                fields=['user', '-joined_at'],
+                include=['community', 'is_moderator'],
+                name='community_members_user_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.user.username} in r/{self.community.id}"
@@ -1,17 +1,21 @@
 from rest_framework import serializers
 from .models import Community, CommunityMember
 from django.contrib.auth import get_user_model
+from reddit_api.direct_uploads import DirectUploadSerializerMixin
+from reddit_api.image_variants import srcset_map
 
 User = get_user_model()
 
 
-class CommunitySerializer(serializers.ModelSerializer):
+class CommunitySerializer(DirectUploadSerializerMixin, serializers.ModelSerializer):
     """Serializer for Community model"""
+    upload_kind = 'communities'
     communityId = serializers.CharField(source='id', read_only=True)  # Added for frontend compatibility
-    creatorId = serializers.IntegerField(source='creator.id', read_only=True)
+    creatorId = serializers.IntegerField(source='creator_id', read_only=True)
     numberOfMembers = serializers.IntegerField(source='number_of_members', read_only=True)
     privacyType = serializers.CharField(source='privacy_type')
     imageURL = serializers.SerializerMethodField()
+    imageSrcset = serializers.SerializerMethodField()
     image = serializers.ImageField(write_only=True, required=False, allow_null=True)
     image_url = serializers.CharField(write_only=True, required=False, allow_blank=True)
     createdAt = serializers.DateTimeField(source='created_at', read_only=True)
@@ -26,11 +30,15 @@ class CommunitySerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(image_url)
         return image_url
     
+    def get_imageSrcset(self, obj):
+        """Resized JPEG/WebP variants of the uploaded image, once generated"""
+        return srcset_map(obj.image, obj.image_variants, self.context.get('request'))
+    
     class Meta:
         model = Community
         fields = [
             'id', 'communityId', 'creatorId', 'privacyType', 'numberOfMembers',
-            'image', 'image_url', 'imageURL', 'createdAt'
+            'image', 'image_key', 'image_url', 'imageURL', 'imageSrcset', 'createdAt'
         ]
         read_only_fields = ['numberOfMembers', 'createdAt']
     
@@ -52,9 +60,10 @@ class CommunitySerializer(serializers.ModelSerializer):
 
 class CommunitySnippetSerializer(serializers.ModelSerializer):
     """Serializer for community snippets (user's joined communities)"""
-    id = serializers.CharField(source='community.id', read_only=True)
-    communityId = serializers.CharField(source='community.id', read_only=True)
+    id = serializers.CharField(source='community_id', read_only=True)
+    communityId = serializers.CharField(source='community_id', read_only=True)
     imageURL = serializers.SerializerMethodField()
+    imageSrcset = serializers.SerializerMethodField()
     isModerator = serializers.BooleanField(source='is_moderator', read_only=True)
     
     def get_imageURL(self, obj):
@@ -67,9 +76,12 @@ class CommunitySnippetSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(image_url)
         return image_url
     
+    def get_imageSrcset(self, obj):
+        return srcset_map(obj.community.image, obj.community.image_variants, self.context.get('request'))
+    
     class Meta:
         model = CommunityMember
-        fields = ['id', 'communityId', 'imageURL', 'isModerator']
+        fields = ['id', 'communityId', 'imageURL', 'imageSrcset', 'isModerator']
 
 
 class CommunityMemberSerializer(serializers.ModelSerializer):
@@ -2,10 +2,19 @@
 Tests for Communities app
 Coverage: Models, Serializers, Views, Permissions
 """
+import io
+import threading
+import time
 import pytest
+from botocore.response import StreamingBody
 from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.test import APIClient
+from communities import leaderboard
+from communities.autocomplete import PrefixIndex, community_index
 from communities.models import Community, CommunityMember
 
 User = get_user_model()
@@ -247,6 +256,119 @@ class TestCommunityJoinLeave:
         assert response.status_code == status.HTTP_400_BAD_REQUEST
 
 
+@pytest.mark.django_db
+class TestMembershipWrites:
+    """Test the single-statement join and leave"""
+    
+    def post(self, client, action, community_id):
+        return client.post(reverse(f'communities:community-{action}', kwargs={'community_id': community_id}))
+    
+    def test_repeated_join_and_leave_count_once(self, authenticated_client, create_community):
+        """Test that retries change the counter only once"""
+        community = create_community(number_of_members=1)
+        
+        assert self.post(authenticated_client, 'join', community.id).data['message'] == 'Successfully joined community'
+        assert self.post(authenticated_client, 'join', community.id).data['message'] == 'Already a member'
+        community.refresh_from_db()
+        assert community.number_of_members == 2
+        
+        assert self.post(authenticated_client, 'leave', community.id).status_code == status.HTTP_200_OK
+        assert self.post(authenticated_client, 'leave', community.id).status_code == status.HTTP_400_BAD_REQUEST
+        community.refresh_from_db()
+        assert community.number_of_members == 1
+        assert not CommunityMember.objects.filter(community=community).exists()
+    
+    def test_missing_community(self, authenticated_client):
+        """Test that joining or leaving an unknown community is a 404 without writes"""
+        assert self.post(authenticated_client, 'join', 'nowhere').status_code == status.HTTP_404_NOT_FOUND
+        assert self.post(authenticated_client, 'leave', 'nowhere').status_code == status.HTTP_404_NOT_FOUND
+        assert not CommunityMember.objects.exists()
+    
+    def test_lost_join_races_are_retryable(self, authenticated_client, create_community, monkeypatch):
+        """Test that a join losing every attempt to concurrent leaves is a 409, not a 404"""
+        from communities import views
+        community = create_community()
+        monkeypatch.setattr(views, 'add_member', lambda user_id, community_id: None)
+        
+        response = self.post(authenticated_client, 'join', community.id)
+        
+        assert response.status_code == status.HTTP_409_CONFLICT
+    
+    def test_counter_update_skips_image_columns(self, authenticated_client, create_community):
+        """Test that only the counter and updated_at are written, and the ETag changes"""
+        community = create_community(image_url='data:image/png;base64,' + 'A' * 1000)
+        before = community.updated_at
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.post(authenticated_client, 'join', community.id)
+        
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        assert len(updates) == 1 and 'image' not in updates[0]
+        community.refresh_from_db()
+        assert community.updated_at > before
+        assert community.image_url.endswith('A' * 1000)
+    
+    def test_statements_per_request(self, authenticated_client, create_community):
+        """Test authentication plus two statements per click, none of them repeated on retries"""
+        community = create_community()
+        
+        def statements(action):
+            with CaptureQueriesContext(connection) as queries:
+                self.post(authenticated_client, action, community.id)
+            # Savepoints only exist because the test runs inside a transaction
+            return [query['sql'].split()[0] for query in queries if 'SAVEPOINT' not in query['sql']]
+        
+        assert statements('join') == ['SELECT', 'INSERT', 'UPDATE']
+        assert statements('join') == ['SELECT', 'INSERT', 'SELECT']
+        assert statements('leave') == ['SELECT', 'DELETE', 'UPDATE']
+
+
+@pytest.mark.django_db(transaction=True)
+class TestMembershipConcurrency:
+    """Test member counts under concurrent joins and leaves"""
+    
+    def test_count_matches_membership_rows(self, thread_db, create_user, create_community):
+        """Test number_of_members tracks COUNT(*) when every click is sent twice at once"""
+        community = create_community(number_of_members=1)
+        users = [create_user() for _ in range(4)]
+        errors = []
+        
+        def request(client, action):
+            url = reverse(f'communities:community-{action}', kwargs={'community_id': community.id})
+            # SQLite serializes writers; retry when the file lock is busy
+            for _ in range(50):
+                try:
+                    return client.post(url)
+                except OperationalError:
+                    time.sleep(0.01)
+            raise AssertionError('database stayed locked')
+        
+        def clicker(user):
+            client = APIClient()
+            client.force_authenticate(user=user)
+            try:
+                for action in ['join', 'leave', 'join', 'leave', 'join']:
+                    response = request(client, action)
+                    # The twin click (or a retry after a late lock error) may have done it already
+                    assert response.status_code in (
+                        status.HTTP_200_OK, status.HTTP_400_BAD_REQUEST, status.HTTP_409_CONFLICT
+                    )
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=clicker, args=(user,)) for user in users for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert not errors
+        community.refresh_from_db()
+        assert community.number_of_members == 1 + CommunityMember.objects.filter(community=community).count()
+
+
 @pytest.mark.django_db
 class TestCommunityMembers:
     """Test community members functionality"""
@@ -261,3 +383,396 @@ class TestCommunityMembers:
         
         community.refresh_from_db()
         assert community.number_of_members == initial_count + 1
+
+
+@pytest.mark.django_db
+class TestCommunityListCache:
+    """Test versioned response cache on the community list"""
+    
+    def test_join_invalidates_list(self, authenticated_client, create_community, django_capture_on_commit_callbacks):
+        """Test that member counts are fresh after a join"""
+        create_community(id='cachecomm')
+        url = reverse('communities:community-list')
+        assert authenticated_client.get(url).data[0]['numberOfMembers'] == 1
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.post(reverse('communities:community-join', kwargs={'community_id': 'cachecomm'}))
+        
+        assert authenticated_client.get(url).data[0]['numberOfMembers'] == 2
+        
+    def test_detail_not_modified_until_join(self, authenticated_client, create_community):
+        """Test conditional GET on community detail around a join"""
+        create_community(id='cachecomm')
+        url = reverse('communities:community-detail', kwargs={'id': 'cachecomm'})
+        etag = authenticated_client.get(url)['ETag']
+        
+        assert authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+        
+        authenticated_client.post(reverse('communities:community-join', kwargs={'community_id': 'cachecomm'}))
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['numberOfMembers'] == 2
+
+
+@pytest.mark.django_db
+class TestCommunitySnippetCache:
+    """Test the per-user cache of community snippets"""
+    
+    @pytest.fixture
+    def client(self, create_user):
+        # Session-less auth, so only snippet queries are counted
+        client = APIClient()
+        client.user = create_user()
+        client.force_authenticate(client.user)
+        return client
+    
+    def snippet_ids(self, client):
+        return [snippet['communityId'] for snippet in client.get(reverse('communities:user-communities')).data]
+    
+    def test_steady_state_runs_no_queries(self, client, create_community, django_assert_num_queries):
+        """Test that repeated loads are served from the cache"""
+        CommunityMember.objects.create(user=client.user, community=create_community(id='cachecomm'))
+        assert self.snippet_ids(client) == ['cachecomm']
+        
+        with django_assert_num_queries(0):
+            assert self.snippet_ids(client) == ['cachecomm']
+    
+    def test_private_and_revalidated(self, client):
+        """Test that shared caches never store one user's snippets"""
+        response = client.get(reverse('communities:user-communities'))
+        
+        assert 'private' in response['Cache-Control']
+        assert 'no-cache' in response['Cache-Control']
+        
+    def test_snippets_are_per_user(self, client, create_user, create_community):
+        """Test that one user's cached list is never served to another"""
+        CommunityMember.objects.create(user=client.user, community=create_community(id='cachecomm'))
+        assert self.snippet_ids(client) == ['cachecomm']
+        
+        other = APIClient()
+        other.force_authenticate(create_user())
+        
+        assert self.snippet_ids(other) == []
+    
+    def test_join_and_leave_invalidate(self, client, create_community, django_capture_on_commit_callbacks):
+        """Test that the list follows the user's own joins and leaves"""
+        create_community(id='cachecomm')
+        assert self.snippet_ids(client) == []
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse('communities:community-join', kwargs={'community_id': 'cachecomm'}))
+        assert self.snippet_ids(client) == ['cachecomm']
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse('communities:community-leave', kwargs={'community_id': 'cachecomm'}))
+        assert self.snippet_ids(client) == []
+    
+    def test_created_community_invalidates(self, client, django_capture_on_commit_callbacks):
+        """Test that the creator sees a new community right away"""
+        assert self.snippet_ids(client) == []
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse('communities:community-list'), {'id': 'cachecomm', 'privacyType': 'public'})
+        
+        assert self.snippet_ids(client) == ['cachecomm']
+    
+    def test_image_change_invalidates_members(self, client, create_user, create_community,
+                                               django_capture_on_commit_callbacks):
+        """Test that every member's snippets show a new community image"""
+        community = create_community(id='cachecomm', image_url='https://example.com/old.png')
+        CommunityMember.objects.create(user=client.user, community=community)
+        url = reverse('communities:user-communities')
+        assert client.get(url).data[0]['imageURL'] == 'https://example.com/old.png'
+        
+        moderator = APIClient()
+        moderator.force_authenticate(community.creator)
+        with django_capture_on_commit_callbacks(execute=True):
+            moderator.patch(
+                reverse('communities:community-detail', kwargs={'id': 'cachecomm'}),
+                {'image_url': 'https://example.com/new.png'},
+            )
+        
+        assert client.get(url).data[0]['imageURL'] == 'https://example.com/new.png'
+
+
+@pytest.mark.django_db
+class TestCommunityLeaderboard:
+    """Test ?top=N and keyset pages of the community directory"""
+    
+    def top(self, client, n):
+        return [item['id'] for item in client.get(reverse('communities:community-list'), {'top': n}).data]
+    
+    def test_top_largest_first(self, api_client, create_community):
+        """Test that ?top=N returns the N largest communities in order"""
+        for name, members in [('small', 1), ('large', 30), ('medium', 10), ('tied-a', 10)]:
+            create_community(id=name, number_of_members=members)
+        
+        assert self.top(api_client, 3) == ['large', 'tied-a', 'medium']
+        assert self.top(api_client, 10) == ['large', 'tied-a', 'medium', 'small']
+    
+    def test_invalid_top(self, api_client):
+        """Test that top must be a number between 1 and the leaderboard size"""
+        url = reverse('communities:community-list')
+        
+        for value in ['0', str(leaderboard.LEADERBOARD_SIZE + 1), 'five']:
+            assert api_client.get(url, {'top': value}).status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_join_patches_leaderboard(self, authenticated_client, create_community,
+                                      django_capture_on_commit_callbacks, django_assert_num_queries):
+        """Test that a join reorders the cached leaderboard without re-sorting the table"""
+        create_community(id='first', number_of_members=2)
+        create_community(id='second', number_of_members=2)
+        assert self.top(authenticated_client, 2) == ['second', 'first']
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.post(reverse('communities:community-join', kwargs={'community_id': 'first'}))
+        
+        assert leaderboard.leaderboard() == [('first', 3), ('second', 2)]
+        # Only the rows themselves are read, by primary key, then the response is cached
+        anonymous = APIClient()
+        with django_assert_num_queries(1):
+            assert self.top(anonymous, 2) == ['first', 'second']
+        with django_assert_num_queries(0):
+            assert self.top(anonymous, 2) == ['first', 'second']
+    
+    def test_patched_boundaries(self, monkeypatch):
+        """Test entries entering, leaving and dropping to the end of a full board"""
+        monkeypatch.setattr(leaderboard, 'LEADERBOARD_SIZE', 3)
+        board = [('a', 9), ('b', 5), ('c', 3)]
+        
+        assert leaderboard.patched(board, 'd', 6) == [('a', 9), ('d', 6), ('b', 5)]
+        assert leaderboard.patched(board, 'd', 2) == board
+        assert leaderboard.patched(board, 'a', 4) == [('b', 5), ('a', 4), ('c', 3)]
+        # An unlisted community may now rank above 'c'
+        assert leaderboard.patched(board, 'c', 2) is None
+        assert leaderboard.patched(board[:2], 'c', 1) == [('a', 9), ('b', 5), ('c', 1)]
+    
+    def test_dropped_board_is_rebuilt(self, create_community, django_capture_on_commit_callbacks, monkeypatch):
+        """Test that an unknown ranking is read again from the table"""
+        monkeypatch.setattr(leaderboard, 'LEADERBOARD_SIZE', 2)
+        for name, members in [('a', 5), ('b', 4), ('c', 3)]:
+            create_community(id=name, number_of_members=members)
+        assert leaderboard.leaderboard() == [('a', 5), ('b', 4)]
+        
+        community = Community.objects.get(id='b')
+        community.number_of_members = 1
+        community.save()
+        with django_capture_on_commit_callbacks(execute=True):
+            leaderboard.rank_community(community)
+        
+        assert leaderboard.leaderboard() == [('a', 5), ('c', 3)]
+    
+    def test_patches_do_not_postpone_rebuild(self, create_community, django_capture_on_commit_callbacks, settings):
+        """Test that the board is read again once it is older than the refresh interval"""
+        from django.core.cache import cache
+        settings.COMMUNITY_LEADERBOARD_REFRESH = 300
+        community = create_community(id='a', number_of_members=5)
+        assert leaderboard.leaderboard() == [('a', 5)]
+        entry = cache.get(leaderboard.LEADERBOARD_KEY)
+        cache.set(leaderboard.LEADERBOARD_KEY, {**entry, 'built_at': entry['built_at'] - 299})
+        
+        community.number_of_members = 6
+        with django_capture_on_commit_callbacks(execute=True):
+            leaderboard.rank_community(community)
+        assert cache.get(leaderboard.LEADERBOARD_KEY)['built_at'] == entry['built_at'] - 299
+        
+        cache.set(leaderboard.LEADERBOARD_KEY, {**entry, 'built_at': entry['built_at'] - 301})
+        create_community(id='b', number_of_members=9)
+        
+        assert leaderboard.leaderboard() == [('b', 9), ('a', 5)]
+    
+    def test_directory_keyset_pages(self, api_client, create_community):
+        """Test that ?cursor= pages through every community in leaderboard order"""
+        for index in range(5):
+            create_community(id=f'dir-{index}', number_of_members=index % 3)
+        
+        seen = []
+        url, params = reverse('communities:community-list'), {'cursor': '', 'limit': 2}
+        while url:
+            data = api_client.get(url, params).data
+            seen.extend(item['id'] for item in data['results'])
+            url, params = data['next'], None
+        
+        assert seen == ['dir-2', 'dir-4', 'dir-1', 'dir-3', 'dir-0']
+        assert [item['id'] for item in api_client.get(reverse('communities:community-list')).data] == seen
+
+
+@pytest.mark.django_db
+class TestCommunityDirectUpload:
+    """Test setting a community image from a direct upload key"""
+    
+    def test_patch_with_uploaded_key(self, authenticated_client, create_community, s3_stub):
+        """Test that moderators can switch the image to a verified key"""
+        community = create_community(creator=authenticated_client.user)
+        key = f'communities/{authenticated_client.user.pk}/{"d" * 32}.webp'
+        header = b'RIFF\x00\x00\x00\x00WEBPVP8 '
+        s3_stub.add_response('head_object', {'ContentLength': 100, 'ContentType': 'image/webp'})
+        s3_stub.add_response('get_object', {'Body': StreamingBody(io.BytesIO(header), len(header))})
+        
+        url = reverse('communities:community-detail', kwargs={'id': community.id})
+        response = authenticated_client.patch(url, {'image_key': key}, format='json')
+        
+        assert response.status_code == status.HTTP_200_OK
+        community.refresh_from_db()
+        assert community.image.name == key
+
+
+
+@pytest.mark.django_db
+class TestCommunityAutocomplete:
+    """Test community name prefix autocomplete"""
+    
+    def get(self, client, **params):
+        return client.get(reverse('communities:community-autocomplete'), params)
+    
+    def test_prefix_ranked_by_members(self, api_client, create_community):
+        """Test that matches are case-insensitive and largest first"""
+        create_community(id='python', number_of_members=50)
+        create_community(id='PythonJobs', number_of_members=200)
+        create_community(id='pytorch', number_of_members=10)
+        create_community(id='rust', number_of_members=500)
+        
+        response = self.get(api_client, q='PYT')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == [
+            {'id': 'PythonJobs', 'numberOfMembers': 200},
+            {'id': 'python', 'numberOfMembers': 50},
+            {'id': 'pytorch', 'numberOfMembers': 10},
+        ]
+        assert [item['id'] for item in self.get(api_client, q='pyth', limit=1).data] == ['PythonJobs']
+        assert self.get(api_client, q='go').data == []
+        assert self.get(api_client, q='').data == []
+    
+    def test_served_from_memory(self, api_client, create_community, django_assert_num_queries):
+        """Test that only the first query reads the database"""
+        create_community(id='chess')
+        self.get(api_client, q='c')
+        
+        with django_assert_num_queries(0):
+            assert self.get(api_client, q='ch').data[0]['id'] == 'chess'
+            assert self.get(api_client, q='che').data[0]['id'] == 'chess'
+    
+    def test_create_and_join_update_index(self, authenticated_client, create_community, django_capture_on_commit_callbacks):
+        """Test that a new community and a join show up without a rebuild"""
+        create_community(id='gardening', number_of_members=5)
+        assert [item['id'] for item in self.get(authenticated_client, q='gar').data] == ['gardening']
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.post(reverse('communities:community-list'), {'id': 'garage', 'privacyType': 'public'}, format='json')
+            authenticated_client.post(reverse('communities:community-join', kwargs={'community_id': 'gardening'}))
+        
+        assert self.get(authenticated_client, q='gar').data == [
+            {'id': 'gardening', 'numberOfMembers': 6},
+            {'id': 'garage', 'numberOfMembers': 1},
+        ]
+    
+    def test_refresh_picks_up_other_workers(self, api_client, create_community, settings):
+        """Test that the index is rebuilt once it is older than the refresh interval"""
+        create_community(id='hiking')
+        self.get(api_client, q='h')
+        create_community(id='history')
+        
+        assert [item['id'] for item in self.get(api_client, q='hi').data] == ['hiking']
+        
+        settings.COMMUNITY_AUTOCOMPLETE_REFRESH = -1
+        assert {item['id'] for item in self.get(api_client, q='hi').data} == {'hiking', 'history'}
+    
+    def test_join_patches_count_in_place(self, authenticated_client, create_community,
+                                         django_capture_on_commit_callbacks):
+        """Test that a join updates the built snapshot without copying it"""
+        create_community(id='knitting', number_of_members=3)
+        create_community(id='kayaking', number_of_members=3)
+        assert self.get(authenticated_client, q='k').data[0]['id'] == 'kayaking'
+        snapshot = community_index.get()
+        members = snapshot.members
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.post(reverse('communities:community-join', kwargs={'community_id': 'knitting'}))
+        
+        assert community_index.get() is snapshot and snapshot.members is members
+        # The cached one-letter ranking was dropped
+        assert self.get(authenticated_client, q='k').data[0] == {'id': 'knitting', 'numberOfMembers': 4}
+    
+    def test_stale_index_served_during_rebuild(self, api_client, create_community, settings,
+                                               django_assert_num_queries):
+        """Test that readers do not wait for a refresh another thread is running"""
+        create_community(id='sailing')
+        self.get(api_client, q='s')
+        create_community(id='surfing')
+        settings.COMMUNITY_AUTOCOMPLETE_REFRESH = -1
+        
+        with community_index._build_lock, django_assert_num_queries(0):
+            assert [item['id'] for item in self.get(api_client, q='s').data] == ['sailing']
+        
+        assert {item['id'] for item in self.get(api_client, q='s').data} == {'sailing', 'surfing'}
+    
+    def test_changes_during_rebuild_are_kept(self, create_community, monkeypatch, settings):
+        """Test that a join applied while a rebuild loads survives the swap"""
+        create_community(id='rowing', number_of_members=2)
+        community_index.get()
+        settings.COMMUNITY_AUTOCOMPLETE_REFRESH = -1
+        load = community_index._load
+        
+        def load_then_join():
+            snapshot = load()
+            community_index.put('rowing', 3)
+            return snapshot
+        
+        monkeypatch.setattr(community_index, '_load', load_then_join)
+        
+        assert community_index.search('row') == [('rowing', 3)]
+    
+    def test_names_differing_in_case(self):
+        """Test that index updates keep case variants of a name apart"""
+        index = PrefixIndex([('python', 5), ('rust', 1)])
+        index = index.with_entry('Python', 9).with_entry('python', 7)
+        
+        assert index.search('py') == [('Python', 9), ('python', 7)]
+        assert len(index) == 3
+    
+    def test_database_fallback(self, api_client, create_community, settings):
+        """Test the same ranking when the in-memory index is disabled"""
+        settings.COMMUNITY_AUTOCOMPLETE_IN_MEMORY = False
+        create_community(id='Cycling', number_of_members=3)
+        create_community(id='cyclists', number_of_members=3)
+        create_community(id='cycles', number_of_members=9)
+        
+        assert [item['id'] for item in self.get(api_client, q='cyc').data] == ['cycles', 'Cycling', 'cyclists']
+
+
+@pytest.mark.django_db
+class TestCommunityQueryCounts:
+    """Test that community endpoints run a fixed number of queries however many rows they return"""
+    
+    @pytest.mark.parametrize('rows', [1, 5])
+    def test_community_list(self, api_client, create_community, django_assert_num_queries, rows):
+        """Test that the list does not load each creator"""
+        for _ in range(rows):
+            create_community()
+        
+        with django_assert_num_queries(1):
+            response = api_client.get(reverse('communities:community-list'))
+        
+        assert len(response.data) == rows
+    
+    def test_community_detail(self, api_client, create_community, django_assert_num_queries):
+        """Test the detail with its conditional GET validators"""
+        community = create_community()
+        
+        with django_assert_num_queries(2):
+            response = api_client.get(reverse('communities:community-detail', kwargs={'id': community.id}))
+        
+        assert response.data['creatorId'] == community.creator_id
+    
+    @pytest.mark.parametrize('rows', [1, 5])
+    def test_user_snippets(self, authenticated_client, create_community, django_assert_num_queries, rows):
+        """Test that snippets read memberships and communities together"""
+        for _ in range(rows):
+            CommunityMember.objects.create(user=authenticated_client.user, community=create_community())
+        
+        with django_assert_num_queries(2):
+            response = authenticated_client.get(reverse('communities:user-communities'))
+        
+        assert len(response.data) == rows
@@ -3,6 +3,7 @@ from .views import (
     CommunityListCreateView,
     CommunityDetailView,
     UserCommunitiesView,
+    community_autocomplete,
     join_community,
     leave_community
 )
@@ -11,6 +12,7 @@ app_name = 'communities'
 
 urlpatterns = [
     path('', CommunityListCreateView.as_view(), name='community-list'),
+    path('autocomplete/', community_autocomplete, name='community-autocomplete'),
     path('<str:id>/', CommunityDetailView.as_view(), name='community-detail'),
     path('user/snippets/', UserCommunitiesView.as_view(), name='user-communities'),
     path('<str:community_id>/join/', join_community, name='community-join'),
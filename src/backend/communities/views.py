@@ -1,10 +1,27 @@
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.db import transaction
-from django.shortcuts import get_object_or_404
+from django.http import Http404
+from django.utils.cache import patch_cache_control
 from .models import Community, CommunityMember
+from reddit_api.cache import (
+    COMMUNITY_IMAGES_NAMESPACE,
+    COMMUNITY_LIST_NAMESPACE,
+    ConditionalRetrieveMixin,
+    VersionedCacheMixin,
+    community_snippets_namespace,
+    invalidate_community_images,
+    invalidate_community_list,
+    invalidate_community_snippets,
+    invalidate_post_lists,
+)
+from reddit_api.image_variants import schedule_variants
+from reddit_api.pagination import KeysetPagination
+from .autocomplete import MAX_RESULTS, autocomplete, index_community
+from .leaderboard import LEADERBOARD_SIZE, rank_community, top_community_ids
+from .memberships import add_member, remove_member
 from .serializers import (
     CommunitySerializer,
     CommunitySnippetSerializer,
@@ -12,19 +29,61 @@ from .serializers import (
 )
 
 
-class CommunityListCreateView(generics.ListCreateAPIView):
-    """List all communities or create a new one"""
-    queryset = Community.objects.all().order_by('-number_of_members')
+class CommunityListCreateView(VersionedCacheMixin, generics.ListCreateAPIView):
+    """
+    List communities, largest first, or create a new one. ``?top=N``
+    returns the N largest from the cached leaderboard.
+    """
     serializer_class = CommunitySerializer
-    pagination_class = None  # Disable pagination for communities list
+    # Plain array by default (frontend expects it); ?cursor= opts into keyset pages
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-number_of_members', '-id')
+    
+    def get_top(self):
+        top = self.request.query_params.get('top')
+        if top is None:
+            return None
+        try:
+            top = int(top)
+        except ValueError:
+            top = 0
+        if not 1 <= top <= LEADERBOARD_SIZE:
+            raise ValidationError({'top': f'Must be between 1 and {LEADERBOARD_SIZE}.'})
+        return top
+    
+    def get_queryset(self):
+        top = self.get_top()
+        if top is None:
+            return Community.objects.order_by(*self.keyset_ordering)
+        # Order from the leaderboard, rows by primary key: no table sort
+        ids = top_community_ids(top)
+        rows = Community.objects.in_bulk(ids)
+        return [rows[name] for name in ids if name in rows]
+    
+    def paginate_queryset(self, queryset):
+        if self.get_top() is not None:
+            return None
+        return super().paginate_queryset(queryset)
     
     def get_permissions(self):
         if self.request.method == 'POST':
             return [IsAuthenticated()]
         return [AllowAny()]
+    
+    def get_cache_namespaces(self):
+        return [COMMUNITY_LIST_NAMESPACE]
+    
+    def perform_create(self, serializer):
+        community = serializer.save()
+        schedule_variants(community)
+        invalidate_community_list()
+        # The creator joins as moderator
+        invalidate_community_snippets(community.creator_id)
+        index_community(community)
+        rank_community(community)
 
 
-class CommunityDetailView(generics.RetrieveUpdateAPIView):
+class CommunityDetailView(ConditionalRetrieveMixin, generics.RetrieveUpdateAPIView):
     """Get or update community details"""
     queryset = Community.objects.all()
     serializer_class = CommunitySerializer
@@ -35,6 +94,17 @@ class CommunityDetailView(generics.RetrieveUpdateAPIView):
             return [IsAuthenticated()]
         return [AllowAny()]
     
+    def get_validators(self):
+        # Every change, including member count, saves the row
+        updated_at = (
+            Community.objects.filter(id=self.kwargs['id'])
+            .values_list('updated_at', flat=True)
+            .first()
+        )
+        if updated_at is None:
+            return None
+        return (updated_at.isoformat(),), updated_at
+    
     def perform_update(self, serializer):
         """Only allow creator or moderator to update community"""
         community = self.get_object()
@@ -52,44 +122,71 @@ class CommunityDetailView(generics.RetrieveUpdateAPIView):
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied("Only moderators can update community details")
         
-        serializer.save()
+        image = (community.image.name, community.image_url)
+        updated = serializer.save()
+        schedule_variants(updated)
+        invalidate_community_list()
+        # Posts embed the community image
+        invalidate_post_lists(community.id)
+        if (updated.image.name, updated.image_url) != image:
+            # So do the snippets of every member
+            invalidate_community_images()
 
 
-class UserCommunitiesView(generics.ListAPIView):
-    """Get user's joined communities (snippets)"""
+class UserCommunitiesView(VersionedCacheMixin, generics.ListAPIView):
+    """
+    Get user's joined communities (snippets). The serialized list is cached
+    per user until they join or leave a community, or a community image
+    changes.
+    """
     serializer_class = CommunitySnippetSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = None  # Disable pagination - frontend expects plain array
     
+    def get_cache_namespaces(self):
+        return [community_snippets_namespace(self.request.user.id), COMMUNITY_IMAGES_NAMESPACE]
+    
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        # Per-user data: browsers may keep it, shared caches must not
+        patch_cache_control(response, private=True)
+        return response
+    
     def get_queryset(self):
-        return CommunityMember.objects.filter(user=self.request.user)
+        # The snippet embeds the community image
+        return CommunityMember.objects.filter(user=self.request.user).select_related('community')
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def join_community(request, community_id):
     """Join a community"""
-    community = get_object_or_404(Community, id=community_id)
-    
-    # Check if already a member
-    existing_membership = CommunityMember.objects.filter(user=request.user, community=community).first()
-    if existing_membership:
-        # Return success if already member (idempotent operation)
-        return Response({
-            'message': 'Already a member',
-            'is_moderator': existing_membership.is_moderator
-        })
-    
-    with transaction.atomic():
-        # Create membership
-        CommunityMember.objects.create(
-            user=request.user,
-            community=community
+    # A concurrent leave can remove the membership that blocked the insert
+    for _ in range(3):
+        members = add_member(request.user.id, community_id)
+        if members is not None:
+            break
+        is_moderator = (
+            CommunityMember.objects.filter(user=request.user, community_id=community_id)
+            .values_list('is_moderator', flat=True)
+            .first()
+        )
+        if is_moderator is not None:
+            # Return success if already member (idempotent operation)
+            return Response({
+                'message': 'Already a member',
+                'is_moderator': is_moderator
+            })
+        if not Community.objects.filter(id=community_id).exists():
+            raise Http404
+    else:
+        # Every attempt lost to a concurrent leave; the community exists
+        return Response(
+            {'error': 'Membership changed concurrently, please retry'},
+            status=status.HTTP_409_CONFLICT
         )
-        # Increment member count
-        community.number_of_members += 1
-        community.save()
     
+    _membership_changed(request.user.id, community_id, members)
     return Response({'message': 'Successfully joined community'})
 
 
@@ -97,26 +194,40 @@ def join_community(request, community_id):
 @permission_classes([IsAuthenticated])
 def leave_community(request, community_id):
     """Leave a community"""
-    community = get_object_or_404(Community, id=community_id)
-    
-    # Get membership
-    membership = CommunityMember.objects.filter(
-        user=request.user,
-        community=community
-    ).first()
-    
-    if not membership:
+    members = remove_member(request.user.id, community_id)
+    if members is None:
+        if not Community.objects.filter(id=community_id).exists():
+            raise Http404
         return Response(
             {'error': 'Not a member'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    with transaction.atomic():
-        # Delete membership
-        membership.delete()
-        # Decrement member count
-        community.number_of_members -= 1
-        community.save()
-    
+    _membership_changed(request.user.id, community_id, members)
     return Response({'message': 'Successfully left community'})
 
+
+def _membership_changed(user_id, community_id, members):
+    invalidate_community_list()
+    invalidate_community_snippets(user_id)
+    # Only the name and member count are read
+    community = Community(id=community_id, number_of_members=members)
+    index_community(community)
+    rank_community(community)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def community_autocomplete(request):
+    """Community names starting with ?q=, largest communities first"""
+    prefix = request.query_params.get('q', '').strip()
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 10)), MAX_RESULTS))
+    except ValueError:
+        limit = 10
+    if not prefix:
+        return Response([])
+    return Response([
+        {'id': name, 'numberOfMembers': members}
+        for name, members in autocomplete(prefix, limit)
+    ])
@@ -12,28 +12,16 @@ fake = Faker()
 
 
 @pytest.fixture(scope='session')
-def django_db_setup():
-    """Configure test database"""
+def django_db_modify_db_settings(tmp_path_factory):
+    """
+    Run the suite against a throwaway database, never the one DATABASE_URL
+    names: transactional tests flush every table on teardown. SQLite gets a
+    temporary file, so threads in those tests can share it.
+    """
     from django.conf import settings
-    settings.DATABASES['default'] = {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': ':memory:',
-        'ATOMIC_REQUESTS': False,
-        'AUTOCOMMIT': True,
-        'CONN_MAX_AGE': 0,
-        'OPTIONS': {},
-        'TIME_ZONE': None,
-        'USER': '',
-        'PASSWORD': '',
-        'HOST': '',
-        'PORT': '',
-        'TEST': {
-            'CHARSET': None,
-            'COLLATION': None,
-            'NAME': None,
-            'MIRROR': None,
-        },
-    }
+    database = settings.DATABASES['default']
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database.setdefault('TEST', {})['NAME'] = str(tmp_path_factory.mktemp('db') / 'test.sqlite3')
 
 
 @pytest.fixture(autouse=True)
@@ -42,6 +30,58 @@ def enable_db_access_for_all_tests(db):
     pass
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with an empty response cache"""
+    from django.core.cache import cache
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def response_cache(settings):
+    """Cache list responses, as with a shared DJANGO_CACHE_URL in production"""
+    settings.API_RESPONSE_CACHE = True
+
+
+@pytest.fixture(autouse=True)
+def clear_community_index():
+    """Start every test without an in-memory autocomplete index"""
+    from communities.autocomplete import community_index
+    community_index.clear()
+
+
+@pytest.fixture
+def thread_db(monkeypatch):
+    """Let worker threads open connections to the test database"""
+    from django.conf import settings
+    from django.db import connection
+    monkeypatch.setitem(settings.DATABASES, 'default', connection.settings_dict)
+
+
+@pytest.fixture
+def s3_stub(settings):
+    """
+    Switch media storage to MediaStorage pointed at a local S3 stand-in and
+    stub its client, so S3 calls are checked without network access.
+    Yields the botocore Stubber; queue responses with ``add_response``.
+    """
+    from botocore.stub import Stubber
+    from django.core.files.storage import default_storage
+    settings.AWS_STORAGE_BUCKET_NAME = 'test-bucket'
+    settings.AWS_ACCESS_KEY_ID = 'test'
+    settings.AWS_SECRET_ACCESS_KEY = 'test'
+    settings.AWS_S3_REGION_NAME = 'us-east-1'
+    settings.AWS_S3_ENDPOINT_URL = 'http://s3.test:9000'
+    settings.AWS_QUERYSTRING_AUTH = False
+    settings.STORAGES = {
+        **settings.STORAGES,
+        'default': {'BACKEND': 'reddit_api.storage_backends.MediaStorage'},
+    }
+    with Stubber(default_storage.connection.meta.client) as stubber:
+        yield stubber
+        stubber.assert_no_pending_responses()
+
+
 @pytest.fixture
 def api_client():
     """Return API client"""
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import StoredImage
+
+
+@admin.register(StoredImage)
+class StoredImageAdmin(admin.ModelAdmin):
+    list_display = ['name', 'refcount', 'created_at', 'updated_at']
+    search_fields = ['name']
+    readonly_fields = ['created_at', 'updated_at']
@@ -0,0 +1,107 @@
+"""
+Content-addressed, reference-counted image storage
+
+``ContentAddressedImageField`` is a drop-in ``ImageField`` that stores each
+upload under the SHA-256 of its bytes, e.g. ``posts/3f/3fa9...c1.jpg``.
+Uploading an image that is already stored only writes the row: no object is
+sent to the storage backend. Every row naming a file holds one reference in
+``StoredImage``; files left without references are deleted by
+``manage.py collect_unused_images``.
+"""
+import hashlib
+import os
+
+from django.db.models.fields.files import ImageField, ImageFieldFile
+from django.db.models.signals import post_delete, post_init, post_save
+
+from .models import StoredImage
+
+
+def content_digest(content):
+    """SHA-256 of a file, taken from the upload handler when it hashed it already"""
+    digest = getattr(content, 'sha256', None)
+    if digest:
+        return digest
+    sha256 = hashlib.sha256()
+    for chunk in content.chunks():
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def store_content(field, instance, name, content):
+    """
+    Store ``content`` under its content address and return the storage name.
+    An identical file already tracked in ``StoredImage`` is reused instead of
+    uploaded again.
+    """
+    digest = content_digest(content)
+    extension = os.path.splitext(name)[1].lower()
+    target = field.generate_filename(instance, f'{digest[:2]}/{digest}{extension}')
+    # Touching the row also keeps the garbage collector off it for a grace period
+    if StoredImage.touch(target):
+        return target
+    # Untracked: the collector may have deleted the row and be about to
+    # delete the file, so never rely on one still being there. The storage
+    # backends do not overwrite, so a leftover file makes this save pick
+    # another name instead of being deleted underneath it.
+    saved = field.storage.save(target, content, max_length=field.max_length)
+    StoredImage.track(saved)
+    return saved
+
+
+class ContentAddressedFieldFile(ImageFieldFile):
+    def save(self, name, content, save=True):
+        self.name = store_content(self.field, self.instance, name, content)
+        setattr(self.instance, self.field.attname, self.name)
+        self._committed = True
+        if save:
+            self.instance.save()
+
+    save.alters_data = True
+
+
+class ContentAddressedImageField(ImageField):
+    attr_class = ContentAddressedFieldFile
+
+    def contribute_to_class(self, cls, name, **kwargs):
+        super().contribute_to_class(cls, name, **kwargs)
+        if not cls._meta.abstract:
+            post_init.connect(self._remember_name, sender=cls, weak=False)
+            post_save.connect(self._update_references, sender=cls, weak=False)
+            post_delete.connect(self._release_reference, sender=cls, weak=False)
+
+    @property
+    def _stored_key(self):
+        return f'_stored_{self.attname}'
+
+    def _current_name(self, instance):
+        # Deferred (``.only()``) instances did not load the column
+        if self.attname not in instance.__dict__:
+            return None
+        value = getattr(instance, self.attname)
+        return value.name if value else None
+
+    def _remember_name(self, sender, instance, **kwargs):
+        if self.attname in instance.__dict__:
+            instance.__dict__[self._stored_key] = self._current_name(instance)
+
+    def _update_references(self, sender, instance, created=False, raw=False, update_fields=None,
+                           **kwargs):
+        if raw or self.attname not in instance.__dict__:
+            return
+        if update_fields is not None and self.name not in update_fields:
+            return
+        previous = None if created else instance.__dict__.get(self._stored_key)
+        current = self._current_name(instance)
+        # Runs inside the save's transaction, so counts roll back with the row
+        if current != previous:
+            if current:
+                StoredImage.acquire(current)
+            if previous:
+                StoredImage.release(previous)
+        instance.__dict__[self._stored_key] = current
+
+    def _release_reference(self, sender, instance, **kwargs):
+        name = instance.__dict__.get(self._stored_key, self._current_name(instance))
+        if name:
+            StoredImage.release(name)
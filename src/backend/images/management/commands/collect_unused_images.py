@@ -0,0 +1,75 @@
+"""
+Delete stored images that no row references any more
+
+    python manage.py collect_unused_images
+    python manage.py collect_unused_images --grace-hours 1 --dry-run
+
+An image is collected once its reference count has been zero for longer than
+the grace period (IMAGE_GC_GRACE_HOURS), which covers uploads whose row is
+not committed yet. Each row is removed with a conditional DELETE before its
+files, so an upload that reuses the image in the meantime keeps it. An
+upload arriving after the DELETE finds no row and saves its own copy, which
+storage gives a new name because the old file is still there.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from images.models import StoredImage
+from reddit_api.image_processing import FORMAT_EXTENSIONS
+
+
+class Command(BaseCommand):
+    help = 'Delete unreferenced images (and their variants) from media storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=float,
+            default=settings.IMAGE_GC_GRACE_HOURS,
+            help=f'Keep unreferenced images this long (default: {settings.IMAGE_GC_GRACE_HOURS})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of rows read per batch (default: 100)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List what would be deleted without deleting anything',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        unused = StoredImage.objects.filter(refcount=0, updated_at__lt=cutoff).order_by('pk')
+        deleted = 0
+        last_pk = None
+        while True:
+            batch = unused if last_pk is None else unused.filter(pk__gt=last_pk)
+            batch = list(batch.values_list('pk', 'name', 'variants')[:options['batch_size']])
+            if not batch:
+                break
+            for pk, name, variants in batch:
+                if options['dry_run']:
+                    self.stdout.write(name)
+                    deleted += 1
+                    continue
+                # Re-checked in the DELETE: a reference or reuse since the read wins
+                removed, _ = StoredImage.objects.filter(
+                    pk=pk, refcount=0, updated_at__lt=cutoff
+                ).delete()
+                if not removed:
+                    continue
+                default_storage.delete(name)
+                for fmt in FORMAT_EXTENSIONS:
+                    for variant in (variants or {}).get(fmt, {}).values():
+                        default_storage.delete(variant)
+                deleted += 1
+            last_pk = batch[-1][0]
+        verb = 'would be deleted' if options['dry_run'] else 'deleted'
+        self.stdout.write(self.style.SUCCESS(f'{deleted} unused images {verb}'))
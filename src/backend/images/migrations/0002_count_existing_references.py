@@ -0,0 +1,46 @@
+from collections import Counter
+
+from django.db import migrations
+
+# (app label, model, image field, variants field) of every ContentAddressedImageField
+IMAGE_FIELDS = [
+    ('posts', 'Post', 'image', 'image_variants'),
+    ('communities', 'Community', 'image', 'image_variants'),
+    ('users', 'User', 'photo', 'photo_variants'),
+]
+
+
+def count_references(apps, schema_editor):
+    """Track files uploaded before reference counting so they can be collected later"""
+    StoredImage = apps.get_model('images', 'StoredImage')
+    counts = Counter()
+    variants = {}
+    for app_label, model_name, field, variants_field in IMAGE_FIELDS:
+        model = apps.get_model(app_label, model_name)
+        rows = model._default_manager.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+        for name, row_variants in rows.values_list(field, variants_field).iterator():
+            counts[name] += 1
+            if (row_variants or {}).get('source') == name:
+                variants[name] = row_variants
+    StoredImage.objects.bulk_create(
+        [
+            StoredImage(name=name, refcount=count, variants=variants.get(name, {}))
+            for name, count in counts.items()
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('images', '0001_initial'),
+        ('posts', '0008_content_addressed_image'),
+        ('communities', '0006_content_addressed_image'),
+        ('users', '0004_content_addressed_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
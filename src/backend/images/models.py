@@ -0,0 +1,60 @@
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+class StoredImage(models.Model):
+    """
+    Reference count of a stored image file.
+
+    ``refcount`` is the number of rows whose image field names the file.
+    Files at zero references are deleted by ``collect_unused_images`` after a
+    grace period; ``updated_at`` is touched whenever a duplicate upload reuses
+    the file, which keeps it from being collected underneath that upload.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.IntegerField(default=0)
+    variants = models.JSONField(default=dict, blank=True)  # Resized copies, see reddit_api.image_variants
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def track(cls, name):
+        """Start tracking a newly stored file with no references yet"""
+        cls.objects.get_or_create(name=name)
+
+    @classmethod
+    def touch(cls, name):
+        """Mark ``name`` as in use by an upload; returns False if it is not tracked"""
+        return bool(cls.objects.filter(name=name).update(updated_at=timezone.now()))
+
+    @classmethod
+    def acquire(cls, name):
+        updated = cls.objects.filter(name=name).update(
+            refcount=F('refcount') + 1, updated_at=timezone.now()
+        )
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(name=name, refcount=1)
+        except IntegrityError:
+            # Another request tracked it first
+            cls.objects.filter(name=name).update(
+                refcount=F('refcount') + 1, updated_at=timezone.now()
+            )
+
+    @classmethod
+    def release(cls, name):
+        cls.objects.filter(name=name, refcount__gt=0).update(
+            refcount=F('refcount') - 1, updated_at=timezone.now()
+        )
+
+    def __str__(self):
+        return f'{self.name} ({self.refcount})'
+
+    class Meta:
+        db_table = 'stored_images'
+        indexes = [
+            models.Index(fields=['refcount', 'updated_at'], name='stored_images_unused_idx'),
+        ]
@@ -0,0 +1,259 @@
+"""
+Tests for Images app
+Coverage: Content-addressed storage, Reference counting, Garbage collection
+"""
+import hashlib
+import io
+import pytest
+from datetime import timedelta
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopFutureHandlers
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework import status
+from images import fields
+from images.models import StoredImage
+from images.upload_handlers import HashingMemoryFileUploadHandler
+from posts.models import Post
+from reddit_api import image_variants
+
+
+def make_png(color=(10, 120, 200)):
+    buffer = io.BytesIO()
+    Image.new('RGB', (60, 40), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def upload(data, name='picture.png'):
+    return SimpleUploadedFile(name, data, content_type='image/png')
+
+
+@pytest.fixture(autouse=True)
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+def stored_files(media):
+    return sorted(str(path.relative_to(media)) for path in media.rglob('*') if path.is_file())
+
+
+@pytest.mark.django_db
+class TestContentAddressedStorage:
+    """Test that identical uploads share one stored file"""
+    
+    def test_name_is_content_hash(self, create_post):
+        """Test that the stored name is derived from the bytes"""
+        data = make_png()
+        digest = hashlib.sha256(data).hexdigest()
+        
+        post = create_post(image=upload(data, 'Holiday Photo.PNG'))
+        
+        assert post.image.name == f'posts/{digest[:2]}/{digest}.png'
+    
+    def test_duplicate_upload_is_metadata_only(self, create_post, media, monkeypatch):
+        """Test that a second identical upload does not write to storage"""
+        data = make_png()
+        first = create_post(image=upload(data, 'a.png'))
+        storage = Post._meta.get_field('image').storage
+        
+        def fail(*args, **kwargs):
+            raise AssertionError('duplicate was uploaded again')
+        
+        monkeypatch.setattr(storage, 'save', fail)
+        second = create_post(image=upload(data, 'b.png'))
+        
+        assert second.image.name == first.image.name
+        assert stored_files(media) == [first.image.name]
+        assert StoredImage.objects.get(name=first.image.name).refcount == 2
+    
+    def test_shared_across_models(self, create_post, create_user):
+        """Test that each model keeps its own upload directory"""
+        data = make_png()
+        post = create_post(image=upload(data))
+        user = create_user(photo=upload(data))
+        
+        assert post.image.name.startswith('posts/')
+        assert user.photo.name.startswith('users/')
+        assert post.image.name.split('/')[-1] == user.photo.name.split('/')[-1]
+    
+    def test_upload_handler_hashes_stream(self):
+        """Test that the handler digest matches the uploaded bytes"""
+        data = make_png()
+        handler = HashingMemoryFileUploadHandler()
+        handler.handle_raw_input(None, {}, len(data), b'boundary')
+        with pytest.raises(StopFutureHandlers):
+            handler.new_file('image', 'picture.png', 'image/png', len(data))
+        handler.receive_data_chunk(data[:100], 0)
+        handler.receive_data_chunk(data[100:], 100)
+        
+        uploaded = handler.file_complete(len(data))
+        
+        assert uploaded.sha256 == hashlib.sha256(data).hexdigest()
+        assert uploaded.read() == data
+    
+    def test_multipart_request_uses_streamed_digest(self, authenticated_client, create_community, monkeypatch):
+        """Test that API uploads are not read a second time for hashing"""
+        community = create_community()
+        digests = []
+        original = fields.content_digest
+        
+        def record(content):
+            digests.append(getattr(content, 'sha256', None))
+            return original(content)
+        
+        monkeypatch.setattr(fields, 'content_digest', record)
+        data = make_png()
+        response = authenticated_client.post(reverse('posts:post-create'), {
+            'title': 'Picture', 'community_id': community.id, 'image': upload(data),
+        }, format='multipart')
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        assert digests == [hashlib.sha256(data).hexdigest()]
+
+
+@pytest.mark.django_db
+class TestReferenceCounting:
+    """Test StoredImage reference counts"""
+    
+    def test_replace_releases_previous(self, create_post):
+        """Test that replacing an image moves the reference"""
+        post = create_post(image=upload(make_png((1, 2, 3))))
+        old_name = post.image.name
+        
+        post.image = upload(make_png((4, 5, 6)))
+        post.save()
+        
+        assert StoredImage.objects.get(name=old_name).refcount == 0
+        assert StoredImage.objects.get(name=post.image.name).refcount == 1
+    
+    def test_unrelated_save_keeps_count(self, create_post):
+        """Test that saving other fields does not count the image again"""
+        post = create_post(image=upload(make_png()))
+        
+        post.title = 'Renamed'
+        post.save()
+        Post.objects.get(pk=post.pk).save()
+        
+        assert StoredImage.objects.get(name=post.image.name).refcount == 1
+    
+    def test_delete_releases(self, create_post):
+        """Test that deleting a row releases its image"""
+        data = make_png()
+        post = create_post(image=upload(data))
+        create_post(image=upload(data))
+        
+        post.delete()
+        
+        assert StoredImage.objects.get(name=post.image.name).refcount == 1
+    
+    def test_cascade_delete_releases(self, create_community, create_post):
+        """Test that rows removed by a cascade release their images"""
+        community = create_community(image=upload(make_png((9, 9, 9))))
+        post = create_post(community=community, image=upload(make_png()))
+        
+        community.delete()
+        
+        assert set(StoredImage.objects.values_list('name', 'refcount')) == {
+            (community.image.name, 0), (post.image.name, 0),
+        }
+    
+    def test_direct_upload_key_is_counted(self, create_post):
+        """Test that assigning an existing storage name takes a reference"""
+        post = create_post(image='posts/1/0123456789abcdef0123456789abcdef.jpg')
+        
+        assert StoredImage.objects.get(name=post.image.name).refcount == 1
+
+
+@pytest.mark.django_db
+class TestCollectUnusedImages:
+    """Test the collect_unused_images command"""
+    
+    def age(self, name, hours):
+        StoredImage.objects.filter(name=name).update(updated_at=timezone.now() - timedelta(hours=hours))
+    
+    def test_collects_only_expired_unreferenced(self, create_post, media):
+        """Test that referenced and recently released images are kept"""
+        kept = create_post(image=upload(make_png((1, 1, 1))))
+        recent = create_post(image=upload(make_png((2, 2, 2))))
+        expired = create_post(image=upload(make_png((3, 3, 3))))
+        image_variants.build_variants('posts.Post', expired.pk)
+        expired.refresh_from_db()
+        expired_name = expired.image.name
+        recent_name = recent.image.name
+        recent.delete()
+        expired.delete()
+        self.age(kept.image.name, 48)
+        self.age(expired_name, 48)
+        out = io.StringIO()
+        
+        call_command('collect_unused_images', stdout=out)
+        
+        assert stored_files(media) == sorted([kept.image.name, recent_name])
+        assert not StoredImage.objects.filter(name=expired_name).exists()
+        assert '1 unused images deleted' in out.getvalue()
+    
+    def test_dry_run_deletes_nothing(self, create_post, media):
+        """Test that --dry-run only lists candidates"""
+        post = create_post(image=upload(make_png()))
+        post.delete()
+        self.age(post.image.name, 48)
+        out = io.StringIO()
+        
+        call_command('collect_unused_images', '--dry-run', stdout=out)
+        
+        assert post.image.name in out.getvalue()
+        assert stored_files(media) == [post.image.name]
+    
+    def test_reupload_revives_released_image(self, create_post, media):
+        """Test that uploading a released image again protects it"""
+        data = make_png()
+        post = create_post(image=upload(data))
+        post.delete()
+        self.age(post.image.name, 48)
+        
+        again = create_post(image=upload(data))
+        call_command('collect_unused_images', stdout=io.StringIO())
+        
+        assert again.image.name == post.image.name
+        assert stored_files(media) == [post.image.name]
+    
+    def test_upload_racing_collection_keeps_its_file(self, create_post, media):
+        """Test that an upload between the collector's row and file deletes survives"""
+        data = make_png()
+        post = create_post(image=upload(data))
+        name = post.image.name
+        post.delete()
+        self.age(name, 48)
+        # The collector's conditional DELETE ran; its file delete has not yet
+        StoredImage.objects.filter(name=name).delete()
+        
+        again = create_post(image=upload(data))
+        Post._meta.get_field('image').storage.delete(name)
+        
+        assert again.image.name != name
+        assert stored_files(media) == [again.image.name]
+        assert StoredImage.objects.get(name=again.image.name).refcount == 1
+
+
+@pytest.mark.django_db
+class TestSharedVariants:
+    """Test that duplicate images reuse rendered variants"""
+    
+    def test_variants_rendered_once(self, create_post, monkeypatch):
+        """Test that a second row with the same image skips rendering"""
+        data = make_png()
+        first = create_post(image=upload(data))
+        second = create_post(image=upload(data))
+        variants = image_variants.build_variants('posts.Post', first.pk)
+        
+        def fail(*args, **kwargs):
+            raise AssertionError('rendered again')
+        
+        monkeypatch.setattr(image_variants, 'render_variants', fail)
+        
+        assert image_variants.build_variants('posts.Post', second.pk) == variants
+        second.refresh_from_db()
+        assert second.image_variants == variants
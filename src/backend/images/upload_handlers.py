@@ -0,0 +1,37 @@
+"""
+Upload handlers that hash files while the request body streams in
+
+The digest is attached as ``sha256`` to the resulting UploadedFile, so
+``ContentAddressedImageField`` does not have to read the file a second time.
+"""
+import hashlib
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+class HashingUploadMixin:
+    def new_file(self, *args, **kwargs):
+        self.sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # Only the handler that ends up storing the file hashes it; the
+        # memory handler passes chunks on once a file is too large for it
+        result = super().receive_data_chunk(raw_data, start)
+        if result is None:
+            self.sha256.update(raw_data)
+        return result
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded is not None:
+            uploaded.sha256 = self.sha256.hexdigest()
+        return uploaded
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    """Keeps small uploads in memory"""
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    """Streams large uploads to a temporary file"""
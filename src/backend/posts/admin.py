@@ -1,4 +1,5 @@
 from django.contrib import admin
+from search.backends import matching
 from .models import Post, PostVote
 
 
@@ -6,8 +7,15 @@ from .models import Post, PostVote
 class PostAdmin(admin.ModelAdmin):
     list_display = ['title', 'creator', 'community', 'vote_status', 'number_of_comments', 'created_at']
     list_filter = ['created_at', 'community']
-    search_fields = ['title', 'body', 'creator__email']
+    search_fields = ['creator__email']
     readonly_fields = ['created_at', 'edited_at']
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Title and body use the full-text index instead of LIKE '%term%' scans
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            results |= matching(queryset, search_term)
+        return results, may_have_duplicates
 
 
 @admin.register(PostVote)
@@ -0,0 +1,54 @@
+"""
+Home feed assembly - merges the newest posts of every joined community
+"""
+from django.db import connections
+
+from reddit_api.pagination import KeysetPagination
+
+
+class MergedFeedPagination(KeysetPagination):
+    """
+    Keyset pagination that k-way merges per-community post streams.
+
+    The view exposes the joined community ids as ``feed_partitions``. On
+    backends that allow LIMIT inside compound statements (PostgreSQL) each
+    community becomes its own ``ORDER BY created_at DESC LIMIT n`` branch of a
+    single UNION ALL, so every branch is a short index range scan and the
+    database merges the sorted heads. Other backends, or users in more than
+    ``max_merge_branches`` communities, use one ``community_id IN (...)`` scan.
+    Either way a page costs two queries: one for the ordered ids and one for
+    the posts themselves.
+    """
+    partition_field = 'community_id'
+    max_merge_branches = 100
+
+    def is_cursor_request(self, request):
+        # The feed is a new endpoint, so it always uses the cursor envelope
+        return True
+
+    def fetch_rows(self, queryset, position, limit, view=None):
+        partitions = list(getattr(view, 'feed_partitions', None) or [])
+        if not partitions:
+            return []
+        if position is not None:
+            queryset = queryset.filter(self.build_keyset_filter(position))
+
+        features = connections[queryset.db].features
+        if (
+            len(partitions) == 1
+            or not features.supports_slicing_ordering_in_compound
+            or len(partitions) > self.max_merge_branches
+        ):
+            merged = queryset.filter(**{f'{self.partition_field}__in': partitions})
+            ids = list(merged.values_list('id', flat=True)[:limit])
+        else:
+            keys = ['id'] + [field for field in self.fields if field != 'id']
+            heads = [
+                queryset.filter(**{self.partition_field: partition}).values(*keys)[:limit]
+                for partition in partitions
+            ]
+            merged = heads[0].union(*heads[1:], all=True).order_by(*self.ordering)
+            ids = [row['id'] for row in merged[:limit]]
+
+        posts = {post.id: post for post in queryset.filter(id__in=ids)}
+        return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,115 @@
+"""
+Compare feed-card serialization throughput: PostListSerializer over model
+instances versus PostCardSerializer over values_list() records
+
+    python manage.py benchmark_post_list                  # 1k, 10k and 100k rows
+    python manage.py benchmark_post_list --rows 5000 --repeat 5
+
+Synthetic posts are inserted inside a transaction that is rolled back
+afterwards; run it against a development database. Each measurement covers
+the query and the serialization, as in PostListView, and the best of
+--repeat runs is reported.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from communities.models import Community
+from posts.models import Post
+from posts.serializers import PostCardSerializer, PostListSerializer
+from users.models import User
+
+SEED_BATCH = 5000
+
+
+def seed_posts(count, communities=50):
+    """Bulk insert ``count`` feed posts with a mix of uploaded and legacy images"""
+    users = User.objects.bulk_create([
+        User(username=f'bench-user-{i}', email=f'bench-user-{i}@example.com')
+        for i in range(communities)
+    ])
+    groups = Community.objects.bulk_create([
+        Community(
+            id=f'bench-comm-{i}',
+            creator=users[i],
+            image=f'communities/bench-{i}.png' if i % 2 else None,
+            image_url=None if i % 2 else f'https://example.com/bench-{i}.png',
+        )
+        for i in range(communities)
+    ])
+    body = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 10
+    for start in range(0, count, SEED_BATCH):
+        Post.objects.bulk_create([
+            Post(
+                community=groups[i % communities],
+                creator=users[i % communities],
+                title=f'Benchmark post {i}',
+                body=body,
+                image=f'posts/bench-{i}.jpg' if i % 3 == 0 else None,
+                image_url='https://example.com/legacy.jpg' if i % 3 == 1 else None,
+                vote_status=i % 100,
+                number_of_comments=i % 20,
+            )
+            for i in range(start, min(start + SEED_BATCH, count))
+        ])
+
+
+def serialize_models(limit, context):
+    queryset = Post.objects.for_list().with_pending_votes().order_by('-created_at', '-id')[:limit]
+    return PostListSerializer(queryset, many=True, context=context).data
+
+
+def serialize_cards(limit, context):
+    queryset = Post.objects.for_list().with_pending_votes().order_by('-created_at', '-id').as_cards()[:limit]
+    return PostCardSerializer(queryset, many=True, context=context).data
+
+
+class Command(BaseCommand):
+    help = 'Measure rows/sec of the model and record feed-card serializers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 100000],
+            help='Row counts to serialize (default: 1000 10000 100000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs per measurement; the fastest is reported (default: 3)',
+        )
+        parser.add_argument(
+            '--host',
+            default='localhost',
+            help='Host for absolute image URLs; must be in ALLOWED_HOSTS (default: localhost)',
+        )
+
+    def best_of(self, function, rows, context, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            data = function(rows, context)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, data
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['rows'])
+        context = {'request': RequestFactory(HTTP_HOST=options['host']).get('/api/posts/')}
+        self.stdout.write(f'{"rows":>8}  {"before rows/s":>14}  {"after rows/s":>14}  {"speedup":>8}')
+        with transaction.atomic():
+            seed_posts(sizes[-1])
+            for rows in sizes:
+                before, expected = self.best_of(serialize_models, rows, context, options['repeat'])
+                after, data = self.best_of(serialize_cards, rows, context, options['repeat'])
+                if data != expected:
+                    self.stderr.write(self.style.ERROR(f'{rows} rows: outputs differ'))
+                self.stdout.write(
+                    f'{rows:>8}  {rows / before:>14,.0f}  {rows / after:>14,.0f}  {before / after:>7.1f}x'
+                )
+            transaction.set_rollback(True)
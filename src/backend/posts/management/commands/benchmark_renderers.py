@@ -0,0 +1,102 @@
+"""
+Compare render times of DRF's JSONRenderer, ORJSONRenderer and
+MessagePackRenderer on large PostSerializer payloads
+
+    python manage.py benchmark_renderers                  # 1k, 10k and 100k posts
+    python manage.py benchmark_renderers --posts 5000 --repeat 10
+
+The posts are built in memory, so nothing touches the database. Only the
+render step is timed; the best of --repeat runs is reported.
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from communities.models import Community
+from posts.models import Post
+from posts.serializers import PostSerializer
+from reddit_api.renderers import MessagePackRenderer, ORJSONRenderer
+from users.models import User
+
+RENDERERS = [
+    ('JSONRenderer', JSONRenderer()),
+    ('ORJSONRenderer', ORJSONRenderer()),
+    ('MessagePackRenderer', MessagePackRenderer()),
+]
+
+
+def build_payload(count, context, communities=50):
+    """PostSerializer data for ``count`` unsaved posts"""
+    users = [User(id=i, username=f'bench-user-{i}', email=f'bench-user-{i}@example.com') for i in range(communities)]
+    groups = [
+        Community(id=f'bench-comm-{i}', creator=users[i], image_url=f'https://example.com/bench-{i}.png')
+        for i in range(communities)
+    ]
+    body = 'Lorem ipsum dolor sit amet, café naïve \U0001F600. ' * 20
+    now = timezone.now()
+    posts = [
+        Post(
+            id=i + 1,
+            community=groups[i % communities],
+            creator=users[i % communities],
+            title=f'Benchmark post {i}',
+            body=body,
+            image_url='https://example.com/legacy.jpg' if i % 3 == 1 else None,
+            vote_status=i % 100,
+            number_of_comments=i % 20,
+            created_at=now - timedelta(seconds=i),
+        )
+        for i in range(count)
+    ]
+    return PostSerializer(posts, many=True, context=context).data
+
+
+class Command(BaseCommand):
+    help = 'Measure render time of the JSON and MessagePack renderers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 100000],
+            help='Payload sizes in posts (default: 1000 10000 100000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs per measurement; the fastest is reported (default: 3)',
+        )
+        parser.add_argument(
+            '--host',
+            default='localhost',
+            help='Host for absolute image URLs; must be in ALLOWED_HOSTS (default: localhost)',
+        )
+
+    def handle(self, *args, **options):
+        context = {'request': RequestFactory(HTTP_HOST=options['host']).get('/api/posts/')}
+        self.stdout.write(f'{"posts":>8}  {"renderer":<20}  {"ms":>9}  {"MB":>7}  {"MB/s":>8}  {"speedup":>8}')
+        for count in sorted(options['posts']):
+            data = build_payload(count, context)
+            baseline = expected = None
+            for name, renderer in RENDERERS:
+                best = None
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    body = renderer.render(data, renderer.media_type)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                if baseline is None:
+                    baseline, expected = best, body
+                elif renderer.format == 'json' and body != expected:
+                    self.stderr.write(self.style.ERROR(f'{count} posts: {name} output differs from JSONRenderer'))
+                megabytes = len(body) / 1e6
+                self.stdout.write(
+                    f'{count:>8}  {name:<20}  {best * 1000:>9.1f}  {megabytes:>7.1f}  '
+                    f'{megabytes / best:>8.1f}  {baseline / best:>7.1f}x'
+                )
@@ -0,0 +1,44 @@
+"""
+EXPLAIN the API's hot queries and fail if any needs a sequential scan or sort
+
+    python manage.py check_query_plans            # against the current data
+    python manage.py check_query_plans --seed 50000
+
+With --seed, synthetic rows are inserted (and the tables analyzed) inside a
+transaction that is rolled back afterwards.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from reddit_api.query_plans import check_hot_queries, seed_hot_query_data
+
+
+class Command(BaseCommand):
+    help = 'Verify that every hot query is served by an index (no seq scan, no sort)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Insert this many synthetic posts (rolled back) before checking',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['seed']:
+                seed_hot_query_data(posts=options['seed'])
+            results = check_hot_queries()
+            transaction.set_rollback(True)
+
+        failures = 0
+        for name, plan, problems in results:
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f'FAIL {name}: {", ".join(problems)}'))
+                self.stdout.write(plan)
+            else:
+                self.stdout.write(self.style.SUCCESS(f'ok   {name}'))
+
+        if failures:
+            raise CommandError(f'{failures} hot queries are not served by an index')
@@ -0,0 +1,25 @@
+"""
+Periodically re-decay precomputed post ranking scores
+
+Run from cron / a Kubernetes CronJob, e.g. every 10 minutes:
+    python manage.py decay_post_scores
+"""
+from django.core.management.base import BaseCommand
+
+from posts.ranking import decay_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute time-decayed hot/rising scores for recent posts in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of posts updated per statement (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        updated = decay_scores(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Re-decayed scores for {updated} posts'))
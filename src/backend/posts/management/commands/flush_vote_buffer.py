@@ -0,0 +1,25 @@
+"""
+Flush buffered vote_status deltas into the posts table
+
+Useful from cron when VOTE_FLUSH_INTERVAL <= 0, or before maintenance:
+    python manage.py flush_vote_buffer
+"""
+from django.core.management.base import BaseCommand
+
+from posts import vote_buffer
+
+
+class Command(BaseCommand):
+    help = 'Apply pending write-behind vote deltas to posts.vote_status'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Number of buffered deltas applied per transaction (default: 10000)',
+        )
+
+    def handle(self, *args, **options):
+        flushed = vote_buffer.flush_all(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} buffered vote deltas'))
@@ -0,0 +1,56 @@
+"""
+Render resized JPEG/WebP variants for post, community and avatar images
+
+Backfills rows uploaded before variants existed and is the task worker to
+run (e.g. from a CronJob) when IMAGE_VARIANT_WORKERS is 0:
+    python manage.py generate_image_variants
+    python manage.py generate_image_variants --force   # re-render everything
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from reddit_api.image_variants import VARIANT_SPECS, build_variants
+
+
+class Command(BaseCommand):
+    help = 'Generate missing resized image variants in primary-key batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of rows read per batch (default: 100)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render variants even if they are up to date',
+        )
+
+    def handle(self, *args, **options):
+        for label, (image_field, variants_field, _, _) in VARIANT_SPECS.items():
+            model = apps.get_model(label)
+            rows = (
+                model._default_manager.exclude(**{image_field: ''})
+                .exclude(**{f'{image_field}__isnull': True})
+                .order_by('pk')
+            )
+            built = failed = 0
+            last_pk = None
+            while True:
+                batch = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+                batch = list(batch.values_list('pk', image_field, variants_field)[:options['batch_size']])
+                if not batch:
+                    break
+                for pk, image, variants in batch:
+                    if not options['force'] and (variants or {}).get('source') == image:
+                        continue
+                    try:
+                        if build_variants(label, pk, force=options['force']):
+                            built += 1
+                    except Exception as exc:  # unreadable or corrupt upload
+                        failed += 1
+                        self.stderr.write(f'{label} {pk}: {exc}')
+                last_pk = batch[-1][0]
+            self.stdout.write(self.style.SUCCESS(f'{label}: {built} built, {failed} failed'))
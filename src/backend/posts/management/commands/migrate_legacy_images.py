@@ -0,0 +1,88 @@
+"""
+Move legacy base64 images (Post/Community image_url, User photo_url_legacy)
+into the configured media storage, local or S3
+
+    python manage.py migrate_legacy_images
+    python manage.py migrate_legacy_images --batch-size 50 --pause 0.5
+
+Safe to run while the site is live and to interrupt: progress is written to
+the checkpoint file after every batch and the next run resumes from it. The
+checkpoint is removed once every table has been scanned, so a later run
+starts over and picks up blobs written in the meantime.
+"""
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reddit_api.legacy_images import LEGACY_IMAGE_FIELDS, migrate_model
+
+
+def _load_checkpoint(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_checkpoint(path, checkpoint):
+    # Write then rename, so an interrupted run never leaves a truncated file
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as handle:
+        json.dump(checkpoint, handle)
+    os.replace(temporary, path)
+
+
+class Command(BaseCommand):
+    help = 'Move legacy data: base64 images out of database rows into media storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of primary keys read per batch (default: 100)',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Seconds to sleep between batches to limit load (default: 0)',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(settings.BASE_DIR, '.legacy_images_checkpoint.json'),
+            help='Progress file used to resume an interrupted run',
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Ignore an existing checkpoint and scan every table from the start',
+        )
+
+    def handle(self, *args, **options):
+        path = options['checkpoint']
+        checkpoint = {} if options['reset'] else _load_checkpoint(path)
+
+        for label, text_field, image_field, timestamp_field in LEGACY_IMAGE_FIELDS:
+            if checkpoint.get(label):
+                self.stdout.write(f'{label}: resuming after pk {checkpoint[label]}')
+
+            def on_batch(last_pk, stats, label=label):
+                checkpoint[label] = last_pk
+                _save_checkpoint(path, checkpoint)
+
+            stats = migrate_model(
+                label, text_field, image_field, timestamp_field,
+                start_after=checkpoint.get(label),
+                batch_size=options['batch_size'],
+                pause=options['pause'],
+                on_batch=on_batch,
+            )
+            summary = ', '.join(f'{count} {result}' for result, count in sorted(stats.items()))
+            self.stdout.write(self.style.SUCCESS(f'{label}: {summary or "nothing to migrate"}'))
+
+        if os.path.exists(path):
+            os.remove(path)
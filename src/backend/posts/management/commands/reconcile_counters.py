@@ -0,0 +1,95 @@
+"""
+Recompute denormalized counters from their source rows and fix drift
+
+Run from cron / a Kubernetes CronJob, e.g. hourly for at most 30 minutes:
+    python manage.py reconcile_counters --time-limit 1800
+    python manage.py reconcile_counters --counter post_votes --dry-run
+
+Checks posts.vote_status, posts.number_of_comments,
+communities.number_of_members and comments.number_of_replies (see
+reddit_api.counters). With --time-limit a
+run that stops early writes its position to the checkpoint file and the
+next run continues from there; point --checkpoint at a persistent volume
+for that to carry over between pods.
+"""
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.management.commands.migrate_legacy_images import _load_checkpoint, _save_checkpoint
+from reddit_api.counters import COUNTERS, reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute vote, comment, member and reply counters in primary-key batches and correct drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--counter',
+            action='append',
+            choices=sorted(COUNTERS),
+            help='Counter to check; repeat for several (default: all)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Number of rows compared per GROUP BY (default: 10000)',
+        )
+        parser.add_argument(
+            '--time-limit',
+            type=float,
+            default=0,
+            help='Stop after this many seconds and resume there next run (default: no limit)',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(settings.BASE_DIR, '.reconcile_counters_checkpoint.json'),
+            help='Progress file used to resume a run stopped by --time-limit',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore stored progress and start from the first row',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drift without correcting it',
+        )
+
+    def handle(self, *args, **options):
+        deadline = time.monotonic() + options['time_limit'] if options['time_limit'] > 0 else None
+        path = options['checkpoint']
+        checkpoint = {} if options['restart'] else _load_checkpoint(path)
+        for name in options['counter'] or COUNTERS:
+            start_after = checkpoint.get(name)
+            report = reconcile(
+                name,
+                batch_size=options['batch_size'],
+                apply=not options['dry_run'],
+                start_after=start_after,
+                deadline=deadline,
+            )
+            for pk, stored, expected in report.samples:
+                self.stdout.write(f'  {name} {pk}: stored {stored}, expected {expected}')
+            action = 'dry run' if options['dry_run'] else f'{report.corrected} corrected'
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: scanned {report.scanned} rows, {report.drifted} drifted '
+                f'(total drift {report.total_drift}), {action}'
+            ))
+            if not options['dry_run']:
+                if report.finished:
+                    checkpoint.pop(name, None)
+                else:
+                    checkpoint[name] = report.last_pk
+                if checkpoint:
+                    _save_checkpoint(path, checkpoint)
+                elif os.path.exists(path):
+                    os.remove(path)
+            if not report.finished:
+                self.stdout.write(f'{name}: stopped at {report.last_pk}; the next run continues from there')
+                # The time budget is spent; later counters wait for the next run
+                return
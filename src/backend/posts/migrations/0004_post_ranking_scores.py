@@ -0,0 +1,72 @@
+# Generated by Django 4.2.27 on 2026-10-17 02:59
+
+from django.db import migrations, models, transaction
+
+from posts.ranking import hot_score
+from reddit_api.migration_operations import AddIndexConcurrentlyIfSupported
+
+# Rows scored per backfill transaction, each committed on its own
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_hot_scores(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.order_by('pk').only('id', 'vote_status', 'created_at')
+    last_pk = 0
+    while True:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            batch = list(posts.filter(pk__gt=last_pk)[:BACKFILL_BATCH_SIZE])
+            if not batch:
+                break
+            for post in batch:
+                post.hot_score = hot_score(post.vote_status, post.created_at)
+            Post.objects.bulk_update(batch, ['hot_score'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    # Backfill batches commit separately and CREATE INDEX CONCURRENTLY
+    # cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('posts', '0003_post_image_alter_post_image_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='hot_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='rising_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(backfill_hot_scores, migrations.RunPython.noop),
+        AddIndexConcurrentlyIfSupported(
+            model_name='post',
+            index=models.Index(fields=['-hot_score', '-id'], name='posts_hot_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='post',
+            index=models.Index(fields=['community', '-hot_score', '-id'], name='posts_comm_hot_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='post',
+            index=models.Index(fields=['-rising_score', '-id'], name='posts_rising_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='post',
+            index=models.Index(fields=['community', '-rising_score', '-id'], name='posts_comm_rising_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='post',
+            index=models.Index(fields=['-vote_status', '-id'], name='posts_top_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='post',
+            index=models.Index(fields=['community', '-vote_status', '-id'], name='posts_comm_top_idx'),
+        ),
+    ]
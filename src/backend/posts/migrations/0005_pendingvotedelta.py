@@ -0,0 +1,26 @@
+# Generated by Django 4.2.27 on 2026-10-17 03:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_ranking_scores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingVoteDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_vote_deltas', to='posts.post')),
+            ],
+            options={
+                'db_table': 'post_vote_deltas',
+            },
+        ),
+    ]
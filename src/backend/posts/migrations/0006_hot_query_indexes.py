@@ -0,0 +1,29 @@
+# Generated by Django 4.2.27 on 2026-10-17 03:11
+
+from django.db import migrations, models
+
+from reddit_api.migration_operations import AddIndexConcurrentlyIfSupported
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('posts', '0005_pendingvotedelta'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name='post',
+            index=models.Index(fields=['community', '-created_at', '-id'], name='posts_comm_created_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='post',
+            index=models.Index(fields=['-created_at', '-id'], name='posts_created_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='postvote',
+            index=models.Index(fields=['user', 'community', '-created_at'], include=('post', 'vote_value'), name='post_votes_user_comm_idx'),
+        ),
+    ]
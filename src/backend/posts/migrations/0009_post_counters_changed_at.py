@@ -0,0 +1,19 @@
+# Generated by Django 4.2.27 on 2026-10-17 05:24
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_content_addressed_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='counters_changed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,6 +1,110 @@
-from django.db import models
+from django.db import connections, models
+from django.db.models import sql
+from django.db.models.functions import Substr
 from django.conf import settings
+from django.utils import timezone
 from communities.models import Community
+from images.fields import ContentAddressedImageField
+from reddit_api.records import Record, as_records
+from .ranking import hot_score
+
+BODY_PREVIEW_LENGTH = 300
+
+
+def _unless_inline(field):
+    """The column's value, or NULL when it holds an inline ``data:`` blob"""
+    return models.Case(
+        models.When(**{f'{field}__startswith': 'data:'}, then=models.Value(None)),
+        default=models.F(field),
+        output_field=models.TextField(),
+    )
+
+
+class PostQuerySet(models.QuerySet):
+    def for_list(self):
+        """
+        Only the columns feed cards need: the body is cut to a preview in the
+        database and inline base64 images are never transferred.
+        """
+        return (
+            self.select_related('creator', 'community')
+            .only(
+                'id', 'title', 'image', 'image_variants', 'number_of_comments', 'vote_status',
+                'hot_score', 'rising_score', 'created_at', 'community', 'creator',
+                'community__id', 'community__image', 'community__image_variants',
+                'creator__id', 'creator__username', 'creator__email',
+            )
+            .annotate(
+                # One extra character tells the serializer whether it was cut
+                body_head=Substr('body', 1, BODY_PREVIEW_LENGTH + 1),
+                image_link=_unless_inline('image_url'),
+                community_image_link=_unless_inline('community__image_url'),
+            )
+        )
+    
+    def update_returning(self, field, **kwargs):
+        """
+        ``update(**kwargs)`` that also returns the updated value of ``field``
+        from the same statement (``UPDATE ... RETURNING``, PostgreSQL and
+        SQLite 3.35+), or ``None`` when no row matched. For single-row
+        filters on this table only.
+        """
+        query = self.query.chain(sql.UpdateQuery)
+        query.add_update_values(kwargs)
+        query.annotations = {}
+        update_sql, params = query.get_compiler(self.db).as_sql()
+        connection = connections[self.db]
+        column = connection.ops.quote_name(self.model._meta.get_field(field).column)
+        with connection.cursor() as cursor:
+            cursor.execute(f'{update_sql} RETURNING {column}', params)
+            row = cursor.fetchone()
+        return row[0] if row else None
+    
+    def with_pending_votes(self):
+        """Annotate vote deltas still waiting in the write-behind buffer"""
+        if not settings.VOTE_WRITE_BEHIND:
+            return self
+        pending = (
+            PendingVoteDelta.objects.filter(post=models.OuterRef('pk'))
+            .order_by()
+            .values('post')
+            .annotate(total=models.Sum('delta'))
+            .values('total')
+        )
+        return self.annotate(pending_vote_delta=models.Subquery(pending))
+    
+    def with_viewer_vote(self, user):
+        """Annotate the given user's vote value (1, -1 or None) on each post"""
+        vote = PostVote.objects.filter(post=models.OuterRef('pk'), user=user).values('vote_value')[:1]
+        return self.annotate(viewer_vote=models.Subquery(vote))
+    
+    def as_cards(self):
+        """
+        ``for_list()`` rows as ``PostCard`` records instead of model
+        instances, for ``PostCardSerializer``. Call it last, after the
+        optional annotations (pending votes, viewer vote, search rank).
+        """
+        queryset = self.annotate(
+            community_image=models.F('community__image'),
+            community_image_variants=models.F('community__image_variants'),
+            creator_username=models.F('creator__username'),
+            creator_email=models.F('creator__email'),
+        )
+        optional = [name for name in PostCard.optional_fields if name in queryset.query.annotations]
+        return as_records(queryset, PostCard, PostCard.fields + optional)
+
+
+class PostCard(Record):
+    """One feed card row, see ``PostQuerySet.as_cards``"""
+    fields = [
+        'id', 'community_id', 'community_image', 'community_image_variants', 'community_image_link',
+        'creator_id', 'creator_username', 'creator_email', 'title', 'body_head', 'image',
+        'image_variants', 'image_link', 'number_of_comments', 'vote_status', 'hot_score',
+        'rising_score', 'created_at',
+    ]
+    # Selected only when the queryset carries the annotation
+    optional_fields = ['pending_vote_delta', 'viewer_vote', 'rank']
+    __slots__ = tuple(fields + optional_fields)
 
 
 class Post(models.Model):
@@ -19,11 +123,22 @@ class Post(models.Model):
     title = models.CharField(max_length=300)
     body = models.TextField(blank=True)
     image_url = models.TextField(blank=True, null=True)  # Legacy: base64 or URL strings
-    image = models.ImageField(upload_to='posts/', blank=True, null=True)  # New: proper image storage for S3
+    image = ContentAddressedImageField(upload_to='posts/', blank=True, null=True)  # Deduplicated by content, see images.fields
+    image_variants = models.JSONField(default=dict, blank=True)  # Resized copies, see reddit_api.image_variants
     number_of_comments = models.IntegerField(default=0)
     vote_status = models.IntegerField(default=0)  # Sum of all votes
+    hot_score = models.FloatField(default=0)  # Precomputed, see posts.ranking
+    rising_score = models.FloatField(default=0)  # Precomputed, see posts.ranking
     created_at = models.DateTimeField(auto_now_add=True)
     edited_at = models.DateTimeField(auto_now=True)
+    counters_changed_at = models.DateTimeField(default=timezone.now)  # Last vote/comment count change, see posts.ranking
+    
+    objects = PostQuerySet.as_manager()
+    
+    @property
+    def current_vote_status(self):
+        """vote_status including deltas not yet flushed from the write-behind buffer"""
+        return self.vote_status + (getattr(self, 'pending_vote_delta', None) or 0)
     
     @property
     def community_id(self):
@@ -41,12 +156,27 @@ class Post(models.Model):
     def creator_id(self):
         return str(self.creator.id)
     
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.hot_score:
+            self.hot_score = hot_score(self.vote_status, self.created_at or timezone.now())
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return self.title
     
     class Meta:
         db_table = 'posts'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['community', '-created_at', '-id'], name='posts_comm_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='posts_created_idx'),
+            models.Index(fields=['-hot_score', '-id'], name='posts_hot_idx'),
+            models.Index(fields=['community', '-hot_score', '-id'], name='posts_comm_hot_idx'),
+            models.Index(fields=['-rising_score', '-id'], name='posts_rising_idx'),
+            models.Index(fields=['community', '-rising_score', '-id'], name='posts_comm_rising_idx'),
+            models.Index(fields=['-vote_status', '-id'], name='posts_top_idx'),
+            models.Index(fields=['community', '-vote_status', '-id'], name='posts_comm_top_idx'),
+        ]
 
 
 class PostVote(models.Model):
@@ -80,6 +210,32 @@ class PostVote(models.Model):
         db_table = 'post_votes'
         unique_together = ['user', 'post']
         ordering = ['-created_at']
+        indexes = [
+            # Covers user_post_votes (user + community, newest first)
+            models.Index(
+                fields=['user', 'community', '-created_at'],
+                include=['post', 'vote_value'],
+                name='post_votes_user_comm_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.user.username} voted {self.vote_value} on {self.post.title}"
+
+
+class PendingVoteDelta(models.Model):
+    """Write-behind buffer of vote_status changes, see posts.vote_buffer"""
+    
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='pending_vote_deltas'
+    )
+    delta = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'post_vote_deltas'
+    
+    def __str__(self):
+        return f"{self.delta:+d} on post {self.post_id}"
@@ -0,0 +1,113 @@
+"""
+Precomputed post ranking scores (hot / rising)
+
+Scores are stored on the ``posts`` row so that ``?sort=hot`` and
+``?sort=rising`` are plain index range scans instead of a full table rank.
+
+* hot: ``sign(v) * log10(max(|v|, 1)) + (created_at - epoch) / 45000``.
+  Newer posts start higher, so older posts decay relative to them without
+  ever having to rewrite their rows.
+* rising: ``(votes + comments) / (age_hours + 2) ** 1.5`` for posts younger
+  than ``RISING_WINDOW``. This depends on the current time, so it is updated
+  on every vote/comment and re-decayed in bulk by ``decay_post_scores``.
+* top: ordered by the existing ``vote_status`` column.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import F, Value, FloatField
+from django.db.models.functions import Abs, Cast, Greatest, Ln, Sign
+from django.utils import timezone
+
+HOT_EPOCH = datetime(2005, 12, 8, 7, 46, 43, tzinfo=dt_timezone.utc)
+HOT_DECAY_SECONDS = 45000
+RISING_GRAVITY = 1.5
+RISING_WINDOW = timedelta(hours=48)
+
+
+def _age_seconds(created_at):
+    return (created_at - HOT_EPOCH).total_seconds()
+
+
+def _rising_divisor(created_at, now):
+    age_hours = max((now - created_at).total_seconds(), 0) / 3600
+    return (age_hours + 2) ** RISING_GRAVITY
+
+
+def hot_score(vote_status, created_at):
+    """Hot score for a post with the given net votes and creation time"""
+    sign = (vote_status > 0) - (vote_status < 0)
+    return sign * math.log10(max(abs(vote_status), 1)) + _age_seconds(created_at) / HOT_DECAY_SECONDS
+
+
+def rising_score(vote_status, number_of_comments, created_at, now=None):
+    """Rising score - engagement velocity, zero outside the rising window"""
+    now = now or timezone.now()
+    if now - created_at > RISING_WINDOW:
+        return 0.0
+    return (vote_status + number_of_comments) / _rising_divisor(created_at, now)
+
+
+def score_updates(created_at, vote_delta=0, comment_delta=0, now=None):
+    """
+    Column expressions that recompute both scores from the row's current
+    counters, for use in ``QuerySet.update()``. Reading the counters inside
+    the same UPDATE keeps the scores consistent with concurrent writers.
+
+    All SET expressions of one UPDATE see the old row, so callers changing a
+    counter in the same statement pass the change as ``vote_delta`` /
+    ``comment_delta``.
+
+    Every counter write goes through here, so it also stamps
+    ``counters_changed_at`` (the post detail's conditional GET validator).
+    """
+    now = now or timezone.now()
+    votes = Cast(F('vote_status') + Value(vote_delta), FloatField())
+    hot = (
+        # log10 as ln(x) / ln(10): two-argument LOG is numeric-only on PostgreSQL
+        Sign(votes) * Ln(Greatest(Abs(votes), Value(1.0))) / Value(math.log(10))
+        + Value(_age_seconds(created_at) / HOT_DECAY_SECONDS)
+    )
+    if now - created_at > RISING_WINDOW:
+        rising = Value(0.0)
+    else:
+        engagement = Cast(
+            F('vote_status') + F('number_of_comments') + Value(vote_delta + comment_delta),
+            FloatField(),
+        )
+        rising = engagement / Value(_rising_divisor(created_at, now))
+    return {'hot_score': hot, 'rising_score': rising, 'counters_changed_at': now}
+
+
+def decay_scores(batch_size=1000, now=None):
+    """
+    Re-decay stored scores in primary-key batches.
+
+    Posts inside the rising window get both scores recomputed; posts that
+    fell out of it have their rising score reset in a single UPDATE. Returns
+    the number of rows recomputed.
+    """
+    from .models import Post
+    now = now or timezone.now()
+    cutoff = now - RISING_WINDOW
+    Post.objects.filter(created_at__lt=cutoff).exclude(rising_score=0).update(rising_score=0)
+
+    recent = Post.objects.filter(created_at__gte=cutoff).order_by('pk')
+    updated = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            recent.filter(pk__gt=last_pk)
+            .only('id', 'vote_status', 'number_of_comments', 'created_at')[:batch_size]
+        )
+        if not batch:
+            break
+        for post in batch:
+            post.hot_score = hot_score(post.vote_status, post.created_at)
+            post.rising_score = rising_score(
+                post.vote_status, post.number_of_comments, post.created_at, now
+            )
+        Post.objects.bulk_update(batch, ['hot_score', 'rising_score'])
+        updated += len(batch)
+        last_pk = batch[-1].pk
+    return updated
@@ -1,19 +1,27 @@
 from rest_framework import serializers
-from .models import Post, PostVote
+from .models import BODY_PREVIEW_LENGTH, Post, PostVote
 from django.contrib.auth import get_user_model
+from django.db.models.fields.files import FieldFile
+from communities.models import Community
+from reddit_api.direct_uploads import DirectUploadSerializerMixin
+from reddit_api.image_variants import srcset_map
+from reddit_api.records import RecordSerializer
 
 User = get_user_model()
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(DirectUploadSerializerMixin, serializers.ModelSerializer):
     """Serializer for Post model"""
-    communityId = serializers.CharField(source='community.id', read_only=True)
+    upload_kind = 'posts'
+    communityId = serializers.CharField(source='community_id', read_only=True)
     communityImageURL = serializers.SerializerMethodField()
-    creatorId = serializers.CharField(source='creator.id', read_only=True)
+    communityImageSrcset = serializers.SerializerMethodField()
+    creatorId = serializers.CharField(source='creator_id', read_only=True)
     creatorDisplayText = serializers.CharField(source='creator.display_name', read_only=True)
     numberOfComments = serializers.IntegerField(source='number_of_comments', read_only=True)
-    voteStatus = serializers.IntegerField(source='vote_status', read_only=True)
+    voteStatus = serializers.IntegerField(source='current_vote_status', read_only=True)
     imageURL = serializers.SerializerMethodField()
+    imageSrcset = serializers.SerializerMethodField()
     image = serializers.ImageField(write_only=True, required=False, allow_null=True)
     image_url = serializers.CharField(write_only=True, required=False, allow_blank=True, allow_null=True)  # Legacy base64 support
     createdAt = serializers.DateTimeField(source='created_at', read_only=True)
@@ -43,20 +51,135 @@ class PostSerializer(serializers.ModelSerializer):
             return image_url
         return None
     
+    def get_imageSrcset(self, obj):
+        """Resized JPEG/WebP variants of the uploaded image, once generated"""
+        return srcset_map(obj.image, obj.image_variants, self.context.get('request'))
+    
+    def get_communityImageSrcset(self, obj):
+        return srcset_map(obj.community.image, obj.community.image_variants, self.context.get('request'))
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Present only when the view annotated the requesting user's vote
+        if hasattr(instance, 'viewer_vote'):
+            data['voteValue'] = instance.viewer_vote
+        return data
+    
     class Meta:
         model = Post
         fields = [
-            'id', 'communityId', 'communityImageURL', 'creatorId', 'creatorDisplayText',
-            'title', 'body', 'image', 'image_url', 'imageURL', 'numberOfComments',
-            'voteStatus', 'createdAt'
+            'id', 'communityId', 'communityImageURL', 'communityImageSrcset', 'creatorId',
+            'creatorDisplayText', 'title', 'body', 'image', 'image_key', 'image_url', 'imageURL',
+            'imageSrcset', 'numberOfComments', 'voteStatus', 'createdAt'
         ]
         read_only_fields = ['id', 'numberOfComments', 'voteStatus', 'createdAt']
 
 
+def truncate_preview(text, limit=BODY_PREVIEW_LENGTH):
+    """Cut ``text`` to at most ``limit`` characters, at a word boundary if possible"""
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    head = cut.rsplit(None, 1)[0] if ' ' in cut.strip() else cut
+    return head.rstrip() + '\u2026'
+
+
+class PostListSerializer(PostSerializer):
+    """
+    Feed card representation of ``Post.objects.for_list()`` rows: a short
+    ``bodyPreview`` instead of ``body`` and no inline base64 images. The full
+    post comes from ``PostDetailView``.
+    """
+    bodyPreview = serializers.SerializerMethodField()
+    
+    def get_bodyPreview(self, obj):
+        return truncate_preview(obj.body_head or '')
+    
+    def get_imageURL(self, obj):
+        if obj.image:
+            return super().get_imageURL(obj)
+        return obj.image_link
+    
+    def get_communityImageURL(self, obj):
+        if obj.community.image:
+            return super().get_communityImageURL(obj)
+        return obj.community_image_link
+    
+    class Meta(PostSerializer.Meta):
+        fields = [
+            'id', 'communityId', 'communityImageURL', 'communityImageSrcset', 'creatorId',
+            'creatorDisplayText', 'title', 'bodyPreview', 'imageURL', 'imageSrcset',
+            'numberOfComments', 'voteStatus', 'createdAt'
+        ]
+        read_only_fields = fields
+
+
+class PostCardSerializer(RecordSerializer):
+    """
+    ``PostListSerializer`` output for ``PostCard`` records from
+    ``Post.objects.as_cards()``: same keys, order and values, built without
+    model instances or serializer fields. Community images repeat across a
+    page, so they are resolved once per community.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Resolve the active time zone once instead of per row
+        self.created_at_field = serializers.DateTimeField(default_timezone=serializers.DateTimeField().default_timezone())
+        self.image_field = Post._meta.get_field('image')
+        self.community_image_field = Community._meta.get_field('image')
+        self._communities = {}
+    
+    def image_srcset(self, field, name, variants):
+        if not name or not variants:
+            return None
+        return srcset_map(FieldFile(None, field, name), variants, self.request)
+    
+    def community_images(self, card):
+        """``(communityImageURL, communityImageSrcset)`` of the card's community"""
+        try:
+            return self._communities[card.community_id]
+        except KeyError:
+            pass
+        if card.community_image:
+            url = self.community_image_field.storage.url(card.community_image)
+            if not url.startswith(('http://', 'https://', 'data:')):
+                url = self.absolute_uri(url)
+        else:
+            url = card.community_image_link
+        srcset = self.image_srcset(self.community_image_field, card.community_image, card.community_image_variants)
+        images = self._communities[card.community_id] = (url, srcset)
+        return images
+    
+    def to_representation(self, card):
+        community_image_url, community_image_srcset = self.community_images(card)
+        if card.image:
+            image_url = self.absolute_uri(self.image_field.storage.url(card.image))
+        else:
+            image_url = card.image_link
+        data = {
+            'id': card.id,
+            'communityId': str(card.community_id),
+            'communityImageURL': community_image_url,
+            'communityImageSrcset': community_image_srcset,
+            'creatorId': str(card.creator_id),
+            'creatorDisplayText': card.creator_username or card.creator_email.split('@')[0],
+            'title': card.title,
+            'bodyPreview': truncate_preview(card.body_head or ''),
+            'imageURL': image_url,
+            'imageSrcset': self.image_srcset(self.image_field, card.image, card.image_variants),
+            'numberOfComments': card.number_of_comments,
+            'voteStatus': card.vote_status + (getattr(card, 'pending_vote_delta', None) or 0),
+            'createdAt': self.created_at_field.to_representation(card.created_at),
+        }
+        if hasattr(card, 'viewer_vote'):
+            data['voteValue'] = card.viewer_vote
+        return data
+
+
 class PostVoteSerializer(serializers.ModelSerializer):
     """Serializer for PostVote model"""
-    postId = serializers.IntegerField(source='post.id', read_only=True)
-    communityId = serializers.CharField(source='community.id', read_only=True)
+    postId = serializers.IntegerField(source='post_id', read_only=True)
+    communityId = serializers.CharField(source='community_id', read_only=True)
     voteValue = serializers.IntegerField(source='vote_value', read_only=True)
     
     class Meta:
@@ -2,11 +2,44 @@
 Tests for Posts app
 Coverage: Models, Serializers, Views, Voting
 """
+import base64
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+import msgpack
 import pytest
+from datetime import timedelta
+from decimal import Decimal
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from django.core.management import call_command
+from django.db import connection, OperationalError
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.translation import gettext_lazy
 from rest_framework import status
-from posts.models import Post, PostVote
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from PIL import Image
+from botocore.response import StreamingBody
+from posts import vote_buffer
+from posts.models import Post, PostCard, PostVote, PendingVoteDelta
+from posts.serializers import PostCardSerializer, PostListSerializer, PostSerializer
+from posts.ranking import hot_score, decay_scores
+from communities.models import Community, CommunityMember
+from images.models import StoredImage
+from reddit_api import image_variants, legacy_images
+from reddit_api.image_processing import render_variants
+from reddit_api.cache import response_cache_requests
+from reddit_api.counters import _expected, reconcile
+from reddit_api.query_plans import check_hot_queries, plan_problems
+from reddit_api.renderers import MessagePackRenderer, ORJSONRenderer
 
 User = get_user_model()
 
@@ -125,6 +158,323 @@ class TestPostList:
         assert 'communityImageURL' in response.data[0]
 
 
+@pytest.mark.django_db
+class TestLeanPostList:
+    """Test the reduced feed card representation"""
+    
+    def test_list_has_preview_not_body(self, api_client, create_post):
+        """Test that long bodies are cut at a word boundary"""
+        post = create_post(body='word ' * 200)
+        
+        item = api_client.get(reverse('posts:post-list')).data[0]
+        
+        assert 'body' not in item
+        assert len(item['bodyPreview']) <= 301
+        assert item['bodyPreview'].endswith('word\u2026')
+        detail = api_client.get(reverse('posts:post-detail', kwargs={'pk': post.id})).data
+        assert detail['body'] == post.body
+        
+    def test_short_body_not_truncated(self, api_client, create_post):
+        """Test that a short body is returned unchanged"""
+        create_post(body='Short body')
+        
+        assert api_client.get(reverse('posts:post-list')).data[0]['bodyPreview'] == 'Short body'
+        
+    def test_inline_images_only_in_detail(self, api_client, create_post, create_community):
+        """Test that base64 blobs are dropped from lists but URLs are kept"""
+        community = create_community(image_url='data:image/png;base64,AAAA')
+        inline = create_post(community=community, image_url='data:image/png;base64,AAAA')
+        create_post(community=community, image_url='https://example.com/a.png')
+        
+        items = {item['id']: item for item in api_client.get(reverse('posts:post-list')).data}
+        
+        assert items[inline.id]['imageURL'] is None
+        assert items[inline.id]['communityImageURL'] is None
+        assert [item['imageURL'] for item in items.values() if item['id'] != inline.id] == ['https://example.com/a.png']
+        detail = api_client.get(reverse('posts:post-detail', kwargs={'pk': inline.id})).data
+        assert detail['imageURL'] == 'data:image/png;base64,AAAA'
+        
+    def test_heavy_columns_deferred(self, create_post):
+        """Test that body and image_url are not loaded by list queries"""
+        create_post()
+        
+        post = Post.objects.for_list().first()
+        
+        assert {'body', 'image_url'} <= post.get_deferred_fields()
+        
+    def test_list_is_single_query(self, api_client, create_post, django_assert_num_queries):
+        """Test that deferred columns are never loaded lazily while serializing"""
+        for _ in range(3):
+            create_post()
+        
+        with django_assert_num_queries(1):
+            response = api_client.get(reverse('posts:post-list'))
+        
+        assert len(response.data) == 3
+
+
+@pytest.mark.django_db
+class TestPostCards:
+    """Test that values_list() records serialize exactly like feed-card models"""
+    
+    @pytest.fixture(autouse=True)
+    def media(self, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path)
+    
+    @pytest.fixture
+    def feed_rows(self, create_user, create_post, create_community):
+        """Posts covering uploaded, legacy, inline and missing images"""
+        uploaded = create_community(image=SimpleUploadedFile('icon.jpg', make_jpeg(120, 120), content_type='image/jpeg'))
+        image_variants.build_variants('communities.Community', uploaded.pk)
+        legacy = create_community(image_url='https://example.com/icon.png')
+        inline = create_community(image_url='data:image/png;base64,AAAA')
+        nameless = create_user(username='', email='nameless@example.com')
+        
+        with_image = create_post(
+            community=uploaded,
+            image=SimpleUploadedFile('cat.jpg', make_jpeg(400, 200), content_type='image/jpeg'),
+        )
+        image_variants.build_variants('posts.Post', with_image.pk)
+        create_post(community=uploaded, body='word ' * 200)
+        create_post(community=legacy, image_url='https://example.com/a.png', creator=nameless)
+        create_post(community=inline, image_url='data:image/png;base64,AAAA', body='')
+        return with_image
+    
+    def both(self, queryset, context):
+        queryset = queryset.order_by('-created_at', '-id')
+        expected = PostListSerializer(queryset, many=True, context=context).data
+        actual = PostCardSerializer(list(queryset.as_cards()), many=True, context=context).data
+        return expected, actual
+    
+    def test_same_output_with_request(self, feed_rows):
+        """Test keys, key order and values, including absolute URLs and srcsets"""
+        request = APIRequestFactory().get('/api/posts/')
+        
+        expected, actual = self.both(Post.objects.for_list(), {'request': request})
+        
+        assert json.dumps(actual) == json.dumps(expected)
+        assert actual[-1]['imageSrcset']['jpeg'].startswith('http://testserver/')
+    
+    def test_same_output_without_request(self, feed_rows):
+        """Test relative URLs when serialized outside a request"""
+        expected, actual = self.both(Post.objects.for_list(), {})
+        
+        assert json.dumps(actual) == json.dumps(expected)
+    
+    def test_pending_votes_and_viewer_vote(self, settings, feed_rows, create_user):
+        """Test buffered deltas in voteStatus and the optional voteValue key"""
+        settings.VOTE_WRITE_BEHIND = True
+        viewer = create_user()
+        PendingVoteDelta.objects.create(post=feed_rows, delta=2)
+        PostVote.objects.create(user=viewer, post=feed_rows, community=feed_rows.community, vote_value=1)
+        
+        plain = Post.objects.for_list().with_pending_votes()
+        expected, actual = self.both(plain, {})
+        personalized = self.both(plain.with_viewer_vote(viewer), {})
+        
+        assert actual == expected
+        assert all('voteValue' not in item for item in actual)
+        assert personalized[0] == personalized[1]
+        assert [item['voteValue'] for item in personalized[1]].count(1) == 1
+        assert {item['id']: item['voteStatus'] for item in actual}[feed_rows.id] == 2
+    
+    def test_records_carry_selected_columns_only(self, create_post):
+        """Test that unselected annotations stay unset on the record"""
+        post = create_post()
+        
+        card = Post.objects.for_list().as_cards().get()
+        
+        assert isinstance(card, PostCard)
+        assert (card.id, card.community_id, card.creator_id) == (post.id, post.community_id, int(post.creator_id))
+        assert not hasattr(card, 'viewer_vote')
+        assert not hasattr(card, '__dict__')
+
+
+@pytest.mark.django_db
+class TestPostListCursorPagination:
+    """Test opt-in keyset pagination on the post list endpoint"""
+    
+    def test_cursor_pages_are_stable_and_complete(self, api_client, create_post, create_community):
+        """Test walking every page returns each post exactly once, newest first"""
+        community = create_community()
+        posts = [create_post(community=community, title=f'Post {i}') for i in range(5)]
+        # Identical timestamps must still be ordered deterministically by id
+        Post.objects.filter(id__in=[p.id for p in posts[:3]]).update(created_at=posts[0].created_at)
+        
+        url = reverse('posts:post-list')
+        response = api_client.get(url, {'community_id': community.id, 'cursor': '', 'limit': 2})
+        seen = []
+        while True:
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.data['results']) <= 2
+            seen.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                break
+            response = api_client.get(response.data['next'])
+        
+        expected = list(
+            Post.objects.filter(community=community)
+            .order_by('-created_at', '-id')
+            .values_list('id', flat=True)
+        )
+        assert seen == expected
+        
+    def test_without_cursor_returns_plain_array(self, api_client, create_post):
+        """Test that the default response stays a plain array"""
+        create_post()
+        
+        url = reverse('posts:post-list')
+        response = api_client.get(url)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert isinstance(response.data, list)
+        
+    def test_invalid_cursor(self, api_client):
+        """Test that a malformed cursor is rejected"""
+        url = reverse('posts:post-list')
+        response = api_client.get(url, {'cursor': 'not-a-cursor'})
+        
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestHomeFeed:
+    """Test merged home feed endpoint"""
+    
+    def test_feed_merges_joined_communities(self, authenticated_client, create_post, create_community):
+        """Test feed returns posts of joined communities only, newest first"""
+        joined = [create_community() for _ in range(6)]
+        other = create_community()
+        for community in joined:
+            CommunityMember.objects.create(user=authenticated_client.user, community=community)
+            create_post(community=community)
+            create_post(community=community)
+        create_post(community=other)
+        
+        url = reverse('posts:home-feed')
+        response = authenticated_client.get(url, {'limit': 5})
+        seen = []
+        while True:
+            assert response.status_code == status.HTTP_200_OK
+            seen.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                break
+            response = authenticated_client.get(response.data['next'])
+        
+        expected = list(
+            Post.objects.filter(community__in=joined)
+            .order_by('-created_at', '-id')
+            .values_list('id', flat=True)
+        )
+        assert seen == expected
+        
+    def test_feed_query_count_is_bounded(self, authenticated_client, create_post, create_community,
+                                         django_assert_max_num_queries):
+        """Test feed cost does not grow with the number of joined communities"""
+        for _ in range(10):
+            community = create_community()
+            CommunityMember.objects.create(user=authenticated_client.user, community=community)
+            create_post(community=community)
+        
+        url = reverse('posts:home-feed')
+        # auth user + memberships + ordered ids + posts
+        with django_assert_max_num_queries(4):
+            response = authenticated_client.get(url)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 10
+        
+    def test_feed_without_memberships(self, authenticated_client, create_post):
+        """Test feed is empty when user has not joined any community"""
+        create_post()
+        
+        url = reverse('posts:home-feed')
+        response = authenticated_client.get(url)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'next': None, 'results': []}
+        
+    def test_feed_unauthenticated(self, api_client):
+        """Test feed requires authentication"""
+        url = reverse('posts:home-feed')
+        response = api_client.get(url)
+        
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+class TestPostRanking:
+    """Test precomputed hot/top/rising ranking"""
+    
+    def test_new_post_has_hot_score(self, create_post):
+        """Test that a hot score is computed on creation"""
+        post = create_post()
+        assert post.hot_score == pytest.approx(hot_score(0, post.created_at), abs=1e-3)
+        
+    def test_vote_updates_scores(self, authenticated_client, create_post):
+        """Test that voting recomputes the stored scores"""
+        post = create_post()
+        
+        url = reverse('posts:vote-post', kwargs={'post_id': post.id})
+        authenticated_client.post(url, {'vote_value': 1}, format='json')
+        
+        post.refresh_from_db()
+        assert post.hot_score == pytest.approx(hot_score(1, post.created_at))
+        assert post.rising_score > 0
+        
+    def test_sort_hot_and_top(self, api_client, create_post, create_community):
+        """Test sorting the list by hot and top scores"""
+        community = create_community()
+        low = create_post(community=community, title='Low')
+        high = create_post(community=community, title='High')
+        Post.objects.filter(pk=low.pk).update(vote_status=-5, hot_score=hot_score(-5, low.created_at))
+        Post.objects.filter(pk=high.pk).update(vote_status=50, hot_score=hot_score(50, high.created_at))
+        
+        url = reverse('posts:post-list')
+        for sort in ('hot', 'top'):
+            response = api_client.get(url, {'community_id': community.id, 'sort': sort})
+            assert response.status_code == status.HTTP_200_OK
+            assert [item['title'] for item in response.data] == ['High', 'Low']
+        
+    def test_sort_with_cursor(self, api_client, create_post, create_community):
+        """Test that cursor pages follow the requested sort"""
+        community = create_community()
+        for votes in (3, 1, 2):
+            post = create_post(community=community)
+            Post.objects.filter(pk=post.pk).update(vote_status=votes)
+        
+        url = reverse('posts:post-list')
+        response = api_client.get(url, {'community_id': community.id, 'sort': 'top', 'cursor': '', 'limit': 2})
+        votes = [item['voteStatus'] for item in response.data['results']]
+        response = api_client.get(response.data['next'])
+        votes += [item['voteStatus'] for item in response.data['results']]
+        
+        assert votes == [3, 2, 1]
+        
+    def test_invalid_sort(self, api_client):
+        """Test that an unknown sort is rejected"""
+        url = reverse('posts:post-list')
+        response = api_client.get(url, {'sort': 'bogus'})
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        
+    def test_decay_scores(self, create_post):
+        """Test bulk re-decay lowers rising scores and resets old posts"""
+        fresh = create_post()
+        old = create_post()
+        Post.objects.filter(pk=fresh.pk).update(vote_status=10, rising_score=100)
+        Post.objects.filter(pk=old.pk).update(
+            created_at=timezone.now() - timedelta(days=3), rising_score=100
+        )
+        
+        decay_scores(now=timezone.now() + timedelta(hours=6))
+        
+        fresh.refresh_from_db()
+        old.refresh_from_db()
+        assert 0 < fresh.rising_score < 100
+        assert old.rising_score == 0
+
+
 @pytest.mark.django_db
 class TestPostCreate:
     """Test post creation endpoint"""
@@ -293,6 +643,22 @@ class TestPostVoting:
             post=post
         ).exists()
         
+    def test_vote_status_returned_by_update(self, authenticated_client, create_post):
+        """Test that the new vote_status comes back from the UPDATE, without reading the post again"""
+        post = create_post()
+        Post.objects.filter(id=post.id).update(vote_status=4)
+        url = reverse('posts:vote-post', kwargs={'post_id': post.id})
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.post(url, {'vote_value': -1}, format='json')
+        
+        assert response.data['vote_status'] == 3
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "posts"')]
+        assert len(updates) == 1 and 'RETURNING' in updates[0]
+        reads = [query['sql'] for query in queries if query['sql'].startswith('SELECT') and 'FROM "posts"' in query['sql']]
+        # Only the lookup before the vote
+        assert len(reads) == 1
+        
     def test_vote_unauthenticated(self, api_client, create_post):
         """Test voting without authentication"""
         post = create_post()
@@ -306,6 +672,114 @@ class TestPostVoting:
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
 
+@pytest.mark.django_db(transaction=True)
+class TestVoteConcurrency:
+    """Test vote_post under concurrent voters"""
+    
+    def test_vote_status_matches_vote_rows(self, thread_db, create_user, create_post):
+        """Test vote_status equals SUM(vote_value) after many concurrent votes"""
+        post = create_post()
+        users = [create_user() for _ in range(8)]
+        url = reverse('posts:vote-post', kwargs={'post_id': post.id})
+        errors = []
+        
+        def voter(user, seed):
+            client = APIClient()
+            client.force_authenticate(user=user)
+            rng = random.Random(seed)
+            try:
+                for _ in range(6):
+                    vote_value = rng.choice([1, -1])
+                    # SQLite serializes writers; retry when the file lock is busy
+                    for _ in range(50):
+                        try:
+                            response = client.post(url, {'vote_value': vote_value}, format='json')
+                            break
+                        except OperationalError:
+                            time.sleep(0.01)
+                    else:
+                        raise AssertionError('database stayed locked')
+                    assert response.status_code == status.HTTP_200_OK
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=voter, args=(user, i)) for i, user in enumerate(users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert not errors
+        post.refresh_from_db()
+        total = PostVote.objects.filter(post=post).aggregate(total=Sum('vote_value'))['total'] or 0
+        assert post.vote_status == total
+        assert post.hot_score == pytest.approx(hot_score(total, post.created_at))
+
+
+@pytest.mark.django_db
+class TestVoteWriteBehind:
+    """Test the optional write-behind vote buffer"""
+    
+    @pytest.fixture(autouse=True)
+    def write_behind(self, settings):
+        settings.VOTE_WRITE_BEHIND = True
+        settings.VOTE_FLUSH_INTERVAL = 0  # flush explicitly in tests
+        
+    def test_vote_is_buffered(self, authenticated_client, create_post):
+        """Test votes are durable but vote_status waits for a flush"""
+        post = create_post()
+        
+        url = reverse('posts:vote-post', kwargs={'post_id': post.id})
+        response = authenticated_client.post(url, {'vote_value': 1}, format='json')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['vote_status'] == 1
+        assert PostVote.objects.filter(post=post).count() == 1
+        post.refresh_from_db()
+        assert post.vote_status == 0
+        
+    def test_reads_include_buffered_votes(self, authenticated_client, create_post):
+        """Test list and detail responses expose the buffered value"""
+        post = create_post()
+        PendingVoteDelta.objects.create(post=post, delta=3)
+        PendingVoteDelta.objects.create(post=post, delta=-1)
+        
+        detail = authenticated_client.get(reverse('posts:post-detail', kwargs={'pk': post.id}))
+        listing = authenticated_client.get(reverse('posts:post-list'), {'community_id': post.community_id})
+        
+        assert detail.data['voteStatus'] == 2
+        assert listing.data[0]['voteStatus'] == 2
+        
+    def test_flush_coalesces_deltas(self, create_post):
+        """Test flush applies one summed delta per post and empties the buffer"""
+        post = create_post()
+        other = create_post()
+        for delta in (1, 1, -1, 2):
+            PendingVoteDelta.objects.create(post=post, delta=delta)
+        PendingVoteDelta.objects.create(post=other, delta=-1)
+        
+        assert vote_buffer.flush_all() == 5
+        
+        post.refresh_from_db()
+        other.refresh_from_db()
+        assert post.vote_status == 3
+        assert other.vote_status == -1
+        assert post.hot_score == pytest.approx(hot_score(3, post.created_at))
+        assert not PendingVoteDelta.objects.exists()
+        
+    def test_flush_command(self, create_post):
+        """Test the management command drains the buffer"""
+        post = create_post()
+        PendingVoteDelta.objects.create(post=post, delta=1)
+        
+        call_command('flush_vote_buffer', stdout=io.StringIO())
+        
+        post.refresh_from_db()
+        assert post.vote_status == 1
+
+
 @pytest.mark.django_db
 class TestUserPostVotes:
     """Test user post votes endpoint"""
@@ -333,3 +807,900 @@ class TestUserPostVotes:
         
         assert response.status_code == status.HTTP_200_OK
         assert len(response.data) >= 1  # At least one vote for the queried community
+        
+    def test_get_user_votes_for_post_ids(self, authenticated_client, create_post):
+        """Test fetching votes for specific posts only"""
+        post1 = create_post()
+        post2 = create_post()
+        post3 = create_post()
+        for post in (post1, post2, post3):
+            PostVote.objects.create(
+                user=authenticated_client.user,
+                post=post,
+                community=post.community,
+                vote_value=1
+            )
+        
+        url = reverse('posts:user-post-votes')
+        response = authenticated_client.get(url, {'post_ids': f'{post1.id},{post3.id}'})
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert sorted(vote['postId'] for vote in response.data) == sorted([post1.id, post3.id])
+        
+    def test_get_user_votes_invalid_post_ids(self, authenticated_client):
+        """Test malformed post_ids are rejected"""
+        url = reverse('posts:user-post-votes')
+        response = authenticated_client.get(url, {'post_ids': '1,abc'})
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestViewerVote:
+    """Test embedding the requesting user's vote in post responses"""
+    
+    def test_list_includes_viewer_vote(self, authenticated_client, create_post, create_community):
+        """Test list annotates voteValue per post when requested"""
+        community = create_community()
+        voted = create_post(community=community)
+        create_post(community=community)
+        PostVote.objects.create(
+            user=authenticated_client.user, post=voted, community=community, vote_value=-1
+        )
+        
+        url = reverse('posts:post-list')
+        response = authenticated_client.get(url, {'community_id': community.id, 'include_vote': 'true'})
+        
+        assert response.status_code == status.HTTP_200_OK
+        votes = {item['id']: item['voteValue'] for item in response.data}
+        assert votes[voted.id] == -1
+        assert list(votes.values()).count(None) == 1
+        
+    def test_detail_and_feed_include_viewer_vote(self, authenticated_client, create_post):
+        """Test detail and feed endpoints annotate voteValue when requested"""
+        post = create_post()
+        CommunityMember.objects.create(user=authenticated_client.user, community=post.community)
+        PostVote.objects.create(
+            user=authenticated_client.user, post=post, community=post.community, vote_value=1
+        )
+        
+        detail = authenticated_client.get(
+            reverse('posts:post-detail', kwargs={'pk': post.id}), {'include_vote': '1'}
+        )
+        feed = authenticated_client.get(reverse('posts:home-feed'), {'include_vote': '1'})
+        
+        assert detail.data['voteValue'] == 1
+        assert feed.data['results'][0]['voteValue'] == 1
+        
+    def test_vote_omitted_by_default(self, authenticated_client, create_post):
+        """Test voteValue is not added unless requested"""
+        post = create_post()
+        
+        url = reverse('posts:post-detail', kwargs={'pk': post.id})
+        response = authenticated_client.get(url)
+        
+        assert 'voteValue' not in response.data
+
+
+@pytest.mark.django_db
+class TestHotQueryPlans:
+    """Test that hot queries are served by indexes"""
+    
+    def test_hot_queries_use_indexes(self, create_comment):
+        """Test no hot query falls back to a sequential scan or sort"""
+        create_comment()
+        
+        failures = {name: problems for name, _, problems in check_hot_queries() if problems}
+        
+        assert failures == {}
+        
+    def test_plan_problem_detection(self):
+        """Test the EXPLAIN parser flags scans and sorts"""
+        sqlite_plan = '2 0 0 SCAN posts\n9 0 0 USE TEMP B-TREE FOR ORDER BY'
+        postgres_plan = 'Limit\n  ->  Sort  (cost=1.0..2.0)\n        ->  Seq Scan on posts  (cost=0..1)'
+        
+        assert plan_problems(sqlite_plan, 'sqlite') == ['sequential scan posts', 'sort']
+        assert plan_problems(postgres_plan, 'postgresql') == ['sequential scan posts', 'sort']
+        assert plan_problems('4 0 0 SCAN posts USING INDEX posts_created_idx', 'sqlite') == []
+        
+    def test_check_query_plans_command(self):
+        """Test the command passes on a seeded database"""
+        out = io.StringIO()
+        call_command('check_query_plans', '--seed', '200', stdout=out)
+        
+        assert 'FAIL' not in out.getvalue()
+
+
+@pytest.mark.django_db
+class TestRenderers:
+    """Test the orjson and MessagePack renderers against DRF's JSONRenderer"""
+    
+    @pytest.fixture
+    def payload(self, create_post, create_community):
+        """PostSerializer output with text JSON has to escape"""
+        community = create_community(image_url='https://example.com/ünïcode.png')
+        create_post(community=community, title='Café \U0001F600 \u2028 line \u2029', body='tab\tquote" back\\ nul\x00 del\x7f')
+        create_post(community=community, image_url='data:image/png;base64,AAAA')
+        request = APIRequestFactory().get('/api/posts/')
+        return PostSerializer(Post.objects.order_by('id'), many=True, context={'request': request}).data
+    
+    def test_json_bytes_match(self, payload):
+        """Test byte-for-byte equal output for serializer data and other encoder types"""
+        extras = {
+            'errors': {'title': [ErrorDetail('This field is required.', code='required')]},
+            'decimal': Decimal('1.50'),
+            'lazy': gettext_lazy('Not found.'),
+            'tuple': (1, 'two', None, True),
+            'set': {3},
+            'bytes': b'raw',
+            1: 'integer key',
+        }
+        
+        for data in (payload, extras, [], {}, 'text', 0):
+            assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+        assert ORJSONRenderer().render(None) == b''
+    
+    def test_fallbacks_match(self, payload):
+        """Test indented output and values orjson rejects"""
+        for data, media_type in [
+            (payload, 'application/json; indent=2'),
+            ({'big': 2 ** 70}, None),
+        ]:
+            assert ORJSONRenderer().render(data, media_type) == JSONRenderer().render(data, media_type)
+    
+    def test_msgpack_matches_json(self, payload):
+        """Test that a decoded MessagePack body equals the parsed JSON body"""
+        decoded = msgpack.unpackb(MessagePackRenderer().render(payload))
+        
+        assert decoded == json.loads(JSONRenderer().render(payload))
+    
+    def test_accept_negotiation(self, api_client, create_post):
+        """Test that endpoints pick the renderer from Accept, with separate ETags"""
+        create_post(title='Negotiated')
+        url = reverse('posts:post-list')
+        
+        as_json = api_client.get(url)
+        as_msgpack = api_client.get(url, HTTP_ACCEPT='application/msgpack')
+        by_format = api_client.get(url, {'format': 'msgpack'})
+        
+        assert as_json['Content-Type'] == 'application/json'
+        assert as_json.content == JSONRenderer().render(as_json.data)
+        assert as_msgpack['Content-Type'] == 'application/msgpack'
+        assert msgpack.unpackb(as_msgpack.content) == json.loads(as_json.content)
+        assert by_format.content == as_msgpack.content
+        assert as_msgpack['ETag'] != as_json['ETag']
+        assert 'Accept' in as_msgpack['Vary']
+
+
+@pytest.mark.django_db
+class TestPostListCache:
+    """Test versioned response cache on the post list"""
+    
+    def cache_count(self, result):
+        return response_cache_requests.labels(view='PostListView', result=result)._value.get()
+    
+    def test_repeated_request_served_from_cache(self, api_client, create_post, django_assert_num_queries):
+        """Test that a cache hit issues no queries and counts as a hit"""
+        post = create_post()
+        url = reverse('posts:post-list')
+        hits = self.cache_count('hit')
+        
+        first = api_client.get(url, {'community_id': post.community_id})
+        with django_assert_num_queries(0):
+            second = api_client.get(url, {'community_id': post.community_id})
+        
+        assert second.status_code == status.HTTP_200_OK
+        assert second.data == first.data
+        assert self.cache_count('hit') == hits + 1
+        
+    def test_new_post_invalidates_list(self, authenticated_client, create_community, django_capture_on_commit_callbacks):
+        """Test that creating a post bumps the community and global versions"""
+        community = create_community()
+        url = reverse('posts:post-list')
+        assert authenticated_client.get(url, {'community_id': community.id}).data == []
+        assert authenticated_client.get(url).data == []
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.post(reverse('posts:post-create'), {
+                'title': 'Fresh', 'body': 'Body', 'community_id': community.id,
+            })
+        
+        assert len(authenticated_client.get(url, {'community_id': community.id}).data) == 1
+        assert len(authenticated_client.get(url).data) == 1
+        
+    def test_vote_invalidates_list(self, authenticated_client, create_post, django_capture_on_commit_callbacks):
+        """Test that a vote is visible in the next list response"""
+        post = create_post()
+        url = reverse('posts:post-list')
+        assert authenticated_client.get(url).data[0]['voteStatus'] == 0
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.post(reverse('posts:vote-post', kwargs={'post_id': post.id}), {'vote_value': 1}, format='json')
+        
+        assert authenticated_client.get(url).data[0]['voteStatus'] == 1
+        
+    def test_other_community_keeps_cache(self, api_client, create_post, create_community, django_capture_on_commit_callbacks):
+        """Test that a write only invalidates the lists it affects"""
+        post = create_post()
+        other = create_community()
+        url = reverse('posts:post-list')
+        api_client.get(url, {'community_id': other.id})
+        hits = self.cache_count('hit')
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            from reddit_api.cache import invalidate_post_lists
+            invalidate_post_lists(post.community_id)
+        api_client.get(url, {'community_id': other.id})
+        
+        assert self.cache_count('hit') == hits + 1
+        
+    def test_viewer_vote_bypasses_cache(self, authenticated_client, create_post):
+        """Test that personalized responses are never cached"""
+        create_post()
+        url = reverse('posts:post-list')
+        misses = self.cache_count('miss')
+        
+        authenticated_client.get(url, {'include_vote': '1'})
+        authenticated_client.get(url, {'include_vote': '1'})
+        
+        assert self.cache_count('miss') == misses
+        
+    def test_disabled_without_shared_cache(self, api_client, create_post, settings):
+        """Test that lists are neither cached nor revalidated when API_RESPONSE_CACHE is off"""
+        settings.API_RESPONSE_CACHE = False
+        post = create_post()
+        url = reverse('posts:post-list')
+        misses = self.cache_count('miss')
+        api_client.get(url)
+        
+        Post.objects.filter(id=post.id).update(title='Edited elsewhere')
+        response = api_client.get(url)
+        
+        assert response.data[0]['title'] == 'Edited elsewhere'
+        assert 'ETag' not in response
+        assert self.cache_count('miss') == misses
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+    """Test ETag / Last-Modified handling on post endpoints"""
+    
+    def test_detail_returns_validators(self, api_client, create_post):
+        """Test that a post detail carries ETag and Last-Modified"""
+        post = create_post()
+        response = api_client.get(reverse('posts:post-detail', kwargs={'pk': post.id}))
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'].startswith('"')
+        assert 'Last-Modified' in response
+        assert 'no-cache' in response['Cache-Control']
+        
+    def test_detail_not_modified(self, api_client, create_post, django_assert_max_num_queries):
+        """Test that a matching If-None-Match gets a 304 from a single query"""
+        post = create_post()
+        url = reverse('posts:post-detail', kwargs={'pk': post.id})
+        etag = api_client.get(url)['ETag']
+        
+        with django_assert_max_num_queries(1):
+            response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+        assert not response.content
+        
+    def test_detail_if_modified_since(self, api_client, create_post):
+        """Test that If-Modified-Since at Last-Modified gets a 304"""
+        post = create_post()
+        url = reverse('posts:post-detail', kwargs={'pk': post.id})
+        last_modified = api_client.get(url)['Last-Modified']
+        
+        response = api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        
+    def test_vote_changes_detail_etag(self, authenticated_client, create_post, django_capture_on_commit_callbacks):
+        """Test that a vote invalidates the ETag although edited_at is unchanged"""
+        post = create_post()
+        url = reverse('posts:post-detail', kwargs={'pk': post.id})
+        etag = authenticated_client.get(url)['ETag']
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.post(reverse('posts:vote-post', kwargs={'post_id': post.id}), {'vote_value': 1}, format='json')
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+        assert response.data['voteStatus'] == 1
+        
+    def test_vote_changes_detail_etag_without_cache_bump(self, authenticated_client, create_post):
+        """Test that detail validators come from the row, not from this worker's cache"""
+        post = create_post()
+        url = reverse('posts:post-detail', kwargs={'pk': post.id})
+        etag = authenticated_client.get(url)['ETag']
+        
+        # On-commit cache bumps never run, as for a vote served by another worker
+        authenticated_client.post(reverse('posts:vote-post', kwargs={'post_id': post.id}), {'vote_value': 1}, format='json')
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['voteStatus'] == 1
+        
+    def test_community_update_changes_detail_etag(self, api_client, create_post):
+        """Test that editing the embedded community invalidates the post ETag"""
+        post = create_post()
+        url = reverse('posts:post-detail', kwargs={'pk': post.id})
+        etag = api_client.get(url)['ETag']
+        
+        post.community.image_url = 'https://example.com/new.png'
+        post.community.save()
+        
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+        
+    def test_missing_post_is_not_found(self, api_client):
+        """Test that validators do not mask a 404"""
+        response = api_client.get(reverse('posts:post-detail', kwargs={'pk': 999999}), HTTP_IF_NONE_MATCH='"x"')
+        
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        
+    def test_list_not_modified_without_queries(self, api_client, create_post, django_assert_num_queries):
+        """Test that a list revalidation is answered from the version counters"""
+        create_post()
+        url = reverse('posts:post-list')
+        etag = api_client.get(url)['ETag']
+        
+        with django_assert_num_queries(0):
+            response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        
+    def test_list_validators_expire(self, api_client, create_post, settings):
+        """Test that list version counters expire with the cached responses"""
+        settings.API_CACHE_TIMEOUT = 0.2
+        create_post()
+        url = reverse('posts:post-list')
+        etag = api_client.get(url)['ETag']
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+        
+        time.sleep(0.3)
+        
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+        
+    def test_list_etag_changes_after_new_post(self, authenticated_client, create_community, django_capture_on_commit_callbacks):
+        """Test that a new post makes the list ETag stale"""
+        community = create_community()
+        url = reverse('posts:post-list')
+        etag = authenticated_client.get(url)['ETag']
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.post(reverse('posts:post-create'), {
+                'title': 'Fresh', 'body': 'Body', 'community_id': community.id,
+            })
+        
+        assert authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+        
+    def test_etag_depends_on_media_type(self, api_client, create_post):
+        """Test that JSON and browsable API representations get different ETags"""
+        create_post()
+        url = reverse('posts:post-list')
+        
+        json_etag = api_client.get(url, HTTP_ACCEPT='application/json')['ETag']
+        html_etag = api_client.get(url, HTTP_ACCEPT='text/html')['ETag']
+        
+        assert json_etag != html_etag
+
+
+PNG_BYTES = b'\x89PNG\r\n\x1a\nlegacy-image'
+PNG_DATA_URL = 'data:image/png;base64,' + base64.b64encode(PNG_BYTES).decode('ascii')
+
+
+@pytest.mark.django_db
+class TestLegacyImageMigration:
+    """Test moving base64 image blobs into media storage"""
+    
+    @pytest.fixture(autouse=True)
+    def media(self, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path)
+        return tmp_path
+    
+    def run(self, tmp_path, *args):
+        out = io.StringIO()
+        call_command('migrate_legacy_images', '--checkpoint', str(tmp_path / 'checkpoint.json'), *args, stdout=out)
+        return out.getvalue()
+    
+    def test_decode_data_url(self):
+        """Test decoding a data URL into bytes and an extension"""
+        assert legacy_images.decode_data_url(PNG_DATA_URL) == (PNG_BYTES, '.png')
+        with pytest.raises(ValueError):
+            legacy_images.decode_data_url('data:text/plain;base64,aGk=')
+        with pytest.raises(ValueError):
+            legacy_images.decode_data_url('data:image/svg+xml;base64,PHN2Zy8+')
+        with pytest.raises(ValueError):
+            legacy_images.decode_data_url('https://example.com/a.png')
+    
+    def test_migrates_all_tables(self, media, create_post, create_community, create_user):
+        """Test that posts, communities and users get files instead of blobs"""
+        post = create_post(image_url=PNG_DATA_URL)
+        community = create_community(image_url=PNG_DATA_URL)
+        user = create_user(photo_url_legacy=PNG_DATA_URL)
+        remote = create_post(image_url='https://example.com/remote.png')
+        
+        output = self.run(media)
+        
+        post.refresh_from_db()
+        community.refresh_from_db()
+        user.refresh_from_db()
+        remote.refresh_from_db()
+        digest = hashlib.sha256(PNG_BYTES).hexdigest()
+        assert post.image_url is None and post.image.name == f'posts/{digest[:2]}/{digest}.png'
+        assert StoredImage.objects.get(name=post.image.name).refcount == 1
+        assert community.image_url is None and community.image.name.startswith('communities/')
+        assert user.photo_url_legacy is None and user.photo.name.startswith('users/')
+        assert (media / post.image.name).read_bytes() == PNG_BYTES
+        assert remote.image_url == 'https://example.com/remote.png'
+        assert 'posts.Post: 1 migrated' in output
+        assert not (media / 'checkpoint.json').exists()
+    
+    def test_invalid_blob_left_in_place(self, media, create_post):
+        """Test that undecodable blobs are reported and kept"""
+        post = create_post(image_url='data:image/png;base64,!!!')
+        
+        output = self.run(media)
+        
+        post.refresh_from_db()
+        assert post.image_url == 'data:image/png;base64,!!!'
+        assert not post.image
+        assert '1 invalid' in output
+    
+    def test_resumes_from_checkpoint(self, media, create_post):
+        """Test that rows up to the checkpointed pk are not scanned again"""
+        first = create_post(image_url=PNG_DATA_URL)
+        second = create_post(image_url=PNG_DATA_URL)
+        (media / 'checkpoint.json').write_text(json.dumps({'posts.Post': first.pk}))
+        
+        self.run(media)
+        
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert first.image_url == PNG_DATA_URL
+        assert second.image_url is None and second.image
+    
+    def test_checkpoint_written_per_batch(self, create_post):
+        """Test that progress is saved after every batch"""
+        posts = [create_post(image_url=PNG_DATA_URL) for _ in range(3)]
+        seen = []
+        
+        def interrupt(last_pk, stats):
+            seen.append(last_pk)
+            raise KeyboardInterrupt
+        
+        with pytest.raises(KeyboardInterrupt):
+            legacy_images.migrate_model('posts.Post', 'image_url', 'image', 'edited_at', batch_size=2, on_batch=interrupt)
+        
+        assert seen == [posts[1].pk]
+        assert Post.objects.filter(image_url=PNG_DATA_URL).count() == 1
+    
+    def test_concurrent_edit_wins(self, media, create_post, monkeypatch):
+        """Test that a row edited during the upload is left alone"""
+        post = create_post(image_url=PNG_DATA_URL)
+        field = Post._meta.get_field('image')
+        original_save = field.storage.save
+        
+        def save_and_edit(name, content, **kwargs):
+            saved = original_save(name, content, **kwargs)
+            Post.objects.filter(pk=post.pk).update(edited_at=timezone.now() + timedelta(seconds=1))
+            return saved
+        
+        monkeypatch.setattr(field.storage, 'save', save_and_edit)
+        result = legacy_images.migrate_row(Post, post.pk, 'image_url', 'image', 'edited_at')
+        
+        post.refresh_from_db()
+        assert result == 'changed'
+        assert post.image_url == PNG_DATA_URL
+        # Left unreferenced for collect_unused_images
+        assert StoredImage.objects.get().refcount == 0
+    
+    def test_reference_committed_with_row(self, media, create_post, monkeypatch):
+        """Test that a failure taking the reference also rolls back the row switch"""
+        post = create_post(image_url=PNG_DATA_URL)
+        
+        def crash(name):
+            raise RuntimeError('worker died')
+        
+        monkeypatch.setattr(StoredImage, 'acquire', crash)
+        with pytest.raises(RuntimeError):
+            legacy_images.migrate_row(Post, post.pk, 'image_url', 'image', 'edited_at')
+        
+        post.refresh_from_db()
+        assert post.image_url == PNG_DATA_URL
+        assert not post.image
+
+
+def make_jpeg(width, height, exif=True):
+    image = Image.new('RGB', (width, height), (200, 30, 30))
+    buffer = io.BytesIO()
+    extra = {}
+    if exif:
+        tags = Image.Exif()
+        tags[0x010F] = 'Camera maker'  # Make
+        tags[0x0112] = 1  # Orientation
+        extra['exif'] = tags.tobytes()
+    image.save(buffer, 'JPEG', **extra)
+    return buffer.getvalue()
+
+
+@pytest.mark.django_db
+class TestImageVariants:
+    """Test resized JPEG/WebP image variants"""
+    
+    @pytest.fixture(autouse=True)
+    def media(self, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path)
+        return tmp_path
+    
+    def test_render_variants_strips_metadata(self):
+        """Test sizes, formats and that EXIF is not copied"""
+        rendered = render_variants(make_jpeg(1000, 500), (320, 640, 1080))
+        
+        assert [(fmt, width) for fmt, width, _ in rendered] == [
+            ('jpeg', 320), ('webp', 320), ('jpeg', 640), ('webp', 640), ('jpeg', 1000), ('webp', 1000),
+        ]
+        for fmt, width, content in rendered:
+            with Image.open(io.BytesIO(content)) as variant:
+                assert variant.format == fmt.upper()
+                assert variant.size == (width, width // 2)
+                assert 'exif' not in variant.info
+                assert not variant.getexif()
+        
+    def test_render_variants_never_upscales(self):
+        """Test that a small image yields a single size"""
+        rendered = render_variants(make_jpeg(30, 30, exif=False), (40, 80, 256))
+        
+        assert {width for _, width, _ in rendered} == {30}
+        
+    def test_build_variants_and_srcset(self, api_client, create_post, media):
+        """Test that variants are stored next to the original and exposed as srcset"""
+        post = create_post(image=SimpleUploadedFile('cat.jpg', make_jpeg(800, 400), content_type='image/jpeg'))
+        
+        variants = image_variants.build_variants('posts.Post', post.pk)
+        
+        root = post.image.name[:-len('.jpg')]
+        assert variants['source'] == post.image.name
+        assert variants['webp']['320'] == f'{root}.320w.webp'
+        assert (media / f'{root}.640w.jpg').exists()
+        data = api_client.get(reverse('posts:post-detail', kwargs={'pk': post.id})).data
+        assert data['imageSrcset']['webp'] == (
+            f'http://testserver/media/{root}.320w.webp 320w, '
+            f'http://testserver/media/{root}.640w.webp 640w, '
+            f'http://testserver/media/{root}.800w.webp 800w'
+        )
+        listed = api_client.get(reverse('posts:post-list')).data[0]
+        assert listed['imageSrcset'] == data['imageSrcset']
+        
+    @pytest.mark.parametrize('owner', ['post', 'community'])
+    def test_built_variants_invalidate_post_lists(self, api_client, create_post, create_community, owner,
+                                                  django_capture_on_commit_callbacks):
+        """Test that a list cached before the variants existed is not served afterwards"""
+        image = SimpleUploadedFile('cat.jpg', make_jpeg(400, 400), content_type='image/jpeg')
+        if owner == 'post':
+            post = create_post(image=image)
+            label, pk, field = 'posts.Post', post.pk, 'imageSrcset'
+        else:
+            post = create_post(community=create_community(image=image))
+            label, pk, field = 'communities.Community', post.community_id, 'communityImageSrcset'
+        url = reverse('posts:post-list')
+        before = api_client.get(url, {'community_id': post.community_id})
+        assert before.data[0][field] is None
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            image_variants.build_variants(label, pk)
+        response = api_client.get(url, {'community_id': post.community_id}, HTTP_IF_NONE_MATCH=before['ETag'])
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data[0][field]['webp']
+        
+    def test_stale_variants_ignored(self, api_client, create_post):
+        """Test that variants of a replaced image are not served"""
+        post = create_post(image=SimpleUploadedFile('cat.jpg', make_jpeg(400, 400), content_type='image/jpeg'))
+        image_variants.build_variants('posts.Post', post.pk)
+        post.refresh_from_db()
+        post.image = SimpleUploadedFile('dog.jpg', make_jpeg(400, 300), content_type='image/jpeg')
+        post.save()
+        
+        data = api_client.get(reverse('posts:post-detail', kwargs={'pk': post.id})).data
+        
+        assert data['imageSrcset'] is None
+        assert data['imageURL'].endswith(post.image.name)
+        
+    def test_upload_schedules_variants_after_commit(self, authenticated_client, create_community, monkeypatch, django_capture_on_commit_callbacks):
+        """Test that creating a post with an image queues a job off the request path"""
+        community = create_community()
+        submitted = []
+        
+        class Executor:
+            def submit(self, fn, *args):
+                submitted.append(args)
+        
+        monkeypatch.setattr(image_variants, '_get_executor', Executor)
+        with django_capture_on_commit_callbacks(execute=True):
+            response = authenticated_client.post(reverse('posts:post-create'), {
+                'title': 'Picture', 'community_id': community.id,
+                'image': SimpleUploadedFile('cat.jpg', make_jpeg(100, 100), content_type='image/jpeg'),
+            }, format='multipart')
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        assert submitted == [('posts.Post', response.data['id'])]
+        
+    def test_command_backfills_once(self, create_post, create_community):
+        """Test that the command builds missing variants and skips current ones"""
+        create_post(image=SimpleUploadedFile('a.jpg', make_jpeg(200, 100), content_type='image/jpeg'))
+        community = create_community(image=SimpleUploadedFile('icon.png', make_jpeg(120, 120), content_type='image/png'))
+        out = io.StringIO()
+        
+        call_command('generate_image_variants', stdout=out)
+        call_command('generate_image_variants', stdout=out)
+        
+        community.refresh_from_db()
+        assert set(community.image_variants['jpeg']) == {'40', '80', '120'}
+        assert out.getvalue().count('posts.Post: 1 built') == 1
+        assert 'posts.Post: 0 built' in out.getvalue()
+
+
+def stub_uploaded_object(stubber, key, content, content_type='image/png'):
+    """Queue the HEAD and ranged GET that verify a finished direct upload"""
+    stubber.add_response(
+        'head_object',
+        {'ContentLength': len(content), 'ContentType': content_type},
+        {'Bucket': 'test-bucket', 'Key': f'media/{key}'},
+    )
+    head = content[:16]
+    stubber.add_response(
+        'get_object',
+        {'Body': StreamingBody(io.BytesIO(head), len(head))},
+        {'Bucket': 'test-bucket', 'Key': f'media/{key}', 'Range': 'bytes=0-15'},
+    )
+
+
+@pytest.mark.django_db
+class TestDirectUploads:
+    """Test presigned direct-to-bucket image uploads"""
+    
+    def test_presign_returns_policy_for_user_key(self, authenticated_client, s3_stub):
+        """Test that the presigned POST targets a fresh key owned by the user"""
+        response = authenticated_client.post(reverse('presign_upload'), {
+            'kind': 'posts', 'contentType': 'image/png',
+        }, format='json')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['key'].startswith(f'posts/{authenticated_client.user.pk}/')
+        assert response.data['key'].endswith('.png')
+        assert response.data['url'].startswith('http://s3.test:9000/test-bucket')
+        fields = response.data['fields']
+        assert fields['key'] == 'media/' + response.data['key']
+        assert fields['Content-Type'] == 'image/png'
+        policy = json.loads(base64.b64decode(fields['policy']))
+        assert ['content-length-range', 1, 10 * 1024 * 1024] in policy['conditions']
+        
+    def test_presign_rejects_unknown_type(self, authenticated_client, s3_stub):
+        """Test that only image content types can be presigned"""
+        response = authenticated_client.post(reverse('presign_upload'), {
+            'kind': 'posts', 'contentType': 'text/html',
+        }, format='json')
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        
+    def test_presign_without_s3(self, authenticated_client):
+        """Test that local storage tells clients to upload through the API"""
+        response = authenticated_client.post(reverse('presign_upload'), {
+            'kind': 'posts', 'contentType': 'image/png',
+        }, format='json')
+        
+        assert response.status_code == status.HTTP_501_NOT_IMPLEMENTED
+        
+    def test_create_post_with_uploaded_key(self, authenticated_client, create_community, s3_stub):
+        """Test that a verified key becomes the post image without a file body"""
+        community = create_community()
+        key = f'posts/{authenticated_client.user.pk}/{"a" * 32}.png'
+        stub_uploaded_object(s3_stub, key, b'\x89PNG\r\n\x1a\n' + b'\x00' * 64)
+        
+        response = authenticated_client.post(reverse('posts:post-create'), {
+            'title': 'Direct', 'community_id': community.id, 'image_key': key,
+        }, format='json')
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Post.objects.get(id=response.data['id']).image.name == key
+        assert response.data['imageURL'].endswith(key)
+        
+    def test_key_of_other_user_rejected(self, authenticated_client, create_community, s3_stub):
+        """Test that a key outside the user's prefix is refused before any S3 call"""
+        community = create_community()
+        
+        response = authenticated_client.post(reverse('posts:post-create'), {
+            'title': 'Direct', 'community_id': community.id,
+            'image_key': f'posts/{authenticated_client.user.pk + 1}/{"a" * 32}.png',
+        }, format='json')
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'image_key' in response.data
+        
+    def test_missing_object_rejected(self, authenticated_client, create_community, s3_stub):
+        """Test that a key that was never uploaded is refused"""
+        community = create_community()
+        key = f'posts/{authenticated_client.user.pk}/{"b" * 32}.png'
+        s3_stub.add_client_error('head_object', service_error_code='404', http_status_code=404)
+        
+        response = authenticated_client.post(reverse('posts:post-create'), {
+            'title': 'Direct', 'community_id': community.id, 'image_key': key,
+        }, format='json')
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Post.objects.filter(title='Direct').exists()
+        
+    def test_non_image_bytes_rejected(self, authenticated_client, create_community, s3_stub):
+        """Test that the content is checked, not just the declared type"""
+        community = create_community()
+        key = f'posts/{authenticated_client.user.pk}/{"c" * 32}.png'
+        stub_uploaded_object(s3_stub, key, b'<html><script>alert(1)</script></html>')
+        
+        response = authenticated_client.post(reverse('posts:post-create'), {
+            'title': 'Direct', 'community_id': community.id, 'image_key': key,
+        }, format='json')
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestReconcileCounters:
+    """Test the reconcile_counters command and reddit_api.counters"""
+    
+    @pytest.fixture
+    def checkpoint(self, tmp_path):
+        return tmp_path / 'checkpoint.json'
+    
+    def reconcile_counters(self, checkpoint, *args, stdout):
+        call_command('reconcile_counters', '--checkpoint', str(checkpoint), *args, stdout=stdout)
+    
+    def drifted_post(self, create_post, create_user, create_comment):
+        post = create_post()
+        for value in (1, 1, -1):
+            PostVote.objects.create(user=create_user(), post=post, community=post.community, vote_value=value)
+        create_comment(post=post)
+        create_comment(post=post)
+        # Counters as left behind by a lost update
+        Post.objects.filter(id=post.id).update(vote_status=5, number_of_comments=0)
+        return post
+    
+    def test_corrects_all_counters(self, checkpoint, create_post, create_user, create_comment, create_community):
+        """Test that drifted counters are set from their source rows"""
+        post = self.drifted_post(create_post, create_user, create_comment)
+        in_sync = create_post()
+        community = create_community()
+        CommunityMember.objects.create(user=community.creator, community=community, is_moderator=True)
+        CommunityMember.objects.create(user=create_user(), community=community)
+        out = io.StringIO()
+        
+        self.reconcile_counters(checkpoint, '--batch-size', '2', stdout=out)
+        
+        post.refresh_from_db()
+        assert (post.vote_status, post.number_of_comments) == (1, 2)
+        assert post.hot_score == pytest.approx(hot_score(1, post.created_at))
+        assert Post.objects.get(id=in_sync.id).vote_status == 0
+        assert Community.objects.get(id=community.id).number_of_members == 2
+        assert f'post_votes {post.id}: stored 5, expected 1' in out.getvalue()
+        assert 'post_comments: scanned 2 rows, 1 drifted (total drift 2), 1 corrected' in out.getvalue()
+    
+    def test_dry_run_reports_only(self, checkpoint, create_post, create_user, create_comment):
+        """Test that --dry-run leaves the counters alone"""
+        post = self.drifted_post(create_post, create_user, create_comment)
+        out = io.StringIO()
+        
+        self.reconcile_counters(checkpoint, '--counter', 'post_votes', '--dry-run', stdout=out)
+        
+        assert Post.objects.get(id=post.id).vote_status == 5
+        assert 'post_votes: scanned 1 rows, 1 drifted (total drift 4), dry run' in out.getvalue()
+    
+    def test_buffered_votes_are_not_drift(self, create_post, create_user):
+        """Test that deltas waiting in the write-behind buffer are accounted for"""
+        post = create_post()
+        PostVote.objects.create(user=create_user(), post=post, community=post.community, vote_value=1)
+        PendingVoteDelta.objects.create(post=post, delta=1)
+        
+        report = reconcile('post_votes')
+        
+        assert report.drifted == 0
+        assert Post.objects.get(id=post.id).vote_status == 0
+    
+    def test_resumes_after_deadline(self, create_post, create_user, create_comment):
+        """Test that a run out of time reports where the next one continues"""
+        first = create_post()
+        post = self.drifted_post(create_post, create_user, create_comment)
+        
+        stopped = reconcile('post_comments', batch_size=1, deadline=time.monotonic())
+        assert not stopped.finished and stopped.scanned == 0
+        
+        resumed = reconcile('post_comments', batch_size=1, start_after=first.id)
+        
+        assert resumed.finished and resumed.scanned == 1
+        assert Post.objects.get(id=post.id).number_of_comments == 2
+    
+    def test_checkpoint_carries_over_runs(self, checkpoint, create_post, create_user, create_comment, monkeypatch):
+        """Test that --time-limit stores progress for the next run"""
+        post = self.drifted_post(create_post, create_user, create_comment)
+        clock = iter([0.0, 0.0, 100.0])
+        monkeypatch.setattr(time, 'monotonic', lambda: next(clock, 100.0))
+        out = io.StringIO()
+        
+        self.reconcile_counters(checkpoint, '--counter', 'post_comments', '--time-limit', '10', stdout=out)
+        assert json.loads(checkpoint.read_text()) == {'post_comments': post.id}
+        Post.objects.filter(id=post.id).update(number_of_comments=7)
+        self.reconcile_counters(checkpoint, '--counter', 'post_comments', stdout=out)
+        
+        assert f'post_comments: stopped at {post.id}' in out.getvalue()
+        # The second run started after the checkpoint, so the row was not revisited
+        assert Post.objects.get(id=post.id).number_of_comments == 7
+        self.reconcile_counters(checkpoint, '--counter', 'post_comments', stdout=out)
+        assert Post.objects.get(id=post.id).number_of_comments == 2
+        assert not checkpoint.exists()
+    
+    def test_buffered_votes_read_in_one_statement(self, create_post, create_user, django_assert_num_queries):
+        """Test that vote and buffered delta sums come from a single query"""
+        post = create_post()
+        PostVote.objects.create(user=create_user(), post=post, community=post.community, vote_value=1)
+        PendingVoteDelta.objects.create(post=post, delta=1)
+        PendingVoteDelta.objects.create(post=post, delta=-1)
+        
+        with django_assert_num_queries(1):
+            assert _expected('post_votes', pks=[post.id]) == {post.id: 1}
+
+
+@pytest.mark.django_db
+class TestPostQueryCounts:
+    """Test that post endpoints run a fixed number of queries however many rows they return"""
+    
+    @pytest.mark.parametrize('rows', [1, 5])
+    def test_post_list(self, api_client, create_post, django_assert_num_queries, rows):
+        """Test the post list (posts with their creators and communities)"""
+        for _ in range(rows):
+            create_post()
+        
+        with django_assert_num_queries(1):
+            response = api_client.get(reverse('posts:post-list'))
+        
+        assert len(response.data) == rows
+    
+    @pytest.mark.parametrize('rows', [1, 5])
+    def test_home_feed(self, authenticated_client, create_post, create_community, django_assert_num_queries, rows):
+        """Test the home feed of a member of several communities"""
+        for _ in range(rows):
+            community = create_community()
+            CommunityMember.objects.create(user=authenticated_client.user, community=community)
+            create_post(community=community)
+        
+        with django_assert_num_queries(4):
+            response = authenticated_client.get(reverse('posts:home-feed'), {'include_vote': 'true'})
+        
+        assert len(response.data['results']) == rows
+    
+    def test_post_detail(self, api_client, create_post, django_assert_num_queries):
+        """Test that the detail reads the post, creator and community together"""
+        post = create_post()
+        
+        with django_assert_num_queries(2):
+            response = api_client.get(reverse('posts:post-detail', kwargs={'pk': post.id}))
+        
+        assert response.data['communityId'] == post.community_id
+    
+    @pytest.mark.parametrize('rows', [1, 5])
+    def test_user_post_votes(self, authenticated_client, create_post, create_community, django_assert_num_queries, rows):
+        """Test both forms of the user's vote lookup"""
+        community = create_community()
+        posts = [create_post(community=community) for _ in range(rows)]
+        for post in posts:
+            PostVote.objects.create(user=authenticated_client.user, post=post, community=community, vote_value=1)
+        url = reverse('posts:user-post-votes')
+        
+        with django_assert_num_queries(2):
+            by_community = authenticated_client.get(url, {'community_id': community.id})
+        with django_assert_num_queries(2):
+            by_post = authenticated_client.get(url, {'post_ids': ','.join(str(post.id) for post in posts)})
+        
+        assert len(by_community.data) == len(by_post.data) == rows
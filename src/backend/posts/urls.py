@@ -1,6 +1,7 @@
 from django.urls import path
 from .views import (
     PostListView,
+    HomeFeedView,
     PostCreateView,
     PostDetailView,
     vote_post,
@@ -11,6 +12,7 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', PostListView.as_view(), name='post-list'),
+    path('feed/', HomeFeedView.as_view(), name='home-feed'),
     path('create/', PostCreateView.as_view(), name='post-create'),
     path('<int:pk>/', PostDetailView.as_view(), name='post-detail'),
     path('<int:post_id>/vote/', vote_post, name='vote-post'),
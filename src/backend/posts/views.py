@@ -1,32 +1,75 @@
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from .models import Post, PostVote
-from communities.models import Community
-from .serializers import PostSerializer, PostVoteSerializer
+from communities.models import Community, CommunityMember
+from .serializers import PostCardSerializer, PostSerializer, PostVoteSerializer
+from .feed import MergedFeedPagination
+from .ranking import score_updates
+from . import vote_buffer
+from reddit_api.cache import (
+    ConditionalRetrieveMixin,
+    VersionedCacheMixin,
+    invalidate_comment_lists,
+    invalidate_post_lists,
+    post_list_namespace,
+)
+from reddit_api.image_variants import schedule_variants
+from reddit_api.pagination import KeysetPagination
 
 
-class PostListView(generics.ListAPIView):
+MAX_VOTE_LOOKUP_IDS = 100
+
+
+def with_viewer_vote(queryset, request):
+    """Embed the requesting user's vote when asked with ?include_vote=true"""
+    include = request.query_params.get('include_vote', '').lower() in ('1', 'true', 'yes')
+    if include and request.user.is_authenticated:
+        return queryset.with_viewer_vote(request.user)
+    return queryset
+
+
+class PostListView(VersionedCacheMixin, generics.ListAPIView):
     """List all posts or posts by community"""
-    serializer_class = PostSerializer
+    serializer_class = PostCardSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    pagination_class = None  # Disable pagination for posts list
+    # Plain array by default (frontend expects it); ?cursor= opts into keyset pages
+    pagination_class = KeysetPagination
+    sort_orderings = {
+        'new': ('-created_at', '-id'),
+        'hot': ('-hot_score', '-id'),
+        'rising': ('-rising_score', '-id'),
+        'top': ('-vote_status', '-id'),
+    }
+    
+    def get_cache_namespaces(self):
+        return [post_list_namespace(self.request.query_params.get('community_id'))]
     
     def get_queryset(self):
         queryset = Post.objects.all()
         community_id = self.request.query_params.get('community_id')
         limit = self.request.query_params.get('limit')
+        sort = self.request.query_params.get('sort', 'new')
+        
+        if sort not in self.sort_orderings:
+            raise ValidationError({'sort': f"Must be one of: {', '.join(self.sort_orderings)}."})
+        # Read by KeysetPagination so cursors follow the requested sort
+        self.keyset_ordering = self.sort_orderings[sort]
         
         if community_id:
             queryset = queryset.filter(community_id=community_id)
         
-        queryset = queryset.select_related('creator', 'community').order_by('-created_at')
+        queryset = queryset.for_list().with_pending_votes().order_by(*self.keyset_ordering)
+        queryset = with_viewer_vote(queryset, self.request).as_cards()
         
-        # Apply limit if provided
-        if limit:
+        # Apply limit if provided (in cursor mode it is the page size instead)
+        if limit and not self.paginator.is_cursor_request(self.request):
             try:
                 queryset = queryset[:int(limit)]
             except (ValueError, TypeError):
@@ -35,6 +78,22 @@ class PostListView(generics.ListAPIView):
         return queryset
 
 
+class HomeFeedView(generics.ListAPIView):
+    """Newest posts across every community the user has joined"""
+    serializer_class = PostCardSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = MergedFeedPagination
+    
+    def get_queryset(self):
+        # Partitions for the per-community merge in MergedFeedPagination
+        self.feed_partitions = list(
+            CommunityMember.objects.filter(user=self.request.user)
+            .values_list('community_id', flat=True)
+        )
+        queryset = Post.objects.for_list().with_pending_votes()
+        return with_viewer_vote(queryset, self.request).as_cards()
+
+
 class PostCreateView(generics.CreateAPIView):
     """Create a new post"""
     serializer_class = PostSerializer
@@ -43,35 +102,95 @@ class PostCreateView(generics.CreateAPIView):
     def perform_create(self, serializer):
         community_id = self.request.data.get('community_id')
         if not community_id:
-            from rest_framework.exceptions import ValidationError
             raise ValidationError({'community_id': 'This field is required.'})
         try:
             community = Community.objects.get(id=community_id)
         except Community.DoesNotExist:
-            from rest_framework.exceptions import ValidationError
             raise ValidationError({'community_id': 'Community does not exist.'})
-        serializer.save(creator=self.request.user, community=community)
+        post = serializer.save(creator=self.request.user, community=community)
+        schedule_variants(post)
+        invalidate_post_lists(community.id)
 
 
-class PostDetailView(generics.RetrieveDestroyAPIView):
+class PostDetailView(ConditionalRetrieveMixin, generics.RetrieveDestroyAPIView):
     """Get or delete a post"""
-    queryset = Post.objects.all()
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     
+    def get_queryset(self):
+        # The post embeds its creator's name and its community's image
+        queryset = Post.objects.select_related('creator', 'community').with_pending_votes()
+        return with_viewer_vote(queryset, self.request)
+    
+    def get_validators(self):
+        # Database columns only, so every worker agrees. The post embeds its
+        # community's image; votes and comment counts change
+        # counters_changed_at instead of edited_at.
+        fields = ['edited_at', 'counters_changed_at', 'community__updated_at']
+        if vote_buffer.enabled():
+            # Buffered votes show in the body (and ETag) before the flush
+            # moves counters_changed_at
+            fields.append('pending_vote_delta')
+        row = Post.objects.filter(pk=self.kwargs['pk']).with_pending_votes().values(*fields).first()
+        if row is None:
+            return None
+        timestamps = [row['edited_at'], row['counters_changed_at'], row['community__updated_at']]
+        parts = [stamp.isoformat() for stamp in timestamps] + [row.get('pending_vote_delta')]
+        return tuple(parts), max(timestamps)
+    
     def perform_destroy(self, instance):
         # Only creator can delete
         if instance.creator != self.request.user:
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied('Not authorized')
         instance.delete()
+        invalidate_post_lists(instance.community_id)
+        invalidate_comment_lists(instance.id)
+
+
+def _apply_vote(user, post, vote_value):
+    """
+    Toggle/change/add the user's vote row and return ``(action, delta, vote_id)``.
+
+    Runs inside the caller's transaction. The existing vote is locked with
+    SELECT ... FOR UPDATE; a concurrent first vote by the same user surfaces
+    as an IntegrityError on ``unique_together`` and is retried against the
+    row that won.
+    """
+    for _ in range(3):
+        existing = (
+            PostVote.objects.select_for_update()
+            .filter(user=user, post_id=post.id)
+            .values_list('id', 'vote_value')
+            .first()
+        )
+        if existing:
+            vote_id, current_value = existing
+            if current_value == vote_value:
+                PostVote.objects.filter(id=vote_id).delete()
+                return 'removed', -vote_value, vote_id
+            PostVote.objects.filter(id=vote_id).update(
+                vote_value=vote_value, updated_at=timezone.now()
+            )
+            return 'changed', 2 * vote_value, vote_id
+        try:
+            with transaction.atomic():
+                new_vote = PostVote.objects.create(
+                    user=user,
+                    post_id=post.id,
+                    community_id=post.community_id,
+                    vote_value=vote_value
+                )
+            return 'added', vote_value, new_vote.id
+        except IntegrityError:
+            continue
+    raise IntegrityError('Could not apply vote after concurrent updates')
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def vote_post(request, post_id):
     """Vote on a post (upvote/downvote)"""
-    post = get_object_or_404(Post, id=post_id)
     vote_value = request.data.get('vote_value')  # 1 or -1
     
     if vote_value not in [1, -1]:
@@ -80,61 +199,68 @@ def vote_post(request, post_id):
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    # Only the columns the vote path needs - never the body/image blobs
+    post = get_object_or_404(Post.objects.only('id', 'community_id', 'created_at'), id=post_id)
+    
     with transaction.atomic():
-        # Check existing vote
-        existing_vote = PostVote.objects.filter(
-            user=request.user,
-            post=post
-        ).first()
-        
-        if existing_vote:
-            if existing_vote.vote_value == vote_value:
-                # Remove vote
-                post.vote_status -= vote_value
-                post.save()
-                existing_vote.delete()
-                return Response({
-                    'message': 'Vote removed',
-                    'vote_status': post.vote_status,
-                    'removed': True
-                })
-            else:
-                # Change vote
-                post.vote_status += (2 * vote_value)
-                post.save()
-                existing_vote.vote_value = vote_value
-                existing_vote.save()
-                serializer = PostVoteSerializer(existing_vote)
-                return Response({
-                    'message': 'Vote changed',
-                    'vote_status': post.vote_status,
-                    'id': existing_vote.id,
-                    **serializer.data
-                })
+        action, delta, vote_id = _apply_vote(request.user, post, vote_value)
+        if vote_buffer.enabled():
+            # Write-behind: no lock on the (possibly viral) post row
+            vote_buffer.buffer_vote(post.id, delta)
+            vote_status = Post.objects.with_pending_votes().only('vote_status').get(id=post.id).current_vote_status
         else:
-            # New vote
-            new_vote = PostVote.objects.create(
-                user=request.user,
-                post=post,
-                community=post.community,
-                vote_value=vote_value
+            # Single-column atomic increment (plus derived scores), no row
+            # rewrite; the new count comes back from the same statement
+            vote_status = Post.objects.filter(id=post.id).update_returning(
+                'vote_status',
+                vote_status=F('vote_status') + delta,
+                **score_updates(post.created_at, vote_delta=delta)
             )
-            post.vote_status += vote_value
-            post.save()
-            serializer = PostVoteSerializer(new_vote)
-            return Response({
-                'message': 'Vote added',
-                'vote_status': post.vote_status,
-                'id': new_vote.id,
-                **serializer.data
-            })
+        invalidate_post_lists(post.community_id)
+    
+    if action == 'removed':
+        return Response({
+            'message': 'Vote removed',
+            'vote_status': vote_status,
+            'removed': True
+        })
+    
+    vote_data = {
+        'id': vote_id,
+        'postId': post.id,
+        'communityId': post.community_id,
+        'voteValue': vote_value,
+    }
+    return Response({
+        'message': 'Vote changed' if action == 'changed' else 'Vote added',
+        'vote_status': vote_status,
+        **vote_data
+    })
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_post_votes(request):
-    """Get user's post votes for a community"""
+    """Get user's post votes for a community, or for specific posts via ?post_ids=1,2,3"""
     community_id = request.query_params.get('community_id')
+    post_ids = request.query_params.get('post_ids')
+    
+    if post_ids is not None:
+        try:
+            ids = [int(pk) for pk in post_ids.split(',') if pk.strip()]
+        except ValueError:
+            return Response(
+                {'error': 'post_ids must be a comma-separated list of integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ids) > MAX_VOTE_LOOKUP_IDS:
+            return Response(
+                {'error': f'At most {MAX_VOTE_LOOKUP_IDS} post_ids per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        votes = PostVote.objects.filter(user=request.user, post_id__in=ids)
+        serializer = PostVoteSerializer(votes, many=True)
+        return Response(serializer.data)
     
     # If no community_id provided, return empty list instead of error
     if not community_id:
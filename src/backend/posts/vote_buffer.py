@@ -0,0 +1,127 @@
+"""
+Write-behind aggregation of post vote counts
+
+With ``VOTE_WRITE_BEHIND`` enabled, ``vote_post`` still writes the
+``PostVote`` row synchronously but, instead of incrementing
+``posts.vote_status`` (a row lock every voter on a viral post queues on), it
+appends the change to ``post_vote_deltas``. Inserts never contend with each
+other, and the table is shared by every gunicorn worker.
+
+``flush()`` coalesces pending deltas per post and applies them as one
+``UPDATE posts SET vote_status = vote_status + delta`` per post. Each worker
+runs a daemon flusher every ``VOTE_FLUSH_INTERVAL`` seconds and flushes once
+more at interpreter exit (gunicorn graceful shutdown). Rows are claimed with
+``SELECT ... FOR UPDATE SKIP LOCKED`` so concurrent flushers never apply the
+same delta twice, and anything left behind by a crashed worker is picked up
+by the next flush or by ``manage.py flush_vote_buffer``.
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import PendingVoteDelta, Post
+from .ranking import score_updates
+
+logger = logging.getLogger(__name__)
+
+_flusher = None
+_flusher_lock = threading.Lock()
+_stop = threading.Event()
+_exit_hook_registered = False
+
+
+def enabled():
+    return settings.VOTE_WRITE_BEHIND
+
+
+def buffer_vote(post_id, delta):
+    """Record a vote_status change to be applied by the next flush"""
+    PendingVoteDelta.objects.create(post_id=post_id, delta=delta)
+    ensure_flusher()
+
+
+def flush(batch_size=10000):
+    """
+    Apply up to ``batch_size`` pending deltas. Returns the number of buffer
+    rows consumed.
+    """
+    with transaction.atomic():
+        rows = list(
+            PendingVoteDelta.objects.select_for_update(skip_locked=True)
+            .order_by('id')
+            .values_list('id', 'post_id', 'delta')[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        totals = defaultdict(int)
+        for _, post_id, delta in rows:
+            totals[post_id] += delta
+        created = dict(
+            Post.objects.filter(id__in=list(totals)).values_list('id', 'created_at')
+        )
+        # Fixed lock order across flushers avoids deadlocks
+        for post_id in sorted(totals):
+            delta = totals[post_id]
+            if not delta or post_id not in created:
+                continue
+            Post.objects.filter(id=post_id).update(
+                vote_status=F('vote_status') + delta,
+                **score_updates(created[post_id], vote_delta=delta)
+            )
+        PendingVoteDelta.objects.filter(id__in=[row[0] for row in rows]).delete()
+    return len(rows)
+
+
+def flush_all(batch_size=10000):
+    """Flush until the buffer is empty. Returns the number of rows consumed."""
+    total = 0
+    while True:
+        flushed = flush(batch_size)
+        total += flushed
+        if flushed < batch_size:
+            return total
+
+
+def _run_flusher():
+    while not _stop.wait(settings.VOTE_FLUSH_INTERVAL):
+        try:
+            flush_all()
+        except Exception:
+            logger.exception('Vote buffer flush failed')
+        finally:
+            connection.close()
+
+
+def _flush_on_exit():
+    _stop.set()
+    try:
+        flush_all()
+    except Exception:
+        logger.exception('Vote buffer flush at shutdown failed')
+
+
+def ensure_flusher():
+    """
+    Start this process's background flusher on first use. A non-positive
+    ``VOTE_FLUSH_INTERVAL`` leaves flushing to ``manage.py flush_vote_buffer``.
+    """
+    global _flusher, _exit_hook_registered
+    if settings.VOTE_FLUSH_INTERVAL <= 0:
+        return
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _flusher_lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        _stop.clear()
+        _flusher = threading.Thread(target=_run_flusher, name='vote-buffer-flusher', daemon=True)
+        _flusher.start()
+        if not _exit_hook_registered:
+            atexit.register(_flush_on_exit)
+            _exit_hook_registered = True
@@ -0,0 +1,236 @@
+"""
+Versioned response cache and conditional GET support
+
+Every cached response belongs to one or more namespaces (e.g. the posts of a
+community). Each namespace has a version counter stored in the cache, and
+the counters are part of the response key. Invalidation is therefore a
+single ``incr`` per namespace; stale entries are never looked up again and
+simply expire.
+
+The same counters, together with the time of the last bump, are the
+validators for ``ETag`` / ``Last-Modified``. Conditional requests are
+answered with a 304 before the view queries or serializes anything.
+
+The counters expire after ``API_CACHE_TIMEOUT`` seconds like the responses
+themselves. With a per-process cache (the ``locmemcache://`` default) a
+bump only reaches the worker that handled the write; the expiry bounds how
+long another worker keeps answering 304 (or its cached body) for a stale
+list. Detail views build their validators from database columns instead.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from prometheus_client import Counter
+from rest_framework.response import Response
+
+response_cache_requests = Counter(
+    'api_response_cache_requests_total',
+    'Response cache lookups on list endpoints',
+    ['view', 'result'],
+)
+
+COMMUNITY_LIST_NAMESPACE = 'communities'
+# Community images as embedded in other responses (e.g. community snippets)
+COMMUNITY_IMAGES_NAMESPACE = 'communities:images'
+
+
+def post_list_namespace(community_id=None):
+    return f'posts:community:{community_id}' if community_id else 'posts:all'
+
+
+def comment_list_namespace(post_id=None):
+    return f'comments:post:{post_id}' if post_id else 'comments:all'
+
+
+def community_snippets_namespace(user_id):
+    """The communities one user has joined"""
+    return f'communities:user:{user_id}'
+
+
+def _version_key(namespace):
+    return f'cache-version:{quote(namespace)}'
+
+
+def _modified_key(namespace):
+    return f'cache-modified:{quote(namespace)}'
+
+
+def _counter_timeout():
+    return settings.API_CACHE_TIMEOUT
+
+
+def namespace_validators(namespaces):
+    """
+    Return ``(versions, last_modified)`` for the given namespaces,
+    initializing missing counters. ``last_modified`` is the latest bump.
+    """
+    version_keys = [_version_key(ns) for ns in namespaces]
+    modified_keys = [_modified_key(ns) for ns in namespaces]
+    found = cache.get_many(version_keys + modified_keys)
+    now = time.time()
+    timeout = _counter_timeout()
+    for version_key, modified_key in zip(version_keys, modified_keys):
+        if version_key not in found:
+            # Seed from the clock so an expired or evicted counter never
+            # restarts at a version whose entries may still be cached
+            cache.add(version_key, int(now * 1000), timeout=timeout)
+            found[version_key] = cache.get(version_key)
+        if modified_key not in found:
+            # Unknown history: claim "modified now" so clients revalidate
+            cache.add(modified_key, now, timeout=timeout)
+            found[modified_key] = cache.get(modified_key, now)
+    versions = [found[key] for key in version_keys]
+    modified = max(found[key] for key in modified_keys)
+    return versions, datetime.fromtimestamp(modified, tz=dt_timezone.utc)
+
+
+def bump_versions(*namespaces):
+    """Invalidate every cached response in the given namespaces (after commit)"""
+    def bump():
+        now = time.time()
+        timeout = _counter_timeout()
+        for namespace in namespaces:
+            key = _version_key(namespace)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, int(now * 1000), timeout=timeout)
+            cache.set(_modified_key(namespace), now, timeout=timeout)
+    transaction.on_commit(bump)
+
+
+def invalidate_post_lists(community_id):
+    bump_versions(post_list_namespace(), post_list_namespace(community_id))
+
+
+def invalidate_comment_lists(post_id):
+    bump_versions(comment_list_namespace(), comment_list_namespace(post_id))
+
+
+def invalidate_community_list():
+    bump_versions(COMMUNITY_LIST_NAMESPACE)
+
+
+def invalidate_community_snippets(user_id):
+    bump_versions(community_snippets_namespace(user_id))
+
+
+def invalidate_community_images():
+    bump_versions(COMMUNITY_IMAGES_NAMESPACE)
+
+
+def is_personalized(request):
+    """Responses embedding the viewer's own votes are never cached or validated"""
+    return (
+        request.user.is_authenticated
+        and request.query_params.get('include_vote', '').lower() in ('1', 'true', 'yes')
+    )
+
+
+def make_etag(request, *parts):
+    """Strong ETag over the validator parts, the URL and the negotiated media type"""
+    media_type = getattr(request, 'accepted_media_type', '')
+    raw = '|'.join(str(part) for part in (request.build_absolute_uri(), media_type, *parts))
+    return quote_etag(hashlib.sha256(raw.encode('utf-8')).hexdigest())
+
+
+def not_modified(request, etag, last_modified):
+    """A 304 response if the request's validators still match, otherwise ``None``"""
+    return get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp())
+    )
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Let browsers store the response but revalidate it on every use
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+class VersionedCacheMixin:
+    """
+    Cache ``list()`` responses under the namespaces returned by
+    ``get_cache_namespaces()`` and answer conditional GETs from the
+    namespace versions. Personalized requests bypass both, as do all
+    requests unless ``settings.API_RESPONSE_CACHE`` is on.
+    """
+    cache_timeout = None  # defaults to settings.API_CACHE_TIMEOUT
+
+    def get_cache_namespaces(self):
+        raise NotImplementedError
+
+    def is_cacheable(self, request):
+        return settings.API_RESPONSE_CACHE and not is_personalized(request)
+
+    def get_cache_key(self, request, stamp):
+        # Absolute URLs in payloads depend on scheme and host
+        raw = f'{request.scheme}://{request.get_host()}{request.get_full_path()}'
+        digest = hashlib.sha256(f'{stamp}|{raw}'.encode('utf-8')).hexdigest()
+        return f'response:{self.__class__.__name__}:{digest}'
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return super().list(request, *args, **kwargs)
+
+        view_name = self.__class__.__name__
+        namespaces = self.get_cache_namespaces()
+        versions, last_modified = namespace_validators(namespaces)
+        stamp = '.'.join(f'{ns}@{version}' for ns, version in zip(namespaces, versions))
+        etag = make_etag(request, stamp)
+
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            response_cache_requests.labels(view=view_name, result='not_modified').inc()
+            return set_validators(response, etag, last_modified)
+
+        key = self.get_cache_key(request, stamp)
+        cached = cache.get(key)
+        if cached is not None:
+            response_cache_requests.labels(view=view_name, result='hit').inc()
+            return set_validators(Response(cached['data']), etag, last_modified)
+
+        response_cache_requests.labels(view=view_name, result='miss').inc()
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = self.cache_timeout or settings.API_CACHE_TIMEOUT
+            # Wrapped so an empty list is still a hit
+            cache.set(key, {'data': response.data}, timeout)
+            set_validators(response, etag, last_modified)
+        return response
+
+
+class ConditionalRetrieveMixin:
+    """
+    Answer conditional GETs of a detail view from ``get_validators()``,
+    which must be much cheaper than the full retrieve.
+    """
+
+    def get_validators(self):
+        """Return ``(etag_parts, last_modified)``, or ``None`` if the object is missing"""
+        raise NotImplementedError
+
+    def retrieve(self, request, *args, **kwargs):
+        # Validators are read before the object, so a concurrent write can
+        # only make the ETag older than the body, never newer
+        validators = None if is_personalized(request) else self.get_validators()
+        if validators is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        parts, last_modified = validators
+        etag = make_etag(request, *parts)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            set_validators(response, etag, last_modified)
+        return response
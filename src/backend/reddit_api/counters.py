@@ -0,0 +1,153 @@
+"""
+Reconciliation of denormalized counters
+
+These counters are kept by incremental updates on the write path and can
+drift (crashed requests, old read-modify-write code, manual SQL):
+
+* ``posts.vote_status`` = ``SUM(post_votes.vote_value)`` minus deltas still
+  waiting in the write-behind buffer (``post_vote_deltas``);
+* ``posts.number_of_comments`` = ``COUNT(*)`` of ``comments``;
+* ``communities.number_of_members`` = ``COUNT(*)`` of ``community_members``;
+* ``comments.number_of_replies`` = ``COUNT(*)`` of direct replies.
+
+``reconcile`` walks the counter's table in primary-key ranges of
+``batch_size`` rows. For each range it reads the stored counters and one
+``GROUP BY`` over the child rows of that range (an index range scan on the
+foreign key), without taking locks. Rows that disagree are re-checked in
+short transactions that lock at most ``CORRECTION_BATCH`` of them, in
+primary-key order, and recompute their aggregate under the lock, so writes
+that land between the scan and the fix are never overwritten. No statement spans more
+than one range, so runs over tens of millions of rows hold no long
+transaction, and ``start_after`` / ``deadline`` let a periodic job spread a
+pass over several runs (see ``manage.py reconcile_counters``).
+"""
+import time
+from dataclasses import dataclass, field
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, Sum
+
+# name -> (model label, counter field, child model label, child foreign key, aggregate)
+COUNTERS = {
+    'post_votes': ('posts.Post', 'vote_status', 'posts.PostVote', 'post', Sum('vote_value')),
+    'post_comments': ('posts.Post', 'number_of_comments', 'comments.Comment', 'post', Count('id')),
+    'community_members': (
+        'communities.Community', 'number_of_members', 'communities.CommunityMember', 'community', Count('id'),
+    ),
+    'comment_replies': ('comments.Comment', 'number_of_replies', 'comments.Comment', 'parent', Count('id')),
+}
+
+# Rows locked per correcting transaction
+CORRECTION_BATCH = 500
+
+# Drifted rows kept per report for display
+SAMPLE_SIZE = 20
+
+
+@dataclass
+class DriftReport:
+    """Outcome of one reconciliation pass over a counter"""
+    counter: str
+    scanned: int = 0
+    drifted: int = 0
+    corrected: int = 0
+    total_drift: int = 0
+    last_pk: object = None
+    finished: bool = False
+    # (pk, stored, expected), largest drift first
+    samples: list = field(default_factory=list)
+
+    def add(self, pk, stored, expected):
+        self.drifted += 1
+        self.total_drift += abs(expected - stored)
+        self.samples.append((pk, stored, expected))
+        self.samples.sort(key=lambda sample: -abs(sample[2] - sample[1]))
+        del self.samples[SAMPLE_SIZE:]
+
+
+def _expected(name, pks=None, low=None, high=None):
+    """``{pk: aggregate}`` for the given primary keys or inclusive range"""
+    _, _, child_label, foreign_key, aggregate = COUNTERS[name]
+
+    def grouped(model, foreign_key, aggregate):
+        rows = model.objects.order_by()
+        if pks is not None:
+            rows = rows.filter(**{f'{foreign_key}_id__in': pks})
+        else:
+            rows = rows.filter(**{f'{foreign_key}_id__gte': low, f'{foreign_key}_id__lte': high})
+        return rows.values_list(f'{foreign_key}_id').annotate(total=aggregate).values_list(f'{foreign_key}_id', 'total')
+
+    rows = grouped(apps.get_model(child_label), foreign_key, aggregate)
+    if name == 'post_votes':
+        # Buffered votes are in post_votes but not yet in vote_status. Both
+        # sums come from one statement, so a flush moving a delta between
+        # the two tables cannot be seen half-done
+        from posts.models import PendingVoteDelta
+        rows = rows.union(grouped(PendingVoteDelta, 'post', -Sum('delta')), all=True)
+    totals = {}
+    for pk, total in rows:
+        totals[pk] = totals.get(pk, 0) + total
+    return totals
+
+
+def _correct(name, pks):
+    """
+    Re-check ``pks`` with their rows locked and set the counters that are
+    still wrong. Returns the number of rows updated.
+    """
+    label, counter, _, _, _ = COUNTERS[name]
+    model = apps.get_model(label)
+    columns = ['pk', counter] + (['created_at'] if label == 'posts.Post' else [])
+    with transaction.atomic():
+        # Same lock order as every writer that touches several rows
+        rows = list(model.objects.select_for_update().filter(pk__in=pks).order_by('pk').values_list(*columns))
+        expected = _expected(name, pks=[row[0] for row in rows])
+        updated = 0
+        for row in rows:
+            pk, stored = row[0], row[1]
+            value = expected.get(pk, 0)
+            if value == stored:
+                continue
+            changes = {counter: value}
+            if label == 'posts.Post':
+                from posts.ranking import score_updates
+                delta = value - stored
+                changes.update(score_updates(
+                    row[2],
+                    vote_delta=delta if counter == 'vote_status' else 0,
+                    comment_delta=delta if counter == 'number_of_comments' else 0,
+                ))
+            updated += model.objects.filter(pk=pk).update(**changes)
+    return updated
+
+
+def reconcile(name, batch_size=10000, apply=True, start_after=None, deadline=None):
+    """
+    Compare and (with ``apply``) fix one counter for rows with primary key
+    greater than ``start_after``. Stops early once ``time.monotonic()``
+    passes ``deadline``; ``report.last_pk`` is where the next run resumes.
+    """
+    label, counter, _, _, _ = COUNTERS[name]
+    model = apps.get_model(label)
+    report = DriftReport(counter=name, last_pk=start_after)
+    rows = model.objects.order_by('pk')
+    while True:
+        if deadline is not None and time.monotonic() >= deadline:
+            return report
+        batch = rows if report.last_pk is None else rows.filter(pk__gt=report.last_pk)
+        stored = list(batch.values_list('pk', counter)[:batch_size])
+        if not stored:
+            report.finished = True
+            return report
+        expected = _expected(name, low=stored[0][0], high=stored[-1][0])
+        drifted = []
+        for pk, value in stored:
+            if expected.get(pk, 0) != value:
+                report.add(pk, value, expected.get(pk, 0))
+                drifted.append(pk)
+        if apply:
+            for start in range(0, len(drifted), CORRECTION_BATCH):
+                report.corrected += _correct(name, drifted[start:start + CORRECTION_BATCH])
+        report.scanned += len(stored)
+        report.last_pk = stored[-1][0]
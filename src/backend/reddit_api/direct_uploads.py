@@ -0,0 +1,142 @@
+"""
+Direct-to-bucket image uploads
+
+Instead of streaming multipart bodies through a gunicorn worker, clients:
+
+1. ``POST /api/uploads/presign/`` with ``{"kind": "posts", "contentType": "image/png"}``
+   and receive a presigned S3 POST (``url`` + form ``fields``) for a fresh key
+   under ``<kind>/<user id>/``;
+2. upload the file straight to the bucket with that form;
+3. send only ``image_key`` to the create / patch endpoint.
+
+The key is accepted only if it belongs to the requesting user, the object
+exists, is within the size limit and starts with a known image signature.
+Requires S3 storage (``MediaStorage``); any S3-compatible server such as
+MinIO can stand in locally via ``AWS_S3_ENDPOINT_URL``.
+"""
+import posixpath
+import re
+import uuid
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.conf import settings
+from django.core.files.storage import default_storage
+from rest_framework import serializers, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from storages.backends.s3 import S3Storage
+from storages.utils import clean_name
+
+# Upload kinds map to the ``upload_to`` directory of the target ImageField
+UPLOAD_KINDS = ('posts', 'communities')
+
+CONTENT_TYPES = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+}
+
+SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'GIF87a', b'GIF89a')
+
+
+def get_upload_storage():
+    return default_storage
+
+
+def _looks_like_image(head):
+    return head.startswith(SIGNATURES) or (head[:4] == b'RIFF' and head[8:12] == b'WEBP')
+
+
+def _object_key(storage, key):
+    # Storage names are relative to the backend's location (e.g. "media/");
+    # keys always have the <kind>/<user id>/<uuid>.<ext> form (see verify_upload)
+    return posixpath.join(storage.location, clean_name(key))
+
+
+def create_presigned_upload(user, kind, content_type):
+    """Presigned POST for a new object key owned by ``user``"""
+    storage = get_upload_storage()
+    key = f'{kind}/{user.pk}/{uuid.uuid4().hex}{CONTENT_TYPES[content_type]}'
+    client = storage.connection.meta.client
+    presigned = client.generate_presigned_post(
+        Bucket=storage.bucket_name,
+        Key=_object_key(storage, key),
+        Fields={'Content-Type': content_type},
+        Conditions=[
+            {'Content-Type': content_type},
+            ['content-length-range', 1, settings.DIRECT_UPLOAD_MAX_BYTES],
+        ],
+        ExpiresIn=settings.DIRECT_UPLOAD_EXPIRES,
+    )
+    return {
+        'key': key,
+        'url': presigned['url'],
+        'fields': presigned['fields'],
+        'maxBytes': settings.DIRECT_UPLOAD_MAX_BYTES,
+        'expiresIn': settings.DIRECT_UPLOAD_EXPIRES,
+    }
+
+
+def verify_upload(key, kind, user):
+    """Return ``key`` if it is a finished, valid upload by ``user``, else raise ValidationError"""
+    extensions = '|'.join(ext.lstrip('.') for ext in set(CONTENT_TYPES.values()))
+    pattern = rf'{kind}/{user.pk}/[0-9a-f]{{32}}\.(?:{extensions})'
+    if not isinstance(key, str) or not re.fullmatch(pattern, key):
+        raise ValidationError('Invalid upload key.')
+
+    storage = get_upload_storage()
+    if not isinstance(storage, S3Storage):
+        raise ValidationError('Direct uploads are not enabled.')
+    client = storage.connection.meta.client
+    try:
+        head = client.head_object(Bucket=storage.bucket_name, Key=_object_key(storage, key))
+        if head['ContentLength'] > settings.DIRECT_UPLOAD_MAX_BYTES:
+            raise ValidationError('Uploaded file is too large.')
+        # The content type is chosen by the client; check the bytes too
+        first_bytes = client.get_object(
+            Bucket=storage.bucket_name, Key=_object_key(storage, key), Range='bytes=0-15'
+        )['Body'].read()
+    except (ClientError, BotoCoreError):
+        raise ValidationError('Upload not found.')
+    if not _looks_like_image(first_bytes):
+        raise ValidationError('Uploaded file is not a supported image.')
+    return key
+
+
+class DirectUploadSerializerMixin(serializers.Serializer):
+    """
+    Adds a write-only ``image_key`` field; a verified key becomes the value
+    of the model's ``image`` field without the file passing through the API.
+    """
+    image_key = serializers.CharField(write_only=True, required=False)
+    upload_kind = None
+
+    def validate_image_key(self, value):
+        return verify_upload(value, self.upload_kind, self.context['request'].user)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if 'image_key' in attrs:
+            attrs['image'] = attrs.pop('image_key')
+        return attrs
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def presign_upload(request):
+    """Issue a presigned S3 POST for a post or community image"""
+    if not isinstance(get_upload_storage(), S3Storage):
+        return Response(
+            {'error': 'Direct uploads require S3 storage; send the file with the request instead'},
+            status=status.HTTP_501_NOT_IMPLEMENTED,
+        )
+    kind = request.data.get('kind')
+    content_type = request.data.get('contentType')
+    if kind not in UPLOAD_KINDS:
+        raise ValidationError({'kind': f"Must be one of: {', '.join(UPLOAD_KINDS)}."})
+    if content_type not in CONTENT_TYPES:
+        raise ValidationError({'contentType': f"Must be one of: {', '.join(CONTENT_TYPES)}."})
+    return Response(create_presigned_upload(request.user, kind, content_type))
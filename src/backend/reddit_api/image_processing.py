@@ -0,0 +1,54 @@
+"""
+Pillow rendering of resized image variants
+
+Pure functions on bytes with no Django imports, so they can run in any
+worker (thread, process or task runner).
+"""
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+FORMAT_EXTENSIONS = {'jpeg': '.jpg', 'webp': '.webp'}
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def _encode(image, fmt):
+    buffer = BytesIO()
+    if fmt == 'jpeg':
+        if image.mode == 'RGBA':
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def render_variants(data, widths, formats=('jpeg', 'webp')):
+    """
+    Return ``[(format, width, bytes), ...]`` for every requested width that
+    does not upscale the original (the original width stands in for larger
+    ones). EXIF orientation is applied and all metadata is dropped.
+    """
+    with Image.open(BytesIO(data)) as original:
+        # First frame of animated images, rotated as the camera intended
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if _has_alpha(image) else 'RGB')
+
+    results = []
+    for width in sorted({min(width, image.width) for width in widths}):
+        height = max(1, round(image.height * width / image.width))
+        variant = image.resize((width, height), Image.LANCZOS)
+        # resize() copies info (EXIF, ICC profile, comments); never write it out
+        variant.info = {}
+        for fmt in formats:
+            results.append((fmt, width, _encode(variant, fmt)))
+    return results
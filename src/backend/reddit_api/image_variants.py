@@ -0,0 +1,163 @@
+"""
+Resized JPEG/WebP variants of uploaded images
+
+After a post or community image is saved, ``schedule_variants`` queues a
+job (after commit) on a small per-process thread pool; the request
+returns immediately. The job renders every configured width with
+``image_processing.render_variants``, stores the files next to the original
+through the field's storage backend (local or ``MediaStorage``) and records
+them on the row and on the image's ``StoredImage``::
+
+    {"source": "posts/cat.jpg",
+     "jpeg": {"320": "posts/cat.320w.jpg", ...},
+     "webp": {"320": "posts/cat.320w.webp", ...}}
+
+Serializers turn that into a ``srcset`` map with ``srcset_map``. Variants
+whose ``source`` is not the current image are ignored, so a replaced image
+never shows stale derivatives. Images are stored by content (see
+``images.fields``), so a re-uploaded image reuses the variants already
+rendered for it. ``manage.py generate_image_variants``
+backfills existing rows, renders avatars (which have no upload endpoint)
+and is the worker to use when ``IMAGE_VARIANT_WORKERS`` is 0.
+"""
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+
+from images.models import StoredImage
+
+from .cache import invalidate_community_images, invalidate_post_lists
+from .image_processing import FORMAT_EXTENSIONS, render_variants
+
+logger = logging.getLogger(__name__)
+
+# model label -> (image field, variants field, auto_now timestamp field, widths)
+VARIANT_SPECS = {
+    'posts.Post': ('image', 'image_variants', 'edited_at', (320, 640, 1080)),
+    'communities.Community': ('image', 'image_variants', 'updated_at', (40, 80, 256)),
+    'users.User': ('photo', 'photo_variants', 'updated_at', (40, 80, 256)),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def build_variants(label, pk, force=False):
+    """
+    Render and store the variants of one row's image. Returns the recorded
+    variants, or ``None`` when the row has no image or changed meanwhile.
+    """
+    model = apps.get_model(label)
+    image_field, variants_field, timestamp_field, widths = VARIANT_SPECS[label]
+    manager = model._default_manager
+    row = manager.filter(pk=pk).values(image_field, variants_field).first()
+    if row is None or not row[image_field]:
+        return None
+    source = row[image_field]
+    if not force and (row[variants_field] or {}).get('source') == source:
+        return row[variants_field]
+
+    # The same bytes uploaded for another row were rendered already
+    variants = StoredImage.objects.filter(name=source).values_list('variants', flat=True).first()
+    rendered = force or (variants or {}).get('source') != source
+    if rendered:
+        storage = model._meta.get_field(image_field).storage
+        with storage.open(source, 'rb') as original:
+            data = original.read()
+
+        root = posixpath.splitext(source)[0]
+        variants = {'source': source}
+        for fmt, width, content in render_variants(data, widths):
+            name = storage.save(f'{root}.{width}w{FORMAT_EXTENSIONS[fmt]}', ContentFile(content))
+            variants.setdefault(fmt, {})[str(width)] = name
+
+    # Only attach them if the image was not replaced while rendering
+    updated = manager.filter(pk=pk, **{image_field: source}).update(
+        **{variants_field: variants, timestamp_field: timezone.now()}
+    )
+    if not updated:
+        if rendered:
+            for fmt in FORMAT_EXTENSIONS:
+                for name in variants.get(fmt, {}).values():
+                    storage.delete(name)
+        return None
+    if rendered:
+        StoredImage.objects.filter(name=source).update(variants=variants)
+    _invalidate_embeds(label, pk)
+    return variants
+
+
+def _invalidate_embeds(label, pk):
+    """Drop cached lists that were rendered before the variants existed"""
+    if label == 'posts.Post':
+        community_id = (
+            apps.get_model(label)._default_manager.filter(pk=pk)
+            .values_list('community_id', flat=True)
+            .first()
+        )
+        if community_id is not None:
+            invalidate_post_lists(community_id)
+    elif label == 'communities.Community':
+        # Posts embed the community's srcset, snippets show it too
+        invalidate_post_lists(pk)
+        invalidate_community_images()
+
+
+def _run(label, pk):
+    try:
+        build_variants(label, pk)
+    except Exception:
+        logger.exception('Building image variants failed for %s %s', label, pk)
+    finally:
+        connection.close()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS,
+                thread_name_prefix='image-variants',
+            )
+        return _executor
+
+
+def schedule_variants(instance):
+    """Queue variant generation for ``instance`` once the transaction commits"""
+    label = instance._meta.label
+    image_field, variants_field, _, _ = VARIANT_SPECS[label]
+    image = getattr(instance, image_field)
+    if settings.IMAGE_VARIANT_WORKERS <= 0 or not image:
+        return
+    if (getattr(instance, variants_field) or {}).get('source') == image.name:
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: _get_executor().submit(_run, label, pk))
+
+
+def srcset_map(field_file, variants, request=None):
+    """
+    ``{"jpeg": "<url> 40w, <url> 80w", "webp": ...}`` for ``<img srcset>``,
+    or ``None`` until variants of the current image exist.
+    """
+    if not field_file or not variants or variants.get('source') != field_file.name:
+        return None
+    srcset = {}
+    for fmt in FORMAT_EXTENSIONS:
+        entries = []
+        for width, name in sorted(variants.get(fmt, {}).items(), key=lambda item: int(item[0])):
+            url = field_file.storage.url(name)
+            if request is not None and not url.startswith(('http://', 'https://')):
+                url = request.build_absolute_uri(url)
+            entries.append(f'{url} {width}w')
+        if entries:
+            srcset[fmt] = ', '.join(entries)
+    return srcset or None
@@ -0,0 +1,150 @@
+"""
+Custom pagination classes shared by the API apps
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in keyset (cursor) pagination.
+
+    Pages are addressed by the values of the last row seen on the previous
+    page instead of an OFFSET, so every page is a single indexed range scan
+    and no COUNT(*) is issued. Cursor mode is enabled when the request
+    carries the ``cursor`` query parameter (an empty value requests the first
+    page). Otherwise the request falls back to ``fallback_class`` or, when
+    that is ``None``, to an unpaginated plain array.
+
+    Views may override the sort key with a ``keyset_ordering`` attribute. The
+    last field must be unique (usually ``id``) so the ordering is total.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    fallback_class = None
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.fallback = self.fallback_class() if self.fallback_class else None
+        self.cursor_mode = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.is_cursor_request(request)
+        if not self.cursor_mode:
+            if self.fallback is not None:
+                return self.fallback.paginate_queryset(queryset, request, view)
+            return None
+
+        self.request = request
+        self.ordering = getattr(view, 'keyset_ordering', self.ordering)
+        self.page_size = self.get_page_size(request)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+
+        # Fetch one extra row to find out whether a next page exists
+        rows = self.fetch_rows(queryset, position, self.page_size + 1, view)
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def fetch_rows(self, queryset, position, limit, view=None):
+        """Return up to ``limit`` ordered rows that come after ``position``"""
+        if position is not None:
+            queryset = queryset.filter(self.build_keyset_filter(position))
+        return list(queryset[:limit])
+
+    def is_cursor_request(self, request):
+        return self.cursor_query_param in request.query_params
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return self.fallback.get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError, TypeError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        cursor = self.encode_cursor(self.page[-1])
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def build_keyset_filter(self, position):
+        """
+        Build ``(a, b, ...) < (va, vb, ...)`` for the configured ordering,
+        respecting the direction of each field.
+        """
+        condition = Q()
+        equal = Q()
+        for name, value in zip(self.ordering, position):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def encode_cursor(self, instance):
+        values = []
+        for field in self.fields:
+            value = getattr(instance, field)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        payload = json.dumps(values, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+    def cursor_value(self, model, field, value):
+        """Convert a decoded cursor value back to the type of ``field``"""
+        return model._meta.get_field(field).to_python(value)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise ValueError
+            return [
+                self.cursor_value(model, field, value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (TypeError, ValueError, UnicodeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class PageNumberOrKeysetPagination(KeysetPagination):
+    """Keyset pagination that keeps the default page-number envelope when not opted in"""
+    fallback_class = PageNumberPagination
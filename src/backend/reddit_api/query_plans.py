@@ -0,0 +1,118 @@
+"""
+EXPLAIN checks for the API's hot queries
+
+Each hot query must be answered from an index: no sequential scan of the
+queried table and no separate sort step. Used by the
+``check_query_plans`` management command and the test suite.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from comments.models import Comment
+from communities.models import Community, CommunityMember
+from posts.models import Post, PostVote
+
+User = get_user_model()
+
+# PostgreSQL (text format) and SQLite (EXPLAIN QUERY PLAN) markers of a plan
+# that reads the whole table or sorts rows after fetching them
+PLAN_PROBLEMS = {
+    'postgresql': [
+        (re.compile(r'\bSeq Scan on (\w+)'), 'sequential scan'),
+        (re.compile(r'(?:^|->\s*)(?:Incremental )?Sort\b', re.MULTILINE), 'sort'),
+    ],
+    'sqlite': [
+        (re.compile(r'\bSCAN (\w+)\s*$', re.MULTILINE), 'sequential scan'),
+        (re.compile(r'USE TEMP B-TREE FOR (?:ORDER BY|RIGHT PART OF ORDER BY)'), 'sort'),
+    ],
+}
+
+
+def hot_queries():
+    """Name -> queryset for every hot query, mirroring the API views"""
+    post = Post.objects.order_by().values('id', 'community_id', 'creator_id').first() or {
+        'id': 1, 'community_id': 'community', 'creator_id': 1,
+    }
+    return {
+        'posts_by_community': (
+            Post.objects.filter(community_id=post['community_id'])
+            .select_related('creator', 'community')
+            .order_by('-created_at', '-id')[:20]
+        ),
+        'posts_newest': (
+            Post.objects.select_related('creator', 'community')
+            .order_by('-created_at', '-id')[:20]
+        ),
+        'post_votes_by_user_and_community': PostVote.objects.filter(
+            user_id=post['creator_id'], community_id=post['community_id']
+        ),
+        'comments_by_post': (
+            Comment.objects.filter(post_id=post['id'])
+            .select_related('creator', 'post')
+            .order_by('-created_at', '-id')[:20]
+        ),
+        'communities_by_members': Community.objects.order_by('-number_of_members', '-id')[:20],
+        'community_snippets_by_user': CommunityMember.objects.filter(user_id=post['creator_id']),
+    }
+
+
+def plan_problems(plan, vendor=None):
+    """Return human readable problems found in an EXPLAIN output"""
+    vendor = vendor or connection.vendor
+    problems = []
+    for pattern, label in PLAN_PROBLEMS.get(vendor, []):
+        for match in pattern.finditer(plan):
+            target = match.group(1) if match.groups() else ''
+            problems.append(f'{label} {target}'.strip())
+    return problems
+
+
+def check_hot_queries():
+    """EXPLAIN every hot query; returns ``[(name, plan, problems), ...]``"""
+    results = []
+    for name, queryset in hot_queries().items():
+        plan = queryset.explain()
+        results.append((name, plan, plan_problems(plan)))
+    return results
+
+
+def seed_hot_query_data(posts=5000, fanout=50):
+    """
+    Bulk insert a realistic data shape so the planner has statistics to
+    work with. Intended to run inside a transaction that is rolled back.
+    """
+    users = User.objects.bulk_create([
+        User(username=f'plan-user-{i}', email=f'plan-user-{i}@example.com')
+        for i in range(max(posts // fanout, 2))
+    ])
+    communities = Community.objects.bulk_create([
+        Community(id=f'plan-comm-{i}', creator=users[i % len(users)], number_of_members=i)
+        for i in range(max(posts // fanout, 2))
+    ])
+    CommunityMember.objects.bulk_create([
+        CommunityMember(user=user, community=communities[(i + j) % len(communities)])
+        for i, user in enumerate(users)
+        for j in range(min(5, len(communities)))
+    ])
+    created = Post.objects.bulk_create([
+        Post(
+            community=communities[i % len(communities)],
+            creator=users[i % len(users)],
+            title=f'Plan post {i}',
+        )
+        for i in range(posts)
+    ])
+    Comment.objects.bulk_create([
+        Comment(post=post, community_id=post.community_id, creator=post.creator, text='plan')
+        for post in created
+    ])
+    PostVote.objects.bulk_create([
+        PostVote(user=users[(i + 1) % len(users)], post=post, community_id=post.community_id, vote_value=1)
+        for i, post in enumerate(created)
+    ])
+    if connection.vendor == 'postgresql':
+        # SQLite's planner picks indexes without statistics; PostgreSQL needs them
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
@@ -0,0 +1,86 @@
+"""
+Slot records for high-volume read endpoints
+
+``ModelSerializer`` spends most of a large list response in per-row field
+machinery: building model instances, walking ``source`` paths, calling
+``SerializerMethodField`` methods. ``as_records`` instead fetches rows with
+``values_list()`` and wraps each tuple in a ``__slots__`` record whose
+attributes are the selected column names. Pagination keeps working unchanged
+because it only filters, orders and slices the queryset and reads the
+ordering fields with ``getattr``. ``RecordSerializer`` subclasses turn the
+records into dicts directly.
+
+Columns that were not selected stay unset on the record, so ``hasattr`` and
+``getattr(record, name, default)`` tell optional annotations apart from
+``NULL`` values.
+"""
+from django.db.models.query import ValuesListIterable
+
+
+class RecordIterable(ValuesListIterable):
+    """Yield ``record_class`` instances instead of tuples"""
+    record_class = None
+
+    def __iter__(self):
+        record_class = self.record_class
+        new = record_class.__new__
+        setters = [getattr(record_class, name).__set__ for name in self.queryset._fields]
+        for row in super().__iter__():
+            record = new(record_class)
+            for setter, value in zip(setters, row):
+                setter(record, value)
+            yield record
+
+
+class Record:
+    """Base class for ``__slots__`` rows; each subclass gets its own iterable"""
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.iterable_class = type(f'{cls.__name__}Iterable', (RecordIterable,), {'record_class': cls})
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__ if hasattr(self, name))
+        return f'{self.__class__.__name__}({values})'
+
+
+def as_records(queryset, record_class, fields):
+    """``queryset`` yielding ``record_class`` instances with ``fields`` set"""
+    queryset = queryset.values_list(*fields)
+    queryset._iterable_class = record_class.iterable_class
+    return queryset
+
+
+class RecordSerializer:
+    """
+    Read-only stand-in for a ``many=True`` serializer over records. Views
+    build it like any serializer class (``get_serializer(page, many=True)``)
+    and read ``.data``; subclasses implement ``to_representation``.
+    """
+
+    def __init__(self, instance=None, many=False, context=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        self.request = self.context.get('request')
+        self._absolute_uris = {}
+
+    def to_representation(self, record):
+        raise NotImplementedError
+
+    def absolute_uri(self, url):
+        """``request.build_absolute_uri(url)``, computed once per distinct URL"""
+        if self.request is None:
+            return url
+        try:
+            return self._absolute_uris[url]
+        except KeyError:
+            absolute = self._absolute_uris[url] = self.request.build_absolute_uri(url)
+            return absolute
+
+    @property
+    def data(self):
+        if self.many:
+            return [self.to_representation(record) for record in self.instance]
+        return self.to_representation(self.instance)
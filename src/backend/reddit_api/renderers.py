@@ -0,0 +1,69 @@
+"""
+Response renderers
+
+``ORJSONRenderer`` replaces DRF's ``JSONRenderer`` and encodes with orjson,
+which handles dicts, lists, strings and datetimes natively. The output is
+byte-for-byte the same as ``JSONRenderer`` under the default
+``COMPACT_JSON`` / ``UNICODE_JSON`` / ``STRICT_JSON`` settings: UTC datetimes
+end in ``Z``, other types (``Decimal``, lazy strings, ...) go through DRF's
+``JSONEncoder.default`` and U+2028/U+2029 are escaped. Indented output
+(``Accept: application/json; indent=4``), non-default settings and values
+orjson rejects (integers beyond 64 bits) fall back to ``JSONRenderer``.
+Two differences remain, for values the API never emits: exponent floats
+are written as ``1e16`` instead of ``1e+16``, and NaN becomes ``null``
+instead of raising.
+
+``MessagePackRenderer`` answers ``Accept: application/msgpack`` (or
+``?format=msgpack``). It converts values with the same encoder, so a
+decoded body equals the parsed JSON body.
+"""
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder = JSONEncoder()
+
+# JSONRenderer escapes these for embedding in JavaScript; orjson does not
+LINE_SEPARATOR = '\u2028'.encode('utf-8')
+PARAGRAPH_SEPARATOR = '\u2029'.encode('utf-8')
+
+
+class ORJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` output, encoded by orjson"""
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def uses_defaults(self, accepted_media_type, renderer_context):
+        return (
+            self.encoder_class is JSONEncoder
+            and self.compact
+            and self.strict
+            and not self.ensure_ascii
+            and not self.get_indent(accepted_media_type, renderer_context)
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not self.uses_defaults(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_encoder.default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if LINE_SEPARATOR in ret or PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(LINE_SEPARATOR, b'\\u2028').replace(PARAGRAPH_SEPARATOR, b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack bodies with the same values as the JSON representation"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encoder.default, use_bin_type=True)
@@ -70,10 +70,12 @@ INSTALLED_APPS = [
     'corsheaders',
     
     # Local apps
+    'images',
     'users',
     'communities',
     'posts',
     'comments',
+    'search',
 ]
 
 MIDDLEWARE = [
@@ -127,6 +129,55 @@ if 'django_prometheus' in INSTALLED_APPS:
     elif 'sqlite' in db_engine:
         DATABASES['default']['ENGINE'] = 'django_prometheus.db.backends.sqlite3'
 
+# Covering indexes use INCLUDE columns, which only PostgreSQL supports;
+# SQLite (development/tests) simply builds them without the extra columns
+SILENCED_SYSTEM_CHECKS = ['models.W040']
+
+# Cache
+# Local memory by default; point DJANGO_CACHE_URL at a shared cache (e.g.
+# memcached:// or redis://) so invalidations reach every gunicorn worker
+CACHES = {
+    'default': env.cache('DJANGO_CACHE_URL', default='locmemcache://'),
+}
+
+# Serve list responses from the cache (see reddit_api/cache.py). Off with the
+# local-memory default: each worker would keep its own namespace versions and
+# go on serving lists another worker has invalidated. Set it explicitly for
+# a single-process server
+API_RESPONSE_CACHE = env.bool(
+    'API_RESPONSE_CACHE',
+    default=CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache',
+)
+
+# Seconds a cached list response may be served (see reddit_api/cache.py)
+API_CACHE_TIMEOUT = env.int('API_CACHE_TIMEOUT', default=60)
+
+# Community name autocomplete (see communities/autocomplete.py): serve from a
+# per-worker in-memory index rebuilt every N seconds, or from the database
+COMMUNITY_AUTOCOMPLETE_IN_MEMORY = env.bool('COMMUNITY_AUTOCOMPLETE_IN_MEMORY', default=True)
+COMMUNITY_AUTOCOMPLETE_REFRESH = env.int('COMMUNITY_AUTOCOMPLETE_REFRESH', default=300)
+
+# Seconds before the cached top-communities leaderboard is rebuilt from the
+# table; joins and leaves patch it in between (see communities/leaderboard.py)
+COMMUNITY_LEADERBOARD_REFRESH = env.int('COMMUNITY_LEADERBOARD_REFRESH', default=300)
+
+# Direct-to-bucket uploads (see reddit_api/direct_uploads.py)
+DIRECT_UPLOAD_MAX_BYTES = env.int('DIRECT_UPLOAD_MAX_BYTES', default=10 * 1024 * 1024)
+DIRECT_UPLOAD_EXPIRES = env.int('DIRECT_UPLOAD_EXPIRES', default=600)
+
+# Hash uploads while they stream in, for content-addressed storage (see images/fields.py)
+FILE_UPLOAD_HANDLERS = [
+    'images.upload_handlers.HashingMemoryFileUploadHandler',
+    'images.upload_handlers.HashingTemporaryFileUploadHandler',
+]
+
+# Hours an unreferenced image is kept before `manage.py collect_unused_images` deletes it
+IMAGE_GC_GRACE_HOURS = env.int('IMAGE_GC_GRACE_HOURS', default=24)
+
+# Threads per process rendering resized image variants after uploads;
+# 0 leaves it to `manage.py generate_image_variants`
+IMAGE_VARIANT_WORKERS = env.int('IMAGE_VARIANT_WORKERS', default=2)
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -189,8 +240,19 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # orjson for JSON, MessagePack on request (see reddit_api/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'reddit_api.renderers.ORJSONRenderer',
+        'reddit_api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
+# Write-behind vote counting: buffer vote_status deltas and flush them in
+# batches instead of updating the post row on every vote (see posts/vote_buffer.py)
+VOTE_WRITE_BEHIND = env.bool('VOTE_WRITE_BEHIND', default=False)
+VOTE_FLUSH_INTERVAL = env.float('VOTE_FLUSH_INTERVAL', default=2.0)
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=24),
@@ -224,6 +286,8 @@ if USE_S3:
     AWS_SECRET_ACCESS_KEY = env('AWS_SECRET_ACCESS_KEY')
     AWS_S3_REGION_NAME = env('AWS_S3_REGION_NAME')
     AWS_S3_CUSTOM_DOMAIN = env('AWS_S3_CUSTOM_DOMAIN')
+    # S3-compatible server (e.g. MinIO) for local development; unset for AWS
+    AWS_S3_ENDPOINT_URL = env('AWS_S3_ENDPOINT_URL', default=None)
     AWS_DEFAULT_ACL = None
     AWS_S3_OBJECT_PARAMETERS = {
         'CacheControl': 'max-age=86400',
@@ -18,6 +18,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from .direct_uploads import presign_upload
 from .views import readiness_check, liveness_check
 
 urlpatterns = [
@@ -35,6 +36,8 @@ urlpatterns = [
     path('api/communities/', include('communities.urls')),
     path('api/posts/', include('posts.urls')),
     path('api/comments/', include('comments.urls')),
+    path('api/search/', include('search.urls')),
+    path('api/uploads/presign/', presign_upload, name='presign_upload'),
 ]
 
 # Serve media files in development
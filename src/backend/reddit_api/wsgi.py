@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'reddit_api.settings')
 
 application = get_wsgi_application()
+
+# Gunicorn imports this in every worker (no --preload), after the fork
+from communities.autocomplete import community_index  # noqa: E402
+
+community_index.warm()
@@ -0,0 +1,113 @@
+"""
+Full-text search over post titles/bodies and comment text
+
+PostgreSQL (production): each table has a ``search_vector`` tsvector column
+kept current by a trigger and indexed with GIN (see migration 0001). Titles
+are weighted above bodies, queries use ``websearch_to_tsquery`` (quoted
+phrases, ``or``, ``-word``) and results are ranked with ``ts_rank``.
+
+SQLite (development and tests): FTS5 external-content tables mirror the same
+columns through triggers, ranked with ``bm25``. Table rebuilds in SQLite
+migrations drop triggers, so they are (re)installed after every ``migrate``.
+
+The search column is not a model field, so ordinary queries never read it.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'english'
+
+# model label -> (table, FTS5 table, {column: bm25 weight})
+SEARCHABLE = {
+    'posts.Post': ('posts', 'posts_fts', {'title': 10.0, 'body': 1.0}),
+    'comments.Comment': ('comments', 'comments_fts', {'text': 1.0}),
+}
+
+
+def _fts5_query(text):
+    """Quoted terms, implicitly ANDed; FTS5 operators in user input are not interpreted"""
+    return ' '.join(f'"{term}"' for term in re.findall(r'\w+', text))
+
+
+def _expressions(queryset, text):
+    """``(match, rank)`` SQL for ``text`` against the queryset's model, or None"""
+    table, fts_table, columns = SEARCHABLE[queryset.model._meta.label]
+    if connections[queryset.db].vendor == 'postgresql':
+        tsquery = 'websearch_to_tsquery(%s::regconfig, %s)'
+        params = [SEARCH_CONFIG, text]
+        match = RawSQL(f'{table}.search_vector @@ {tsquery}', params, output_field=BooleanField())
+        rank = RawSQL(f'ts_rank({table}.search_vector, {tsquery})', params, output_field=FloatField())
+        return match, rank
+
+    query = _fts5_query(text)
+    if not query:
+        return None
+    weights = ', '.join(str(weight) for weight in columns.values())
+    match = RawSQL(
+        f'{table}.id IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s)',
+        [query], output_field=BooleanField(),
+    )
+    # bm25() is lower for better matches
+    rank = RawSQL(
+        f'(SELECT -bm25({fts_table}, {weights}) FROM {fts_table} '
+        f'WHERE {fts_table} MATCH %s AND rowid = {table}.id)',
+        [query], output_field=FloatField(),
+    )
+    return match, rank
+
+
+def matching(queryset, text):
+    """Rows of ``queryset`` matching ``text``, unranked"""
+    expressions = _expressions(queryset, text)
+    if expressions is None:
+        return queryset.none()
+    return queryset.filter(expressions[0])
+
+
+def search(queryset, text):
+    """
+    Rows of ``queryset`` matching ``text``, annotated with ``rank`` (higher
+    is better). Order by ``-rank`` for relevance.
+    """
+    expressions = _expressions(queryset, text)
+    if expressions is None:
+        return queryset.none().annotate(rank=Value(0.0))
+    match, rank = expressions
+    return queryset.filter(match).annotate(rank=rank)
+
+
+def _sqlite_statements(table, fts_table, columns):
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    insert = f'INSERT INTO {fts_table}(rowid, {names}) VALUES (new.id, {new});'
+    delete = f"INSERT INTO {fts_table}({fts_table}, rowid, {names}) VALUES ('delete', old.id, {old});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+        f"{names}, content='{table}', content_rowid='id', tokenize='porter unicode61')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts_table}_insert AFTER INSERT ON {table} BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts_table}_delete AFTER DELETE ON {table} BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts_table}_update AFTER UPDATE OF {names} ON {table} '
+        f'BEGIN {delete} {insert} END',
+        # Index rows written while the triggers were missing
+        f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')",
+    ]
+
+
+def install_sqlite_indexes(using='default', **kwargs):
+    """post_migrate: create missing FTS5 tables and triggers, then reindex"""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {row[0] for row in cursor.fetchall()}
+        for table, fts_table, columns in SEARCHABLE.values():
+            triggers = {f'{fts_table}_{event}' for event in ('insert', 'delete', 'update')}
+            if table not in existing or triggers <= existing:
+                continue
+            for statement in _sqlite_statements(table, fts_table, columns):
+                cursor.execute(statement)
@@ -0,0 +1,95 @@
+"""
+PostgreSQL search columns, triggers and GIN indexes (see search/backends.py)
+
+Other backends are skipped here; SQLite gets FTS5 tables after migrate.
+"""
+from django.db import migrations
+
+# Rows written per backfill statement, each committed on its own
+BACKFILL_BATCH_SIZE = 5000
+
+# (table, {column: tsvector weight})
+TABLES = [
+    ('posts', {'title': 'A', 'body': 'B'}),
+    ('comments', {'text': 'A'}),
+]
+
+
+def _vector(columns, row):
+    return ' || '.join(
+        f"setweight(to_tsvector('english', coalesce({row}{column}, '')), '{weight}')"
+        for column, weight in columns.items()
+    )
+
+
+def _backfill(schema_editor, table, columns):
+    """Fill search_vector of existing rows in primary-key batches"""
+    last_id = 0
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            cursor.execute(
+                f'SELECT max(id) FROM (SELECT id FROM {table} WHERE id > %s ORDER BY id LIMIT %s) AS batch',
+                [last_id, BACKFILL_BATCH_SIZE],
+            )
+            upper = cursor.fetchone()[0]
+            if upper is None:
+                return
+            cursor.execute(
+                f'UPDATE {table} SET search_vector = {_vector(columns, "")} WHERE id > %s AND id <= %s',
+                [last_id, upper],
+            )
+            last_id = upper
+
+
+def create_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, columns in TABLES:
+        changed = ' OR '.join(f'OLD.{column} IS DISTINCT FROM NEW.{column}' for column in columns)
+        schema_editor.execute(f'ALTER TABLE {table} ADD COLUMN search_vector tsvector')
+        schema_editor.execute(
+            f'CREATE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$ '
+            f'BEGIN NEW.search_vector := {_vector(columns, "NEW.")}; RETURN NEW; END '
+            f'$$ LANGUAGE plpgsql'
+        )
+        schema_editor.execute(
+            f'CREATE TRIGGER {table}_search_vector_insert BEFORE INSERT ON {table} '
+            f'FOR EACH ROW EXECUTE FUNCTION {table}_search_vector_update()'
+        )
+        # Vote and counter updates do not touch the text, so skip re-parsing
+        schema_editor.execute(
+            f'CREATE TRIGGER {table}_search_vector_update BEFORE UPDATE ON {table} '
+            f'FOR EACH ROW WHEN ({changed}) EXECUTE FUNCTION {table}_search_vector_update()'
+        )
+        # New rows get their vector from the trigger. Existing rows are
+        # filled in short batches so no statement locks the whole table.
+        _backfill(schema_editor, table, columns)
+        # Runs outside a transaction (atomic = False), so writes continue while it builds
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY {table}_search_idx ON {table} USING gin (search_vector)'
+        )
+
+
+def drop_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, _ in TABLES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {table}_search_idx')
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {table}_search_vector_update ON {table}')
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {table}_search_vector_insert ON {table}')
+        schema_editor.execute(f'DROP FUNCTION IF EXISTS {table}_search_vector_update()')
+        schema_editor.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('posts', '0008_content_addressed_image'),
+        ('comments', '0004_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_vectors, drop_search_vectors),
+    ]
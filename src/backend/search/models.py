@@ -0,0 +1,3 @@
+# No models: the search columns live on the posts and comments tables and are
+# managed by migrations and search.backends. This module lets the app receive
+# post_migrate, which Django only sends to apps with a models module.
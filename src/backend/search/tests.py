@@ -0,0 +1,169 @@
+"""
+Tests for Search app
+Coverage: Full-text matching, Ranking, Filters, Cursor pagination, Index maintenance
+"""
+import pytest
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from posts.models import Post
+from search.backends import install_sqlite_indexes, search
+
+
+@pytest.mark.django_db
+class TestSearchAPI:
+    """Test the /api/search/ endpoint"""
+    
+    def get(self, client, **params):
+        return client.get(reverse('search:search'), params)
+    
+    def test_matches_title_and_body(self, api_client, create_post):
+        """Test that words in titles and bodies are found, stemmed"""
+        in_title = create_post(title='Gardening tips', body='Nothing here')
+        in_body = create_post(title='Weekend', body='I spent it gardening again')
+        create_post(title='Cooking', body='Pasta recipes')
+        
+        response = self.get(api_client, q='garden')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert {item['id'] for item in response.data['results']} == {in_title.id, in_body.id}
+        assert 'bodyPreview' in response.data['results'][0]
+    
+    def test_title_ranks_above_body(self, api_client, create_post):
+        """Test that a title match outranks a body match"""
+        in_body = create_post(title='Weekend', body='Some notes about kayaks')
+        in_title = create_post(title='Kayaks', body='Some notes')
+        
+        results = self.get(api_client, q='kayaks').data['results']
+        
+        assert [item['id'] for item in results] == [in_title.id, in_body.id]
+    
+    def test_all_terms_required(self, api_client, create_post):
+        """Test that multi-word queries match rows containing every word"""
+        both = create_post(title='Red bicycle for sale')
+        create_post(title='Red car for sale')
+        
+        results = self.get(api_client, q='red bicycle').data['results']
+        
+        assert [item['id'] for item in results] == [both.id]
+    
+    def test_community_filter(self, api_client, create_post, create_community):
+        """Test that community_id narrows the results"""
+        community = create_community()
+        inside = create_post(title='Chess openings', community=community)
+        create_post(title='Chess endgames')
+        
+        results = self.get(api_client, q='chess', community_id=community.id).data['results']
+        
+        assert [item['id'] for item in results] == [inside.id]
+    
+    def test_search_comments(self, api_client, create_comment):
+        """Test that type=comments searches comment text"""
+        comment = create_comment(text='The telescope arrived today')
+        create_comment(text='Unrelated remark')
+        
+        response = self.get(api_client, q='telescope', type='comments')
+        
+        assert [item['id'] for item in response.data['results']] == [comment.id]
+        assert response.data['results'][0]['text'] == 'The telescope arrived today'
+    
+    def test_cursor_pagination(self, api_client, create_post):
+        """Test that pages follow relevance order without repeats"""
+        posts = [create_post(title=f'Guitar lesson {index}', body='guitar ' * (index % 3)) for index in range(7)]
+        
+        seen = []
+        url, params = reverse('search:search'), {'q': 'guitar', 'limit': 3}
+        while url:
+            data = api_client.get(url, params).data
+            seen.extend(item['id'] for item in data['results'])
+            url, params = data['next'], None
+        
+        assert sorted(seen) == sorted(post.id for post in posts)
+        ranked = list(search(Post.objects.all(), 'guitar').order_by('-rank', '-id').values_list('id', flat=True))
+        assert seen == ranked
+    
+    def test_index_follows_edits_and_deletes(self, api_client, create_post):
+        """Test that changed and deleted rows are reindexed"""
+        post = create_post(title='Old topic')
+        post.title = 'Volcano photos'
+        post.save()
+        deleted = create_post(title='Volcano trip')
+        deleted.delete()
+        
+        assert [item['id'] for item in self.get(api_client, q='volcano').data['results']] == [post.id]
+        assert self.get(api_client, q='old').data['results'] == []
+    
+    def test_operators_in_input_are_literal(self, api_client, create_post):
+        """Test that query syntax characters never cause errors"""
+        post = create_post(title='C++ compiler AND linker')
+        
+        for text in ['c++ "compiler', 'linker*', 'AND', 'NEAR(', '-']:
+            response = self.get(api_client, q=text)
+            assert response.status_code == status.HTTP_200_OK
+        assert [item['id'] for item in self.get(api_client, q='"compiler').data['results']] == [post.id]
+    
+    def test_requires_query(self, api_client):
+        """Test that q is required and type is validated"""
+        assert self.get(api_client).status_code == status.HTTP_400_BAD_REQUEST
+        assert self.get(api_client, q='   ').status_code == status.HTTP_400_BAD_REQUEST
+        assert self.get(api_client, q='x', type='users').status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_invalid_cursor(self, api_client):
+        """Test that a malformed cursor is a 404"""
+        response = self.get(api_client, q='anything', cursor='not-a-cursor')
+        
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestSearchIndexMaintenance:
+    """Test the SQLite FTS5 index setup"""
+    
+    def test_missing_triggers_reinstalled(self, create_post):
+        """Test that triggers dropped by a table rebuild come back with a reindex"""
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER posts_fts_insert')
+        post = create_post(title='Lighthouse keeper')
+        assert not search(Post.objects.all(), 'lighthouse').exists()
+        
+        install_sqlite_indexes()
+        
+        assert list(search(Post.objects.all(), 'lighthouse')) == [post]
+    
+    def test_admin_search_uses_index(self, client, create_user, create_post):
+        """Test that the admin changelist finds posts by body words"""
+        admin = create_user(is_staff=True, is_superuser=True)
+        client.force_login(admin)
+        post = create_post(title='Notes', body='Migrating birds over the bay')
+        
+        response = client.get(reverse('admin:posts_post_changelist'), {'q': 'birds'})
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert list(response.context['cl'].result_list) == [post]
+
+
+@pytest.mark.django_db
+class TestSearchQueryCounts:
+    """Test that search runs a fixed number of queries however many rows it returns"""
+    
+    @pytest.mark.parametrize('rows', [1, 5])
+    def test_search_posts(self, api_client, create_post, django_assert_num_queries, rows):
+        """Test post results (feed cards)"""
+        for index in range(rows):
+            create_post(title=f'Orchid care {index}')
+        
+        with django_assert_num_queries(1):
+            response = api_client.get(reverse('search:search'), {'q': 'orchid'})
+        
+        assert len(response.data['results']) == rows
+    
+    @pytest.mark.parametrize('rows', [1, 5])
+    def test_search_comments(self, api_client, create_comment, django_assert_num_queries, rows):
+        """Test comment results"""
+        for index in range(rows):
+            create_comment(text=f'Orchid care {index}')
+        
+        with django_assert_num_queries(1):
+            response = api_client.get(reverse('search:search'), {'q': 'orchid', 'type': 'comments'})
+        
+        assert len(response.data['results']) == rows
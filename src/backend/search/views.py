@@ -0,0 +1,69 @@
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny
+
+from comments.models import Comment
+from comments.serializers import CommentSerializer
+from posts.models import Post
+from posts.serializers import PostCardSerializer
+from posts.views import with_viewer_vote
+from reddit_api.pagination import KeysetPagination
+from .backends import search
+
+MAX_QUERY_LENGTH = 200
+
+
+class SearchPagination(KeysetPagination):
+    """Cursor pages in relevance order; ``rank`` is an annotation, not a field"""
+
+    def is_cursor_request(self, request):
+        # A new endpoint, so it always uses the cursor envelope
+        return True
+
+    def cursor_value(self, model, field, value):
+        if field == 'rank':
+            return float(value)
+        return super().cursor_value(model, field, value)
+
+
+class SearchView(generics.ListAPIView):
+    """
+    Full-text search: ``?q=`` with optional ``type`` (``posts`` or
+    ``comments``) and ``community_id``. Results are ordered by relevance.
+    """
+    permission_classes = [AllowAny]
+    pagination_class = SearchPagination
+    keyset_ordering = ('-rank', '-id')
+    search_types = {
+        'posts': PostCardSerializer,
+        'comments': CommentSerializer,
+    }
+
+    def get_search_type(self):
+        search_type = self.request.query_params.get('type', 'posts')
+        if search_type not in self.search_types:
+            raise ValidationError({'type': f"Must be one of: {', '.join(self.search_types)}."})
+        return search_type
+
+    def get_serializer_class(self):
+        return self.search_types[self.get_search_type()]
+
+    def get_queryset(self):
+        text = self.request.query_params.get('q', '').strip()
+        if not text:
+            raise ValidationError({'q': 'This field is required.'})
+        if len(text) > MAX_QUERY_LENGTH:
+            raise ValidationError({'q': f'Ensure this field has no more than {MAX_QUERY_LENGTH} characters.'})
+
+        if self.get_search_type() == 'posts':
+            queryset = with_viewer_vote(Post.objects.for_list().with_pending_votes(), self.request)
+        else:
+            queryset = Comment.objects.select_related('creator')
+        community_id = self.request.query_params.get('community_id')
+        if community_id:
+            queryset = queryset.filter(community_id=community_id)
+        queryset = search(queryset, text)
+        if self.get_search_type() == 'posts':
+            # Ranked rows as feed-card records (see PostCardSerializer)
+            queryset = queryset.as_cards()
+        return queryset
@@ -1,12 +1,14 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from images.fields import ContentAddressedImageField
 
 
 class User(AbstractUser):
     """Custom User model with additional fields"""
     email = models.EmailField(unique=True)
     photo_url_legacy = models.TextField(blank=True, null=True)  # Legacy: base64 or URL strings
-    photo = models.ImageField(upload_to='users/', blank=True, null=True)  # New: proper image storage for S3
+    photo = ContentAddressedImageField(upload_to='users/', blank=True, null=True)  # Deduplicated by content, see images.fields
+    photo_variants = models.JSONField(default=dict, blank=True)  # Resized copies, see reddit_api.image_variants
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
+from reddit_api.image_variants import srcset_map
 
 User = get_user_model()
 
@@ -9,11 +10,16 @@ class UserSerializer(serializers.ModelSerializer):
     """Serializer for User model"""
     displayName = serializers.ReadOnlyField(source='display_name')
     photoURL = serializers.URLField(source='photo_url', required=False, allow_null=True)
+    photoSrcset = serializers.SerializerMethodField()
     createdAt = serializers.DateTimeField(source='created_at', read_only=True)
     
+    def get_photoSrcset(self, obj):
+        """Resized JPEG/WebP variants of the avatar, once generated"""
+        return srcset_map(obj.photo, obj.photo_variants, self.context.get('request'))
+    
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'photoURL', 'displayName', 'createdAt']
+        fields = ['id', 'username', 'email', 'photoURL', 'photoSrcset', 'displayName', 'createdAt']
         read_only_fields = ['id', 'createdAt']
 
 
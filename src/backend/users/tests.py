@@ -169,6 +169,13 @@ class TestUserProfile:
         response = api_client.get(url)
         
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        
+    def test_profile_query_count(self, authenticated_client, django_assert_num_queries):
+        """Test that the profile is served from the user loaded by authentication"""
+        with django_assert_num_queries(1):
+            response = authenticated_client.get(reverse('users:profile'))
+        
+        assert response.status_code == status.HTTP_200_OK
 
 
 @pytest.mark.django_db
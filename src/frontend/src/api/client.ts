@@ -75,20 +75,47 @@ export const authAPI = {
 };
 
 // Communities APIs
+// Upload straight to the bucket with a presigned POST. Resolves to the object
+// key, or null when the server cannot presign (local storage, unsupported
+// type) and the file has to be sent with the request instead.
+const uploadDirect = async (kind: 'posts' | 'communities', file: File): Promise<string | null> => {
+  let presigned;
+  try {
+    presigned = await api.post('/uploads/presign/', { kind, contentType: file.type }).then(res => res.data);
+  } catch (error: any) {
+    if (error.response?.status === 501 || error.response?.status === 400) return null;
+    throw error;
+  }
+  const form = new FormData();
+  Object.entries(presigned.fields).forEach(([name, value]) => form.append(name, value as string));
+  form.append('file', file); // S3 requires the file to be the last field
+  await axios.post(presigned.url, form); // bare axios: the bucket must not get our API token
+  return presigned.key;
+};
+
 export const communitiesAPI = {
   list: () => api.get('/communities/').then(res => res.data),
   
+  // The largest communities, served from the cached leaderboard
+  top: (n: number) => api.get('/communities/', { params: { top: n } }).then(res => res.data),
+  
+  // Names starting with the prefix, largest communities first
+  autocomplete: (q: string, limit: number = 8) =>
+    api.get('/communities/autocomplete/', { params: { q, limit } }).then(res => res.data),
+  
   create: (data: { id: string; privacyType: string }) =>
     api.post('/communities/', data).then(res => res.data),
   
   getById: (id: string) => api.get(`/communities/${id}/`).then(res => res.data),
   
-  update: (id: string, data: { image_url?: string; image?: File }) => {
+  update: async (id: string, data: { image_url?: string; image?: File }) => {
     const formData = new FormData();
     
     // Handle image: use File if provided, otherwise use image_url for base64
     if (data.image) {
-      formData.append('image', data.image);
+      const key = await uploadDirect('communities', data.image);
+      if (key) formData.append('image_key', key);
+      else formData.append('image', data.image);
     } else if (data.image_url) {
       formData.append('image_url', data.image_url);
     }
@@ -118,7 +145,14 @@ export const postsAPI = {
     return api.get('/posts/', { params: { limit } }).then(res => res.data);
   },
   
-  create: (data: {
+  // Merged feed of every joined community: { next, results }
+  getHomeFeed: (limit: number = 20, cursor?: string) => {
+    const params: any = { limit };
+    if (cursor) params.cursor = cursor;
+    return api.get('/posts/feed/', { params }).then(res => res.data);
+  },
+  
+  create: async (data: {
     community_id: string;
     title: string;
     body?: string;
@@ -132,7 +166,9 @@ export const postsAPI = {
     
     // Handle image: use File if provided, otherwise use image_url for base64
     if (data.image) {
-      formData.append('image', data.image);
+      const key = await uploadDirect('posts', data.image);
+      if (key) formData.append('image_key', key);
+      else formData.append('image', data.image);
     } else if (data.image_url) {
       formData.append('image_url', data.image_url);
     }
@@ -153,6 +189,10 @@ export const postsAPI = {
   
   getUserVotes: (communityId: string) =>
     api.get('/posts/votes/', { params: { community_id: communityId } }).then(res => res.data),
+  
+  // Votes for just the given posts (max 100 ids per request)
+  getUserVotesForPosts: (postIds: number[]) =>
+    api.get('/posts/votes/', { params: { post_ids: postIds.join(',') } }).then(res => res.data),
 };
 
 // Comments APIs
@@ -160,10 +200,21 @@ export const commentsAPI = {
   list: (postId: number) =>
     api.get('/comments/', { params: { post_id: postId } }).then(res => res.data),
   
-  create: (data: { post_id: number; community_id: string; text: string }) =>
+  // Depth-first thread; `parent` + `depth` fetch a slice, `next` continues it
+  thread: (postId: number, params: { parent?: number; depth?: number; cursor?: string } = {}) =>
+    api.get('/comments/thread/', { params: { post: postId, ...params } }).then(res => res.data),
+  
+  create: (data: { post_id: number; community_id: string; text: string; parent?: number }) =>
     api.post('/comments/create/', data).then(res => res.data),
   
-  delete: (id: number) => api.delete(`/comments/${id}/delete/`),  // 204 No Content - no .data needed
+  // Returns the post's new { numberOfComments }
+  delete: (id: number) => api.delete(`/comments/${id}/delete/`).then(res => res.data),
+};
+
+// Search API (full-text, relevance-ordered cursor pages)
+export const searchAPI = {
+  search: (q: string, params: { type?: 'posts' | 'comments'; community_id?: string; cursor?: string } = {}) =>
+    api.get('/search/', { params: { q, ...params } }).then(res => res.data),
 };
 
 // Helper to save auth data
@@ -9,6 +9,7 @@ export type Post = {
   creatorDisplayName?: string;
   title: string;
   body: string;
+  isPreview?: boolean; // body is the truncated list preview; fetch the post for the full text
   numberOfComments: number;
   voteStatus: number;
   currentUserVoteStatus?: {
@@ -26,11 +26,8 @@ const Recommendations: React.FC<RecommendationsProps> = () => {
   const getCommunityRecommendations = async () => {
     setLoading(true);
     try {
-      // Fetch top communities from Django API (already sorted by numberOfMembers DESC)
-      const communitiesData = await communitiesAPI.list();
-      
-      // Take top 5 communities
-      const topCommunities = communitiesData.slice(0, 5);
+      // Top 5 communities by numberOfMembers, from the cached leaderboard
+      const topCommunities = await communitiesAPI.top(5);
       
       const communities: Community[] = topCommunities.map((comm: any) => ({
         id: comm.id,
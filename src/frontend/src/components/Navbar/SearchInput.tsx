@@ -1,13 +1,58 @@
-import React from "react";
-import { Flex, InputGroup, InputLeftElement, Input } from "@chakra-ui/react";
+import React, { useEffect, useState } from "react";
+import { Box, Flex, InputGroup, InputLeftElement, Input, Text } from "@chakra-ui/react";
 import { SearchIcon } from "@chakra-ui/icons";
+import { useRouter } from "next/router";
+import { communitiesAPI } from "../../api/client";
 import { User } from "../../types/user";
 
+type Suggestion = {
+  id: string;
+  numberOfMembers: number;
+};
+
 type SearchInputProps = {
   user?: User;
 };
 
 const SearchInput: React.FC<SearchInputProps> = ({ user }) => {
+  const router = useRouter();
+  const [query, setQuery] = useState("");
+  const [suggestions, setSuggestions] = useState<Suggestion[]>([]);
+
+  // Community type-ahead, debounced while typing
+  useEffect(() => {
+    const prefix = query.trim();
+    if (!prefix) {
+      setSuggestions([]);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(() => {
+      communitiesAPI
+        .autocomplete(prefix)
+        .then((data: Suggestion[]) => !cancelled && setSuggestions(data))
+        .catch(() => !cancelled && setSuggestions([]));
+    }, 150);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [query]);
+
+  const onSubmit = (event: React.FormEvent) => {
+    event.preventDefault();
+    const q = query.trim();
+    if (!q) return;
+    setSuggestions([]);
+    router.push({ pathname: "/search", query: { q } });
+  };
+
+  const onSelectCommunity = (id: string) => {
+    setQuery("");
+    setSuggestions([]);
+    router.push(`/r/${id}`);
+  };
+
   return (
     <Flex
       flexGrow={1}
@@ -15,7 +60,7 @@ const SearchInput: React.FC<SearchInputProps> = ({ user }) => {
       mr={2}
       alignItems="center"
     >
-      <InputGroup>
+      <InputGroup as="form" onSubmit={onSubmit} position="relative">
         <InputLeftElement
           pointerEvents="none"
           color="gray.400"
@@ -25,6 +70,9 @@ const SearchInput: React.FC<SearchInputProps> = ({ user }) => {
         </InputLeftElement>
         <Input
           placeholder="Search Reddit"
+          name="q"
+          value={query}
+          onChange={(event) => setQuery(event.target.value)}
           fontSize="10pt"
           _placeholder={{ color: "gray.500" }}
           _hover={{
@@ -39,7 +87,38 @@ const SearchInput: React.FC<SearchInputProps> = ({ user }) => {
           }}
           height="34px"
           bg="gray.50"
+          autoComplete="off"
+          onBlur={() => setTimeout(() => setSuggestions([]), 150)}
         />
+        {suggestions.length > 0 && (
+          <Box
+            position="absolute"
+            top="36px"
+            left={0}
+            right={0}
+            bg="white"
+            border="1px solid"
+            borderColor="gray.200"
+            borderRadius={4}
+            zIndex={10}
+          >
+            {suggestions.map((item) => (
+              <Flex
+                key={item.id}
+                justify="space-between"
+                px={3}
+                py={2}
+                fontSize="10pt"
+                cursor="pointer"
+                _hover={{ bg: "gray.100" }}
+                onMouseDown={() => onSelectCommunity(item.id)}
+              >
+                <Text fontWeight={600}>r/{item.id}</Text>
+                <Text color="gray.500">{item.numberOfMembers.toLocaleString()} members</Text>
+              </Flex>
+            ))}
+          </Box>
+        )}
       </InputGroup>
     </Flex>
   );
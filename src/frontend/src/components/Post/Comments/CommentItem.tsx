@@ -24,6 +24,10 @@ export type Comment = {
   postId: string;
   postTitle: string;
   text: string;
+  parentId?: string | null;
+  depth?: number;
+  numberOfReplies?: number;
+  isDeleted?: boolean;
   createdAt?: {
     seconds: number;
   };
@@ -34,6 +38,8 @@ type CommentItemProps = {
   onDeleteComment: (comment: Comment) => void;
   isLoading: boolean;
   userId?: string;
+  // Set when the comment's replies were cut off by the thread depth limit
+  onContinueThread?: (comment: Comment) => void;
 };
 
 const CommentItem: React.FC<CommentItemProps> = ({
@@ -41,6 +47,7 @@ const CommentItem: React.FC<CommentItemProps> = ({
   onDeleteComment,
   isLoading,
   userId,
+  onContinueThread,
 }) => {
   // const [loading, setLoading] = useState(false);
 
@@ -60,7 +67,7 @@ const CommentItem: React.FC<CommentItemProps> = ({
   // }, [setLoading]);
 
   return (
-    <Flex>
+    <Flex pl={(comment.depth || 0) * 6}>
       <Box mr={2}>
         <Icon as={FaReddit} fontSize={30} color="gray.300" />
       </Box>
@@ -79,7 +86,9 @@ const CommentItem: React.FC<CommentItemProps> = ({
           )}
           {isLoading && <Spinner size="sm" />}
         </Stack>
-        <Text fontSize="10pt">{comment.text}</Text>
+        <Text fontSize="10pt" color={comment.isDeleted ? "gray.400" : undefined}>
+          {comment.isDeleted ? "[deleted]" : comment.text}
+        </Text>
         <Stack
           direction="row"
           align="center"
@@ -89,7 +98,7 @@ const CommentItem: React.FC<CommentItemProps> = ({
         >
           <Icon as={IoArrowUpCircleOutline} />
           <Icon as={IoArrowDownCircleOutline} />
-          {userId === comment.creatorId && (
+          {!comment.isDeleted && userId === comment.creatorId && (
             <>
               <Text fontSize="9pt" _hover={{ color: "blue.500" }}>
                 Edit
@@ -103,6 +112,16 @@ const CommentItem: React.FC<CommentItemProps> = ({
               </Text>
             </>
           )}
+          {onContinueThread && (
+            <Text
+              fontSize="9pt"
+              _hover={{ color: "blue.500" }}
+              onClick={() => onContinueThread(comment)}
+            >
+              Continue this thread ({comment.numberOfReplies}{" "}
+              {comment.numberOfReplies === 1 ? "reply" : "replies"})
+            </Text>
+          )}
         </Stack>
       </Stack>
     </Flex>
@@ -1,6 +1,7 @@
 import React, { useCallback, useEffect, useState } from "react";
 import {
   Box,
+  Button,
   Flex,
   SkeletonCircle,
   SkeletonText,
@@ -14,6 +15,13 @@ import CommentItem, { Comment } from "./CommentItem";
 import CommentInput from "./Input";
 import { commentsAPI } from "../../../api/client";
 
+// Levels fetched per request; deeper replies are loaded with "Continue this thread"
+const THREAD_DEPTH = 8;
+
+// `next` is a full URL; the API client only needs its cursor
+const nextCursor = (next: string | null): string | null =>
+  next ? new URL(next, window.location.href).searchParams.get("cursor") : null;
+
 type CommentsProps = {
   user?: any | null;
   selectedPost: Post;
@@ -28,6 +36,9 @@ const Comments: React.FC<CommentsProps> = ({
   const [comment, setComment] = useState("");
   const [comments, setComments] = useState<Comment[]>([]);
   const [commentFetchLoading, setCommentFetchLoading] = useState(false);
+  const [cursor, setCursor] = useState<string | null>(null);
+  const [loadMoreLoading, setLoadMoreLoading] = useState(false);
+  const [continueLoading, setContinueLoading] = useState("");
   const [commentCreateLoading, setCommentCreateLoading] = useState(false);
   const [deleteLoading, setDeleteLoading] = useState("");
   const setAuthModalState = useSetRecoilState(authModalState);
@@ -73,7 +84,7 @@ const Comments: React.FC<CommentsProps> = ({
         ...prev,
         selectedPost: {
           ...prev.selectedPost,
-          numberOfComments: prev.selectedPost?.numberOfComments! + 1,
+          numberOfComments: newComment.numberOfComments,
         } as Post,
         postUpdateRequired: true,
       }));
@@ -90,18 +101,43 @@ const Comments: React.FC<CommentsProps> = ({
         if (!comment.id) throw "Comment has no ID";
         
         // Delete comment via Django API
-        await commentsAPI.delete(parseInt(comment.id));
+        const { numberOfComments } = await commentsAPI.delete(parseInt(comment.id));
 
         setPostState((prev) => ({
           ...prev,
           selectedPost: {
             ...prev.selectedPost,
-            numberOfComments: prev.selectedPost?.numberOfComments! - 1,
+            numberOfComments,
           } as Post,
           postUpdateRequired: true,
         }));
 
-        setComments((prev) => prev.filter((item) => item.id !== comment.id));
+        if (comment.numberOfReplies) {
+          // The server keeps a comment with replies as a tombstone
+          setComments((prev) =>
+            prev.map((item) =>
+              item.id === comment.id
+                ? {
+                    ...item,
+                    isDeleted: true,
+                    text: "",
+                    creatorId: "",
+                    creatorDisplayText: "[deleted]",
+                  }
+                : item
+            )
+          );
+        } else {
+          setComments((prev) =>
+            prev
+              .filter((item) => item.id !== comment.id)
+              .map((item) =>
+                item.id === comment.parentId
+                  ? { ...item, numberOfReplies: (item.numberOfReplies || 1) - 1 }
+                  : item
+              )
+          );
+        }
       } catch (error: any) {
         console.log("Error deleting comment", error);
       }
@@ -110,32 +146,88 @@ const Comments: React.FC<CommentsProps> = ({
     [setComments, setPostState]
   );
 
+  const toComment = (comment: any): Comment => ({
+    id: comment.id.toString(),
+    creatorId: comment.creatorId?.toString() ?? "",
+    creatorDisplayText: comment.creatorDisplayText || "Unknown",
+    creatorPhotoURL: comment.creatorPhotoURL || "",
+    communityId: comment.communityId,
+    postId: comment.postId.toString(),
+    postTitle: selectedPost.title,
+    text: comment.text,
+    parentId: comment.parentId?.toString() ?? null,
+    depth: comment.depth,
+    numberOfReplies: comment.numberOfReplies,
+    isDeleted: comment.isDeleted,
+    createdAt: {
+      seconds: new Date(comment.createdAt).getTime() / 1000,
+    },
+  });
+
   const getPostComments = async () => {
+    setCommentFetchLoading(true);
     try {
-      // Fetch comments from Django API
-      const commentsData = await commentsAPI.list(selectedPost.id);
-      
-      const comments: Comment[] = commentsData.map((comment: any) => ({
-        id: comment.id.toString(),
-        creatorId: comment.creatorId.toString(),
-        creatorDisplayText: comment.creatorDisplayText || "Unknown",
-        creatorPhotoURL: comment.creatorPhotoURL || "",
-        communityId: comment.communityId,
-        postId: comment.postId.toString(),
-        postTitle: selectedPost.title,
-        text: comment.text,
-        createdAt: {
-          seconds: new Date(comment.createdAt).getTime() / 1000,
-        },
-      }));
-      
-      setComments(comments);
+      // Thread depth first: replies follow their parent, `next` continues it
+      const commentsData = await commentsAPI.thread(selectedPost.id, { depth: THREAD_DEPTH });
+      setComments(commentsData.results.map(toComment));
+      setCursor(nextCursor(commentsData.next));
     } catch (error: any) {
       console.log("getPostComments error", error);
     }
     setCommentFetchLoading(false);
   };
 
+  const onLoadMore = async () => {
+    if (!cursor) return;
+    setLoadMoreLoading(true);
+    try {
+      const commentsData = await commentsAPI.thread(selectedPost.id, { depth: THREAD_DEPTH, cursor });
+      setComments((prev) => [...prev, ...commentsData.results.map(toComment)]);
+      setCursor(nextCursor(commentsData.next));
+    } catch (error: any) {
+      console.log("onLoadMore error", error);
+    }
+    setLoadMoreLoading(false);
+  };
+
+  const onContinueThread = async (comment: Comment) => {
+    setContinueLoading(comment.id as string);
+    try {
+      // The replies below a cut-off comment, all pages of the slice
+      const replies: Comment[] = [];
+      let sliceCursor: string | null = null;
+      do {
+        const params: { parent: number; depth: number; cursor?: string } = {
+          parent: parseInt(comment.id as string),
+          depth: THREAD_DEPTH,
+        };
+        if (sliceCursor) params.cursor = sliceCursor;
+        const commentsData = await commentsAPI.thread(selectedPost.id, params);
+        replies.push(...commentsData.results.map(toComment));
+        sliceCursor = nextCursor(commentsData.next);
+      } while (sliceCursor);
+
+      // Depth first, so the slice goes right after the comment
+      setComments((prev) => {
+        const index = prev.findIndex((item) => item.id === comment.id);
+        if (index === -1) return prev;
+        return [...prev.slice(0, index + 1), ...replies, ...prev.slice(index + 1)];
+      });
+    } catch (error: any) {
+      console.log("onContinueThread error", error);
+    }
+    setContinueLoading("");
+  };
+
+  // A comment's loaded replies come right after it; if they don't (and the
+  // next page can't hold them), the depth limit cut them off
+  const isCutOff = (index: number) => {
+    const item = comments[index];
+    if (!item.numberOfReplies) return false;
+    if (index === comments.length - 1) return !cursor;
+    return comments[index + 1].parentId !== item.id;
+  };
+
   useEffect(() => {
     console.log("HERE IS SELECTED POST", selectedPost.id);
 
@@ -174,15 +266,29 @@ const Comments: React.FC<CommentsProps> = ({
           <>
             {!!comments.length ? (
               <>
-                {comments.map((item: Comment) => (
+                {comments.map((item: Comment, index: number) => (
                   <CommentItem
                     key={item.id}
                     comment={item}
                     onDeleteComment={onDeleteComment}
-                    isLoading={deleteLoading === (item.id as string)}
+                    isLoading={
+                      deleteLoading === (item.id as string) ||
+                      continueLoading === (item.id as string)
+                    }
                     userId={user?.id?.toString()}
+                    onContinueThread={isCutOff(index) ? onContinueThread : undefined}
                   />
                 ))}
+                {cursor && (
+                  <Button
+                    variant="outline"
+                    height="30px"
+                    isLoading={loadMoreLoading}
+                    onClick={onLoadMore}
+                  >
+                    Load more comments
+                  </Button>
+                )}
               </>
             ) : (
               <Flex
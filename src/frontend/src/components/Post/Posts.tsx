@@ -225,7 +225,8 @@ const Posts: React.FC<PostsProps> = ({
         creatorDisplayName: post.creatorDisplayText || "Unknown", // Updated field name from backend
         userDisplayText: post.creatorDisplayText || "Unknown", // Updated field name from backend
         title: post.title,
-        body: post.body || "",
+        body: post.bodyPreview ?? post.body ?? "",
+        isPreview: post.bodyPreview !== undefined,
         numberOfComments: post.numberOfComments || 0, // Updated field name from backend
         voteStatus: post.voteStatus || 0, // Updated field name from backend
         imageURL: post.imageURL || "", // Updated field name from backend
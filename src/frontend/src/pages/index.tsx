@@ -39,36 +39,24 @@ const Home: NextPage = () => {
       if (communityStateValue.mySnippets.length) {
         console.log("GETTING POSTS IN USER COMMUNITIES");
 
-        const myCommunityIds = communityStateValue.mySnippets.map(
-          (snippet) => snippet.communityId
-        );
-
-        // Get posts from user's communities (up to 5 communities, 4 posts each = 20 posts max)
-        const postPromises = myCommunityIds.slice(0, 5).map((communityId) =>
-          postsAPI.list(communityId, 4)
-        );
-
-        const results = await Promise.all(postPromises);
-        results.forEach((posts) => {
-          const formattedPosts = posts.map((post: any) => ({
-            id: post.id,
-            communityId: post.communityId,
-            creatorId: post.creatorId?.toString() || "",
-            creatorDisplayName: post.creatorDisplayText || "Unknown",
-            userDisplayText: post.creatorDisplayText || "Unknown",
-            title: post.title,
-            body: post.body || "",
-            numberOfComments: post.numberOfComments || 0,
-            voteStatus: post.voteStatus || 0,
-            imageURL: post.imageURL || "",
-            communityImageURL: post.communityImageURL || "",
-            createdAt: new Date(post.createdAt).getTime(),
-          })) as Post[];
-          feedPosts.push(...formattedPosts);
-        });
-        
-        // Sort all posts by creation date (newest first)
-        feedPosts.sort((a, b) => b.createdAt - a.createdAt);
+        // One request: the server merges posts from every joined community
+        const feed = await postsAPI.getHomeFeed(20);
+        const formattedPosts = feed.results.map((post: any) => ({
+          id: post.id,
+          communityId: post.communityId,
+          creatorId: post.creatorId?.toString() || "",
+          creatorDisplayName: post.creatorDisplayText || "Unknown",
+          userDisplayText: post.creatorDisplayText || "Unknown",
+          title: post.title,
+          body: post.bodyPreview ?? post.body ?? "",
+          isPreview: post.bodyPreview !== undefined,
+          numberOfComments: post.numberOfComments || 0,
+          voteStatus: post.voteStatus || 0,
+          imageURL: post.imageURL || "",
+          communityImageURL: post.communityImageURL || "",
+          createdAt: new Date(post.createdAt).getTime(),
+        })) as Post[];
+        feedPosts.push(...formattedPosts);
       }
       // User has not joined any communities yet
       else {
@@ -83,7 +71,8 @@ const Home: NextPage = () => {
           creatorDisplayName: post.creatorDisplayText || "Unknown",
           userDisplayText: post.creatorDisplayText || "Unknown",
           title: post.title,
-          body: post.body || "",
+          body: post.bodyPreview ?? post.body ?? "",
+          isPreview: post.bodyPreview !== undefined,
           numberOfComments: post.numberOfComments || 0,
           voteStatus: post.voteStatus || 0,
           imageURL: post.imageURL || "",
@@ -118,7 +107,8 @@ const Home: NextPage = () => {
         creatorDisplayName: post.creatorDisplayText || "Unknown",
         userDisplayText: post.creatorDisplayText || "Unknown",
         title: post.title,
-        body: post.body || "",
+        body: post.bodyPreview ?? post.body ?? "",
+        isPreview: post.bodyPreview !== undefined,
         numberOfComments: post.numberOfComments || 0,
         voteStatus: post.voteStatus || 0,
         imageURL: post.imageURL || "",
@@ -143,20 +133,15 @@ const Home: NextPage = () => {
 
     try {
       const postIds = postStateValue.posts.map((post) => post.id);
-      
-      // For each post, check if user has voted
-      // Note: This is not optimal - ideally backend should support batch vote fetching
-      const votes: PostVote[] = [];
-      
-      for (const postId of postIds) {
-        try {
-          const postData = await postsAPI.getById(postId);
-          // If post has user's vote, add it
-          // TODO: Backend should return current user's vote with post data
-        } catch (err) {
-          // Skip if post not found
-        }
-      }
+
+      // One request scoped to the posts on screen, not the whole vote history
+      const data = await postsAPI.getUserVotesForPosts(postIds);
+      const votes: PostVote[] = data.map((vote: any) => ({
+        id: vote.id.toString(),
+        postId: vote.postId,
+        communityId: vote.communityId,
+        voteValue: vote.voteValue,
+      }));
 
       setPostStateValue((prev) => ({
         ...prev,
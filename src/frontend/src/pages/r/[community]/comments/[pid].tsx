@@ -61,11 +61,11 @@ const PostPage: React.FC<PostPageProps> = () => {
     setLoading(false);
   };
 
-  // Fetch post if not in already in state
+  // Fetch post if not in already in state, or if only its list preview is
   useEffect(() => {
     const { pid } = router.query;
 
-    if (pid && !postStateValue.selectedPost) {
+    if (pid && (!postStateValue.selectedPost || postStateValue.selectedPost.isPreview)) {
       fetchPost();
     }
   }, [router.query, postStateValue.selectedPost]);
@@ -0,0 +1,117 @@
+import { useEffect, useState } from "react";
+import { Button, Flex, Stack, Text } from "@chakra-ui/react";
+import type { NextPage } from "next";
+import { useRouter } from "next/router";
+import { useRecoilValue } from "recoil";
+import { Post } from "../atoms/postsAtom";
+import { userState } from "../atoms/userAtom";
+import PageContentLayout from "../components/Layout/PageContent";
+import PostLoader from "../components/Post/Loader";
+import PostItem from "../components/Post/PostItem";
+import Recommendations from "../components/Community/Recommendations";
+import usePosts from "../hooks/usePosts";
+import { searchAPI } from "../api/client";
+
+const toPost = (post: any): Post => ({
+  id: post.id,
+  communityId: post.communityId,
+  creatorId: post.creatorId?.toString() || "",
+  creatorDisplayName: post.creatorDisplayText || "Unknown",
+  userDisplayText: post.creatorDisplayText || "Unknown",
+  title: post.title,
+  body: post.bodyPreview ?? post.body ?? "",
+  isPreview: post.bodyPreview !== undefined,
+  numberOfComments: post.numberOfComments || 0,
+  voteStatus: post.voteStatus || 0,
+  imageURL: post.imageURL || "",
+  communityImageURL: post.communityImageURL || "",
+  createdAt: new Date(post.createdAt).getTime(),
+});
+
+const Search: NextPage = () => {
+  const router = useRouter();
+  const q = typeof router.query.q === "string" ? router.query.q : "";
+  const user = useRecoilValue(userState);
+  const {
+    postStateValue,
+    setPostStateValue,
+    onVote,
+    onSelectPost,
+    onDeletePost,
+    loading,
+    setLoading,
+  } = usePosts();
+  const [next, setNext] = useState<string | null>(null);
+
+  const runSearch = async (cursor?: string) => {
+    setLoading(!cursor);
+    try {
+      const data = await searchAPI.search(q, { cursor });
+      const results = data.results.map(toPost);
+      setPostStateValue((prev) => ({
+        ...prev,
+        posts: cursor ? [...prev.posts, ...results] : results,
+      }));
+      // The server returns the next page as a full URL; keep just its cursor
+      setNext(data.next ? new URL(data.next).searchParams.get("cursor") : null);
+    } catch (error: any) {
+      console.log("search error", error);
+    }
+    setLoading(false);
+  };
+
+  useEffect(() => {
+    if (!q) return;
+    runSearch();
+  }, [q]);
+
+  return (
+    <PageContentLayout>
+      <>
+        <Text fontWeight={600} mb={2}>
+          Search results for &ldquo;{q}&rdquo;
+        </Text>
+        {loading ? (
+          <PostLoader />
+        ) : (
+          <Stack>
+            {postStateValue.posts.map((post: Post, index) => (
+              <PostItem
+                key={post.id}
+                post={post}
+                postIdx={index}
+                onVote={onVote}
+                onDeletePost={onDeletePost}
+                userVoteValue={
+                  postStateValue.postVotes.find(
+                    (item) => item.postId === post.id
+                  )?.voteValue
+                }
+                userIsCreator={user?.id?.toString() === post.creatorId}
+                onSelectPost={onSelectPost}
+                homePage
+              />
+            ))}
+            {!postStateValue.posts.length && q && (
+              <Text fontSize="10pt" color="gray.500">
+                No posts match your search.
+              </Text>
+            )}
+            {next && (
+              <Flex justify="center">
+                <Button variant="outline" height="28px" onClick={() => runSearch(next)}>
+                  Load more
+                </Button>
+              </Flex>
+            )}
+          </Stack>
+        )}
+      </>
+      <Stack spacing={5} position="sticky" top="14px">
+        <Recommendations />
+      </Stack>
+    </PageContentLayout>
+  );
+};
+
+export default Search;